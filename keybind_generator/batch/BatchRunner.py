@@ -0,0 +1,246 @@
+import datetime
+import json
+import multiprocessing
+import os
+import time as clock
+import traceback
+from datetime import timedelta
+from typing import Dict, List
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.data.SpreadsheetReader import SpreadsheetReader
+from keybind_generator.solver.Budget import Budget
+from keybind_generator.solver.ExactSolver import ExactSolver
+from keybind_generator.solver.GeneticSolver import GeneticSolver
+from keybind_generator.solver.GreedySolver import GreedySolver
+from keybind_generator.solver.MonteCarloTreeSearchSolver import MonteCarloTreeSearchSolver
+from keybind_generator.solver.PepegaSolver import PepegaSolver
+from keybind_generator.solver.SimulatedAnnealingSolver import SimulatedAnnealingSolver
+from keybind_generator.solver.TabuSolver import TabuSolver
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.Keyboard import Keyboard
+
+# Graphs and sheets of the batch, set once per worker process by the pool initializer
+_worker_graphs: Dict[str, Graph] = {}
+_worker_sheets: Dict[str, tuple] = {}
+
+
+def _initialize_worker(graphs: Dict[str, Graph], sheets: Dict[str, tuple]) -> None:
+    global _worker_graphs, _worker_sheets
+    _worker_graphs = graphs
+    _worker_sheets = sheets
+
+
+def _run_job(task: (int, "BatchRunner.Job")) -> (int, dict):
+    index, job = task
+    return index, job.run(_worker_graphs[job.layout_key], *_worker_sheets[job.sheet_key])
+
+
+class BatchRunner:
+    """
+    Runs a manifest of optimisation jobs, each binding the abilities and combinations of a workbook's sheets onto a
+    keyboard layout with a solver, over a pool of worker processes.
+
+    Sheets and layouts shared by several jobs are only read once: sheets are compiled (and cached between batches)
+    by SpreadsheetReader.compile(), and each distinct layout's graph is generated once and put in shared memory,
+    which every worker maps. Jobs are scheduled longest first, and all results are written to one JSON file at the
+    end. A failing job doesn't stop the batch, its result records the error instead.
+
+    The manifest is a JSON file of the form
+    {"defaults": {...}, "jobs": [{"name": "magic", "workbook": "abilities.xlsx", "abilities": "Magic DW Abilities",
+    "combinations": "Magic Combinations", "layout": {"sheet": "Key Layout"}, "home_keys": ["A", "S", "D", "F"],
+    "solver": "annealing", "options": {}, "seconds": 60, "iterations": null, "seed": 0}, ...]}
+    where each job takes the defaults for the fields it leaves out. The layout is either "default", the keyboard and
+    mouse layout of Keyboard.default(), or a sheet of a workbook, the job's own if not given. Relative paths are
+    relative to the manifest.
+    """
+
+    SOLVERS = {"random": PepegaSolver, "greedy": GreedySolver, "mcts": MonteCarloTreeSearchSolver,
+               "annealing": SimulatedAnnealingSolver, "tabu": TabuSolver, "genetic": GeneticSolver,
+               "exact": ExactSolver}
+
+    class Job:
+        def __init__(self, name: str, workbook: str, abilities: str, combinations: str, layout=None,
+                     home_keys: List[str] = None, solver: str = "annealing", options: dict = None,
+                     seconds: float = None, iterations: int = None, seed: int = 0):
+            """
+            :param name: Name of the job, in its result
+            :param workbook: Workbook of the ability and combination sheets
+            :param abilities: Name of the ability sheet
+            :param combinations: Name of the combination sheet
+            :param layout: "default" (or None), the name of a layout sheet of the workbook, or a dictionary with the
+            "sheet" (and "workbook", defaulting to the job's) of a keyboard layout
+            :param home_keys: Names of the home keys
+            :param solver: Name of the solver, one of BatchRunner.SOLVERS
+            :param options: Keyword arguments of the solver
+            :param seconds: Duration of the run. Defaults to 10 seconds if no number of iterations is given either
+            :param iterations: Number of iterations to run
+            :param seed: Seed of the global random generator at the start of the run
+            """
+            if solver not in BatchRunner.SOLVERS:
+                raise ValueError(f"Unknown solver %s, expected one of %s" % (solver, ", ".join(BatchRunner.SOLVERS)))
+            self.name = name
+            self.workbook = workbook
+            self.abilities = abilities
+            self.combinations = combinations
+            # Normalised, so that jobs on the same layout share its key and graph
+            if layout is None:
+                layout = "default"
+            self.layout = {"sheet": layout} if isinstance(layout, str) and layout != "default" else layout
+            if isinstance(self.layout, dict):
+                self.layout = {"workbook": workbook, **self.layout}
+            self.home_keys = ["A", "S", "D", "F"] if home_keys is None else home_keys
+            self.solver = solver
+            self.options = {} if options is None else options
+            self.seconds = 10 if seconds is None and iterations is None else seconds
+            self.iterations = iterations
+            self.seed = seed
+
+        @property
+        def layout_key(self) -> str:
+            return json.dumps(self.layout, sort_keys=True)
+
+        @property
+        def sheet_key(self) -> str:
+            return json.dumps([self.workbook, self.abilities, self.combinations])
+
+        def run(self, graph: Graph, abilities: DataFrame, combinations: DataFrame) -> dict:
+            """
+            Runs the job's solver, never raising
+            :return: Result of the job, with the loss and binding found, or the error that stopped it
+            """
+            result = {"name": self.name, "workbook": self.workbook, "abilities": self.abilities,
+                      "combinations": self.combinations, "layout": self.layout, "solver": self.solver,
+                      "options": self.options, "seed": self.seed, "pid": os.getpid()}
+            start = clock.perf_counter()
+            try:
+                if abilities.shape[0] > graph.size:
+                    raise ValueError(f"%d abilities can't be bound to %d keys" % (abilities.shape[0], graph.size))
+                numpy.random.seed(self.seed)
+                solver = BatchRunner.SOLVERS[self.solver](graph, abilities, combinations,
+                                                          graph.get_node_indices(self.home_keys), **self.options)
+                solver.run(Budget(time=None if self.seconds is None else timedelta(seconds=self.seconds),
+                                  iterations=self.iterations))
+                binding = solver.best_binding
+                result["iterations"] = solver.num_iter
+                if binding is None:
+                    result["error"] = "No binding found within the budget"
+                else:
+                    result.update({"best_loss": float(solver.best_loss),
+                                   "binding": {str(name): graph.names[key] for name, key in
+                                               zip(abilities["name"], binding.assignments)}})
+            except Exception as exception:
+                result["error"] = "".join(traceback.format_exception_only(type(exception), exception)).strip()
+            result["seconds"] = clock.perf_counter() - start
+            return result
+
+    @staticmethod
+    def read_manifest(path: str) -> List[Job]:
+        """
+        :param path: Manifest file
+        :return: Jobs of the manifest
+        """
+        with open(path) as file:
+            manifest = json.load(file)
+        directory = os.path.dirname(os.path.abspath(path))
+        defaults = manifest.get("defaults", {})
+
+        jobs = []
+        for index, entry in enumerate(manifest["jobs"]):
+            entry = {**defaults, **entry}
+            entry.setdefault("name", "job " + str(index))
+            entry["workbook"] = os.path.join(directory, entry["workbook"])
+            if isinstance(entry.get("layout"), dict) and "workbook" in entry["layout"]:
+                entry["layout"] = {**entry["layout"], "workbook": os.path.join(directory, entry["layout"]["workbook"])}
+            jobs.append(BatchRunner.Job(**entry))
+        return jobs
+
+    def __init__(self, jobs: List[Job], num_workers: int = None, cache_directory: str = None):
+        """
+        :param jobs: Jobs to run
+        :param num_workers: Number of worker processes, one per core by default
+        :param cache_directory: Directory of the compiled sheet cache, see SpreadsheetReader.compile()
+        """
+        self.jobs = jobs
+        self.num_workers = os.cpu_count() if num_workers is None else num_workers
+        self.cache_directory = cache_directory
+        self.graphs: Dict[str, Graph] = {}
+        self.sheets: Dict[str, tuple] = {}
+
+    def prepare(self) -> None:
+        """
+        Reads every distinct pair of sheets and layout of the jobs once, and shares each layout's graph
+        :return:
+        """
+        readers: Dict[str, SpreadsheetReader] = {}
+
+        def reader(workbook: str) -> SpreadsheetReader:
+            if workbook not in readers:
+                readers[workbook] = SpreadsheetReader(workbook)
+            return readers[workbook]
+
+        for job in self.jobs:
+            if job.sheet_key not in self.sheets:
+                self.sheets[job.sheet_key] = reader(job.workbook).compile(job.abilities, job.combinations,
+                                                                          self.cache_directory)
+            if job.layout_key not in self.graphs:
+                if job.layout == "default":
+                    keyboard = Keyboard.default()
+                else:
+                    keyboard = reader(job.layout["workbook"]).read_keyboard_layout(job.layout["sheet"])
+                graph = keyboard.generate_graph()
+                graph.share()
+                self.graphs[job.layout_key] = graph
+
+    def close(self) -> None:
+        """
+        Releases the shared graphs
+        :return:
+        """
+        for graph in self.graphs.values():
+            graph.close()
+        self.graphs = {}
+
+    def run(self, output: str = None) -> List[dict]:
+        """
+        Runs every job
+        :param output: JSON file to write the results to, once all jobs are done
+        :return: Result of each job, in the order of the jobs
+        """
+        self.prepare()
+        try:
+            # Longest jobs first, so that the last jobs to start are short ones
+            order = sorted(range(len(self.jobs)), key=lambda index: -(self.jobs[index].seconds or 0))
+            tasks = [(index, self.jobs[index]) for index in order]
+            results: List[dict] = [{} for _ in self.jobs]
+            if self.num_workers > 1:
+                with multiprocessing.Pool(min(self.num_workers, len(tasks)), initializer=_initialize_worker,
+                                          initargs=(self.graphs, self.sheets)) as pool:
+                    for index, result in pool.imap_unordered(_run_job, tasks):
+                        results[index] = result
+            else:
+                _initialize_worker(self.graphs, self.sheets)
+                for task in tasks:
+                    index, result = _run_job(task)
+                    results[index] = result
+        finally:
+            self.close()
+
+        if output is not None:
+            BatchRunner.write(output, results)
+        return results
+
+    @staticmethod
+    def write(path: str, results: List[dict]) -> None:
+        """
+        Atomically writes results to a JSON file
+        :param path: Destination file
+        :param results: Results of the jobs
+        :return:
+        """
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"created": datetime.datetime.now().isoformat(), "results": results}, file, indent=1)
+        os.replace(temporary_path, path)
@@ -0,0 +1,15 @@
+import argparse
+
+from keybind_generator.batch.BatchRunner import BatchRunner
+
+parser = argparse.ArgumentParser(description="Runs a manifest of binding jobs over a pool of worker processes")
+parser.add_argument("manifest", help="JSON manifest of the jobs, see BatchRunner")
+parser.add_argument("output", help="JSON file to write the results of all jobs to")
+parser.add_argument("--workers", type=int, help="Number of worker processes, one per core by default")
+parser.add_argument("--cache", help="Directory of the compiled sheet cache, next to each workbook by default")
+arguments = parser.parse_args()
+
+runner = BatchRunner(BatchRunner.read_manifest(arguments.manifest), arguments.workers, arguments.cache)
+results = runner.run(arguments.output)
+for result in results:
+    print(result["name"], result.get("best_loss", result.get("error")))
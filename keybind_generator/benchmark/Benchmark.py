@@ -0,0 +1,266 @@
+import csv
+import datetime
+import json
+import os
+import tempfile
+import time as clock
+import tracemalloc
+from datetime import timedelta
+from typing import Callable, Dict, List
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.data.SpreadsheetReader import SpreadsheetReader
+from keybind_generator.solver.Budget import Budget
+from keybind_generator.solver.ExactSolver import ExactSolver
+from keybind_generator.solver.GeneticSolver import GeneticSolver
+from keybind_generator.solver.GreedySolver import GreedySolver
+from keybind_generator.solver.MonteCarloTreeSearchSolver import MonteCarloTreeSearchSolver
+from keybind_generator.solver.PepegaSolver import PepegaSolver
+from keybind_generator.solver.SimulatedAnnealingSolver import SimulatedAnnealingSolver
+from keybind_generator.solver.Solver import Solver
+from keybind_generator.solver.TabuSolver import TabuSolver
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.Keyboard import Keyboard
+
+
+class Benchmark:
+    """
+    Runs solvers over a set of problems for a fixed time each, recording for every run the iteration rate, the best
+    loss over time, the time taken to come within a tolerance of the best loss any solver found on the problem, and
+    the peak memory used. Results are saved as JSON (everything) and CSV (one summary row per run), and the loss
+    curves of each problem are plotted.
+    """
+
+    class Problem:
+        def __init__(self, name: str, graph: Graph, abilities: DataFrame, combinations: DataFrame,
+                     home_nodes: List[int]):
+            self.name = name
+            self.graph = graph
+            self.abilities = abilities
+            self.combinations = combinations
+            self.home_nodes = home_nodes
+
+    @staticmethod
+    def sheet_pairs(file: str) -> List[List[str]]:
+        """
+        Pairs each combination sheet of a workbook, named "<prefix> Combinations", with the ability sheet whose name
+        starts with the same prefix and ends with "Abilities", e.g. "Magic DW Abilities" with "Magic Combinations"
+        :param file: Ability workbook
+        :return: Pairs of ability and combination sheet names
+        """
+        names = SpreadsheetReader(file).sheet_names()
+        pairs = []
+        for combination_sheet in names:
+            if not combination_sheet.endswith(" Combinations"):
+                continue
+            prefix = combination_sheet[:-len("Combinations")]
+            pairs += [[ability_sheet, combination_sheet] for ability_sheet in names
+                      if ability_sheet.startswith(prefix) and ability_sheet.endswith(" Abilities")]
+        return pairs
+
+    @staticmethod
+    def sheet_problems(file: str, sheets: List[List[str]] = None, keyboard: Keyboard = None,
+                       home_keys: List[str] = None, cache_directory: str = None) -> List[Problem]:
+        """
+        :param file: Ability workbook
+        :param sheets: Pairs of ability and combination sheet names. Defaults to every pair of the workbook, see
+        sheet_pairs()
+        :param keyboard: Keyboard to bind onto. Defaults to the workbook's "Key Layout" sheet if it has one, along
+        with the default mouse keys if the sheet has none, and to the default keyboard otherwise
+        :param home_keys: Names of the home keys
+        :param cache_directory: Directory of the compiled sheet cache. Defaults to a directory in the system's
+        temporary directory, rather than next to the workbook
+        :return: One problem per pair of sheets. Abilities without a priority, such as those of the melee sheets, get
+        a priority of 1
+        """
+        reader = SpreadsheetReader(file)
+        if sheets is None:
+            sheets = Benchmark.sheet_pairs(file)
+        if cache_directory is None:
+            cache_directory = os.path.join(tempfile.gettempdir(), "keybind_generator")
+        if keyboard is None:
+            if "Key Layout" in reader.sheet_names():
+                keyboard = reader.read_keyboard_layout("Key Layout")
+                # Layout sheets only describe the keyboard so far, while ability sheets are bound to the mouse too
+                if not keyboard.has_mouse_keys():
+                    keyboard.add_default_mouse_keys()
+            else:
+                keyboard = Keyboard.default()
+        graph = keyboard.generate_graph()
+        home_nodes = graph.get_node_indices(["A", "S", "D", "F"] if home_keys is None else home_keys)
+
+        problems = []
+        for ability_sheet, combination_sheet in sheets:
+            abilities, combinations = reader.compile(ability_sheet, combination_sheet, cache_directory)
+            abilities["priority"] = abilities["priority"].fillna(1)
+            problems.append(Benchmark.Problem(ability_sheet, graph, abilities, combinations, home_nodes))
+        return problems
+
+    @staticmethod
+    def synthetic_problem(num_keys: int, seed: int = 0) -> Problem:
+        """
+        Random problem on a grid of keys, binding 70% as many abilities as there are keys, with half as many
+        combinations of two or three abilities as there are abilities
+        :param num_keys: Number of keys
+        :param seed: Seed of the random problem
+        :return: Problem
+        """
+        random = numpy.random.RandomState(seed)
+        keyboard = Keyboard()
+        for row in range(0, num_keys, 10):
+            keys = ["R" + str(row // 10) + "C" + str(column) for column in range(min(10, num_keys - row))]
+            keyboard.add_key_row(Keyboard.KeyRow(row // 10, .25 * (row // 10), keys))
+        graph = keyboard.generate_graph()
+
+        num_abilities = max(2, int(.7 * num_keys))
+        abilities = DataFrame({"name": ["ability " + str(index) for index in range(num_abilities)],
+                               "priority": random.randint(1, 5, num_abilities),
+                               "bar": "Yes", "comment": numpy.nan})
+        indices = [list(random.choice(num_abilities, random.randint(2, 4), replace=False))
+                   for _ in range(num_abilities // 2)]
+        combinations = DataFrame({"name": [">".join(abilities["name"][entry]) for entry in indices],
+                                  "priority": random.randint(1, 4, len(indices)), "ordered": "Yes", "comment": "",
+                                  "indices": indices})
+        home_nodes = list(range(min(14, num_keys - 1), min(18, num_keys)))
+        return Benchmark.Problem("synthetic " + str(num_keys), graph, abilities, combinations, home_nodes)
+
+    @staticmethod
+    def default_solvers() -> Dict[str, Callable[[Problem], Solver]]:
+        """
+        :return: Factory of each solver, by name
+        """
+        def arguments(problem: Benchmark.Problem):
+            return problem.graph, problem.abilities, problem.combinations, problem.home_nodes
+
+        return {"random": lambda problem: PepegaSolver(*arguments(problem), batch_size=256),
+                "greedy": lambda problem: GreedySolver(*arguments(problem), beam_width=16, noise=.2),
+                "mcts": lambda problem: MonteCarloTreeSearchSolver(*arguments(problem), leaf_batch_size=16),
+                "annealing": lambda problem: SimulatedAnnealingSolver(*arguments(problem)),
+                "tabu": lambda problem: TabuSolver(*arguments(problem)),
+                "genetic": lambda problem: GeneticSolver(*arguments(problem), crossover="pmx"),
+                "exact": lambda problem: ExactSolver(*arguments(problem))}
+
+    def __init__(self, problems: List[Problem], solvers: Dict[str, Callable[[Problem], Solver]] = None,
+                 time: timedelta = timedelta(seconds=10), seed: int = 0, target_tolerance: float = .05,
+                 measure_memory: bool = True):
+        """
+        :param problems: Problems to run every solver on
+        :param solvers: Factory of each solver, by name. Defaults to every solver
+        :param time: Duration of each run
+        :param seed: Seed of the global random generator at the start of each run
+        :param target_tolerance: Time to target is the time taken to come within this fraction of the best loss any
+        solver found on the problem
+        :param measure_memory: Replay each run's iterations under tracemalloc to measure its peak memory. The timed run
+        itself is never traced, so tracing overhead doesn't affect iteration rates
+        """
+        self.problems = problems
+        self.solvers = Benchmark.default_solvers() if solvers is None else solvers
+        self.time = time
+        self.seed = seed
+        self.target_tolerance = target_tolerance
+        self.measure_memory = measure_memory
+        self.results: List[dict] = []
+
+    def run_solver(self, problem: Problem, name: str, factory: Callable[[Problem], Solver]) -> dict:
+        """
+        Runs a solver on a problem for the benchmark's duration
+        :return: Result of the run
+        """
+        numpy.random.seed(self.seed)
+        start = clock.perf_counter()
+        solver = factory(problem)
+        setup_seconds = clock.perf_counter() - start
+
+        # Loss curve, as (seconds, iterations, best loss) at every improvement
+        curve = []
+        budget = Budget(time=self.time)
+        budget.start(solver)
+        start = clock.perf_counter()
+        if solver.best_loss < numpy.inf:
+            curve.append((0.0, solver.num_iter, float(solver.best_loss)))
+        while not solver.finished() and not budget.exhausted(solver):
+            solver.step()
+            if not curve or solver.best_loss < curve[-1][2]:
+                curve.append((clock.perf_counter() - start, solver.num_iter, float(solver.best_loss)))
+        seconds = clock.perf_counter() - start
+        iterations = solver.num_iter
+
+        peak_memory = None
+        if self.measure_memory:
+            numpy.random.seed(self.seed)
+            tracemalloc.start()
+            solver = factory(problem)
+            solver.run(Budget(iterations=iterations))
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        return {"problem": problem.name, "num_keys": problem.graph.size,
+                "num_abilities": problem.abilities.shape[0], "num_combinations": problem.combinations.shape[0],
+                "solver": name, "seed": self.seed, "setup_seconds": setup_seconds, "seconds": seconds,
+                "iterations": iterations, "iterations_per_second": iterations / seconds if seconds > 0 else None,
+                "best_loss": float(solver.best_loss), "peak_memory_bytes": peak_memory, "curve": curve}
+
+    def run(self) -> List[dict]:
+        """
+        Runs every solver on every problem
+        :return: Result of each run
+        """
+        for problem in self.problems:
+            results = [self.run_solver(problem, name, factory) for name, factory in self.solvers.items()]
+
+            target = min(result["best_loss"] for result in results)
+            target = target + self.target_tolerance * abs(target)
+            for result in results:
+                result["target_loss"] = target
+                result["time_to_target"] = next((seconds for seconds, _, loss in result["curve"] if loss <= target),
+                                                None)
+            self.results.extend(results)
+        return self.results
+
+    def save(self, directory: str) -> None:
+        """
+        Writes results.json, results.csv and a loss curve plot per problem to a directory
+        :param directory: Output directory, created if necessary
+        :return:
+        """
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "results.json"), "w") as file:
+            json.dump({"created": datetime.datetime.now().isoformat(), "numpy": numpy.__version__,
+                       "seconds_per_run": self.time.total_seconds(), "results": self.results}, file, indent=1)
+
+        columns = [key for key in self.results[0] if key != "curve"] if self.results else []
+        with open(os.path.join(directory, "results.csv"), "w", newline="") as file:
+            writer = csv.DictWriter(file, columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(self.results)
+
+        for problem in self.problems:
+            self.plot(problem.name, os.path.join(directory, problem.name.replace(" ", "_") + ".png"))
+
+    def plot(self, problem_name: str, file: str) -> None:
+        """
+        Plots the best loss over time of every solver on a problem
+        :param problem_name: Name of the problem
+        :param file: Image file to write
+        :return:
+        """
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        figure, axes = plt.subplots(figsize=(8, 5))
+        for result in self.results:
+            if result["problem"] != problem_name or not result["curve"]:
+                continue
+            seconds = [max(entry[0], 1e-4) for entry in result["curve"]] + [max(result["seconds"], 1e-4)]
+            losses = [entry[2] for entry in result["curve"]] + [result["curve"][-1][2]]
+            axes.step(seconds, losses, where="post", label=result["solver"])
+        axes.set_xscale("log")
+        axes.set_xlabel("Seconds")
+        axes.set_ylabel("Best loss")
+        axes.set_title(problem_name)
+        axes.legend()
+        figure.savefig(file)
+        plt.close(figure)
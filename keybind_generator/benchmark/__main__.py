@@ -0,0 +1,33 @@
+import argparse
+import os
+from datetime import timedelta
+
+from keybind_generator.benchmark.Benchmark import Benchmark
+
+parser = argparse.ArgumentParser(description="Benchmarks the solvers on ability sheets and synthetic layouts")
+parser.add_argument("output", help="Directory to write results.json, results.csv and the loss curve plots to")
+parser.add_argument("--workbook", help="Ability workbook to benchmark on, every pair of its ability and combination "
+                                       "sheets. Defaults to assets/abilities.xlsx",
+                    default=os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "assets",
+                                         "abilities.xlsx"))
+parser.add_argument("--no-workbook", action="store_true", help="Only benchmark on synthetic layouts")
+parser.add_argument("--cache", help="Directory of the compiled sheet cache, in the temporary directory by default")
+parser.add_argument("--sizes", type=int, nargs="*", default=[20, 50, 100, 200],
+                    help="Number of keys of each synthetic layout")
+parser.add_argument("--solvers", nargs="*", help="Solvers to run, all of them by default")
+parser.add_argument("--seconds", type=float, default=10, help="Duration of each run")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--no-memory", action="store_true", help="Skip measuring peak memory")
+arguments = parser.parse_args()
+
+problems = [] if arguments.no_workbook else Benchmark.sheet_problems(arguments.workbook,
+                                                                     cache_directory=arguments.cache)
+problems += [Benchmark.synthetic_problem(size, arguments.seed) for size in arguments.sizes]
+solvers = Benchmark.default_solvers()
+if arguments.solvers:
+    solvers = {name: solvers[name] for name in arguments.solvers}
+
+benchmark = Benchmark(problems, solvers, timedelta(seconds=arguments.seconds), arguments.seed,
+                      measure_memory=not arguments.no_memory)
+benchmark.run()
+benchmark.save(arguments.output)
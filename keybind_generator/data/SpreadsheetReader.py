@@ -1,5 +1,7 @@
-from typing import List
+import hashlib
+from typing import Dict, List
 
+import numpy
 import pandas
 import os
 
@@ -12,6 +14,9 @@ class SpreadsheetReader:
     """
     Reads in ability spreadsheets
 
+    An excel workbook is opened once, on the first read, and all of its sheets are kept. compile() further caches the
+    abilities and combinations of a pair of sheets in an npz file keyed by the workbook's contents and the sheet
+    names, so that later runs skip parsing the workbook altogether.
     """
 
     @staticmethod
@@ -24,7 +29,23 @@ class SpreadsheetReader:
         """
         return [ability_names.get_loc(entry.strip()) for entry in combination.split(">")]
 
-        pass
+    @staticmethod
+    def parse_combination_strings(ability_names: Index, combinations: List[str]) -> List[List[int]]:
+        """
+        Parses many combination strings, resolving all their ability names in one lookup
+        :param ability_names: Index of ability names
+        :param combinations: Combination strings, of ability names separated by ">"
+        :return: Ability indices of each combination
+        :raises KeyError: If an ability name isn't in the index
+        """
+        entries = [[entry.strip() for entry in combination.split(">")] for combination in combinations]
+        names = [name for entry in entries for name in entry]
+        indices = ability_names.get_indexer(names) if names else numpy.array([], dtype=int)
+        if numpy.any(indices < 0):
+            raise KeyError([name for name, index in zip(names, indices) if index < 0])
+
+        offsets = numpy.cumsum([0] + [len(entry) for entry in entries])
+        return [indices[offsets[i]:offsets[i + 1]].tolist() for i in range(len(entries))]
 
     def __init__(self, file: str):
         """
@@ -32,22 +53,43 @@ class SpreadsheetReader:
         :param file:
         """
         self.file = file
+        self.sheets: [Dict[str, DataFrame], None] = None
 
-        if os.path.splitext(file) is ".csv":
+        if os.path.splitext(file)[1] == ".csv":
             self.type = "csv"
         else:
             self.type = "excel"
 
+    def read_sheet(self, sheet_name: str = "") -> DataFrame:
+        """
+        Returns a copy of a sheet, reading the whole workbook on first use
+        :param sheet_name: Name of sheet within an excel file
+        :return:
+        """
+        if self.type == "csv":
+            return pandas.read_csv(self.file)
+        if self.sheets is None:
+            self.sheets = pandas.read_excel(self.file, sheet_name=None, dtype={"Ability Name": str, "Bind": str})
+        return self.sheets[sheet_name].copy()
+
+    def sheet_names(self) -> List[str]:
+        """
+        :return: Names of the workbook's sheets, without parsing them if the workbook hasn't been read yet
+        """
+        if self.type == "csv":
+            return [""]
+        if self.sheets is None:
+            with pandas.ExcelFile(self.file) as workbook:
+                return list(workbook.sheet_names)
+        return list(self.sheets)
+
     def read_abilities(self, sheet_name: str = "") -> DataFrame:
         """
         Returns a data frame of abilities with their priority
         :param sheet_name:
         :return:
         """
-        if self.type is "excel":
-            data = pandas.read_excel(self.file, sheet_name)
-        else:
-            data = pandas.read_csv(self.file)
+        data = self.read_sheet(sheet_name)
         data.columns = ["name", "priority", "bar", "comment"]
         return data
 
@@ -58,13 +100,10 @@ class SpreadsheetReader:
         :param sheet_name:
         :return:
         """
-        if self.type is "excel":
-            data: DataFrame = pandas.read_excel(self.file, sheet_name)
-        else:
-            data: DataFrame = pandas.read_csv(self.file)
+        data = self.read_sheet(sheet_name)
         data.columns = ["name", "priority", "ordered", "comment"]
-        data.insert(4, "indices", data["name"].apply(
-            lambda entry: self.parse_combination_string(Index(abilities["name"]), entry)))
+        data.insert(4, "indices", SpreadsheetReader.parse_combination_strings(Index(abilities["name"]),
+                                                                               list(data["name"])))
 
         return data
 
@@ -74,17 +113,128 @@ class SpreadsheetReader:
         :param sheet_name: Name of sheet within an excel file
         :return:
         """
-        if self.type is "excel":
-            data: DataFrame = pandas.read_excel(self.file, sheet_name, dtype={"Ability Name": str, "Bind": str})
-        else:
-            data: DataFrame = pandas.read_csv(self.file)
+        data = self.read_sheet(sheet_name)
         data.columns = ["ability", "bind"]
         return data
 
     def read_keyboard_layout(self, sheet_name: str = "") -> Keyboard:
         """
-        Reads a keyboard layout from a spreadsheet
+        Reads a keyboard layout from a spreadsheet, with one row of keys per line: its type (Keyboard or Mouse), its
+        comma separated keys, the offsets of keyboard rows, the penalty of mouse keys, and the modifier and its
+        penalty if any
         :param sheet_name:
         :return:
+        :raises ValueError: If the sheet sets key priorities or groups, which keyboards don't support yet
+        """
+        data = self.read_sheet(sheet_name)
+        data.columns = ["type", "keys", "priorities", "groups", "group_penalty", "x_offset", "y_offset",
+                        "mouse_penalty", "modifier", "modifier_penalty"]
+        unsupported = [column for column in ["priorities", "groups", "group_penalty"] if data[column].notna().any()]
+        if unsupported:
+            raise ValueError(f"Keyboard layout sheet %s sets %s, which are not supported yet" %
+                             (sheet_name, ", ".join(unsupported)))
+
+        keyboard = Keyboard()
+        for row in data.itertuples():
+            keys = [key.strip() for key in str(row.keys).split(",")]
+            modifier = "" if pandas.isna(row.modifier) else str(row.modifier)
+            modifier_penalty = 0 if pandas.isna(row.modifier_penalty) else float(row.modifier_penalty)
+            if str(row.type).strip().lower() == "mouse":
+                keyboard.add_mouse_keys(keys, float(row.mouse_penalty), modifier, modifier_penalty)
+            else:
+                keyboard.add_key_row(Keyboard.KeyRow(float(row.y_offset), float(row.x_offset), keys), modifier,
+                                     modifier_penalty)
+        return keyboard
+
+    def cache_key(self, *sheet_names: str) -> str:
+        """
+        :param sheet_names: Names of the sheets cached
+        :return: Hash of the file's contents and of the sheet names
+        """
+        digest = hashlib.sha256()
+        with open(self.file, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        for sheet_name in sheet_names:
+            digest.update(b"\0" + sheet_name.encode())
+        return digest.hexdigest()
+
+    def compile(self, ability_sheet: str = "", combination_sheet: str = "", cache_directory: str = None) \
+            -> (DataFrame, DataFrame):
+        """
+        Reads abilities and combinations, from the cache if this workbook and these sheets have been compiled before,
+        otherwise from the workbook, writing them to the cache
+        :param ability_sheet: Name of the ability sheet
+        :param combination_sheet: Name of the combination sheet
+        :param cache_directory: Directory of the cache files. Defaults to a .cache directory next to the workbook
+        :return: Data frames of abilities and combinations, as returned by read_abilities() and read_combinations()
+        """
+        if cache_directory is None:
+            cache_directory = os.path.join(os.path.dirname(os.path.abspath(self.file)), ".cache")
+        path = os.path.join(cache_directory, self.cache_key(ability_sheet, combination_sheet) + ".npz")
+
+        if os.path.exists(path):
+            with numpy.load(path) as data:
+                arrays = {key: data[key] for key in data.files}
+            abilities = SpreadsheetReader.arrays_frame(arrays, "abilities")
+            combinations = SpreadsheetReader.arrays_frame(arrays, "combinations")
+            offsets = arrays["combination_offsets"]
+            indices = arrays["combination_indices"]
+            combinations.insert(4, "indices", [indices[offsets[i]:offsets[i + 1]].tolist()
+                                               for i in range(len(offsets) - 1)])
+            return abilities, combinations
+
+        abilities = self.read_abilities(ability_sheet)
+        combinations = self.read_combinations(abilities, combination_sheet)
+
+        arrays = SpreadsheetReader.frame_arrays(abilities, "abilities")
+        arrays.update(SpreadsheetReader.frame_arrays(combinations.drop(columns="indices"), "combinations"))
+        arrays["combination_offsets"] = numpy.cumsum([0] + [len(entry) for entry in combinations["indices"]])
+        arrays["combination_indices"] = numpy.array([index for entry in combinations["indices"] for index in entry],
+                                                    dtype=int)
+        os.makedirs(cache_directory, exist_ok=True)
+        # Written next to the destination and moved over it, so concurrent runs never read a partial file
+        temporary_path = path + "." + str(os.getpid()) + ".tmp"
+        with open(temporary_path, "wb") as file:
+            numpy.savez(file, **arrays)
+        os.replace(temporary_path, path)
+        return abilities, combinations
+
+    @staticmethod
+    def frame_arrays(data: DataFrame, prefix: str) -> Dict[str, numpy.ndarray]:
+        """
+        Converts a data frame to arrays that can be saved without pickling: numeric columns as they are, and other
+        columns as strings along with a mask of missing values
+        :param data: Data frame
+        :param prefix: Prefix of the arrays' names
+        :return: Arrays, by name
+        """
+        arrays = {prefix + "_columns": numpy.array(data.columns, dtype=str)}
+        for position, column in enumerate(data.columns):
+            values = data[column]
+            name = prefix + "_" + str(position)
+            if pandas.api.types.is_numeric_dtype(values):
+                arrays[name] = values.to_numpy()
+            else:
+                arrays[name + "_missing"] = values.isna().to_numpy()
+                arrays[name] = numpy.array(values.fillna("").astype(str), dtype=str)
+        return arrays
+
+    @staticmethod
+    def arrays_frame(arrays: Dict[str, numpy.ndarray], prefix: str) -> DataFrame:
+        """
+        Converts arrays returned by frame_arrays() back to a data frame
+        :param arrays: Arrays, by name
+        :param prefix: Prefix of the arrays' names
+        :return: Data frame
         """
-        pass
+        columns = {}
+        for position, column in enumerate(arrays[prefix + "_columns"]):
+            name = prefix + "_" + str(position)
+            if name + "_missing" in arrays:
+                values = pandas.Series(arrays[name], dtype="str")
+                values[arrays[name + "_missing"]] = numpy.nan
+                columns[str(column)] = values
+            else:
+                columns[str(column)] = arrays[name]
+        return DataFrame(columns)
@@ -0,0 +1,113 @@
+import time as clock
+from datetime import timedelta
+
+
+class Budget:
+    """
+    Limits on how long a solver runs: wall clock time, number of iterations, a target loss, and a number of iterations
+    without improvement (patience). The run stops at the first limit reached.
+
+    The clock is only read every so many iterations, that number being adjusted from the measured iteration rate so
+    that it is read about once per check interval, and never much after the deadline. The number of iterations
+    between reads at most doubles from one read to the next.
+
+    A budget can also be cancelled, from any thread, stopping the run after the current step.
+    """
+
+    def __init__(self, time: timedelta = None, iterations: int = None, target_loss: float = None,
+                 patience: int = None, check_interval: timedelta = timedelta(milliseconds=10)):
+        """
+        :param time: Wall clock time to run for
+        :param iterations: Number of iterations to run
+        :param target_loss: Loss at or below which the run stops
+        :param patience: Number of iterations without a better loss after which the run stops
+        :param check_interval: Time between clock reads
+        """
+        self.time = time
+        self.iterations = iterations
+        self.target_loss = target_loss
+        self.patience = patience
+        self.check_interval = check_interval.total_seconds()
+
+        self.start_iter = 0
+        self.deadline = None
+        self.best_loss = None
+        self.improved_iter = 0
+        self.checked_iter = 0
+        self.checked_time = 0
+        self.next_check_iter = 0
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """
+        Stops the run using this budget after its current step
+        :return:
+        """
+        self.cancelled = True
+
+    def start(self, solver) -> None:
+        """
+        Starts counting from the solver's current state
+        :param solver: Solver about to run
+        :return:
+        """
+        now = clock.perf_counter()
+        self.start_iter = solver.num_iter
+        self.deadline = None if self.time is None else now + self.time.total_seconds()
+        self.best_loss = solver.best_loss
+        self.improved_iter = solver.num_iter
+        self.checked_iter = solver.num_iter
+        self.checked_time = now
+        self.next_check_iter = solver.num_iter
+
+    def iterations_run(self, solver) -> int:
+        return solver.num_iter - self.start_iter
+
+    def remaining_iterations(self, solver) -> [int, None]:
+        """
+        :return: Number of iterations left in the budget, None if unlimited
+        """
+        if self.iterations is None:
+            return None
+        return max(0, self.iterations - self.iterations_run(solver))
+
+    def exhausted(self, solver) -> bool:
+        """
+        :param solver: Running solver
+        :return: True if any limit has been reached, or the budget was cancelled
+        """
+        if self.cancelled:
+            return True
+        if self.iterations is not None and self.iterations_run(solver) >= self.iterations:
+            return True
+        if self.target_loss is not None and solver.best_loss <= self.target_loss:
+            return True
+        if self.patience is not None:
+            if solver.best_loss < self.best_loss:
+                self.best_loss = solver.best_loss
+                self.improved_iter = solver.num_iter
+            elif solver.num_iter - self.improved_iter >= self.patience:
+                return True
+        if self.deadline is not None and solver.num_iter >= self.next_check_iter:
+            return self.check_clock(solver.num_iter)
+        return False
+
+    def check_clock(self, num_iter: int) -> bool:
+        """
+        Reads the clock, and schedules the next read
+        :param num_iter: Solver's iteration count
+        :return: True if the deadline has passed
+        """
+        now = clock.perf_counter()
+        if now >= self.deadline:
+            return True
+        elapsed = now - self.checked_time
+        iterations = num_iter - self.checked_iter
+        rate = iterations / elapsed if elapsed > 0 else 0
+        self.checked_iter = num_iter
+        self.checked_time = now
+        # Read again after about a check interval's worth of iterations, without passing the deadline by much. The
+        # gap between reads at most doubles, as iterations can get much slower than a burst of fast ones suggests
+        gap = min(int(rate * min(self.check_interval, self.deadline - now)), 2 * iterations)
+        self.next_check_iter = num_iter + max(1, gap)
+        return False
@@ -0,0 +1,117 @@
+import os
+from typing import Dict
+
+import numpy
+
+
+class Checkpoint:
+    """
+    Periodic checkpointing of a solver's state to an npz file, so that long searches can be resumed.
+
+    Solvers used with checkpoints implement get_state(), returning their state as a dictionary of arrays, and
+    set_state(state), restoring it. Files are written next to the destination and then moved over it, so an
+    interrupted write never leaves a corrupt checkpoint behind.
+    """
+
+    def __init__(self, path: str, interval: int):
+        """
+        :param path: File the checkpoint is written to
+        :param interval: Number of iterations between checkpoints
+        """
+        self.path = path
+        self.interval = interval
+        self.last_iter = None
+
+    @staticmethod
+    def check_solver(solver) -> None:
+        """
+        Checks that a solver supports checkpoints
+        :raises ValueError: If the solver doesn't implement get_state() and set_state()
+        """
+        if not hasattr(solver, "get_state") or not hasattr(solver, "set_state"):
+            raise ValueError(f"%s doesn't support checkpoints" % type(solver).__name__)
+
+    def update(self, solver) -> bool:
+        """
+        Writes a checkpoint if at least an interval's worth of iterations have run since the last one
+        :param solver: Solver to checkpoint
+        :return: True if a checkpoint was written
+        """
+        if self.last_iter is None:
+            self.last_iter = solver.num_iter
+        if solver.num_iter - self.last_iter < self.interval:
+            return False
+        self.save(solver)
+        return True
+
+    def save(self, solver) -> None:
+        Checkpoint.write(self.path, solver.get_state())
+        self.last_iter = solver.num_iter
+
+    @staticmethod
+    def write(path: str, state: Dict[str, numpy.ndarray]) -> None:
+        """
+        Atomically writes arrays to an npz file
+        :param path: Destination file
+        :param state: Arrays to write
+        :return:
+        """
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            numpy.savez(file, **state)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def read(path: str) -> Dict[str, numpy.ndarray]:
+        """
+        :param path: Checkpoint file
+        :return: Arrays in the file
+        """
+        with numpy.load(path) as data:
+            return {key: data[key] for key in data.files}
+
+    @staticmethod
+    def random_state() -> Dict[str, numpy.ndarray]:
+        """
+        :return: State of the global numpy random generator, as arrays
+        """
+        _, key, position, has_gauss, cached_gaussian = numpy.random.get_state()
+        return {"random_key": key, "random_position": numpy.array(position),
+                "random_has_gauss": numpy.array(has_gauss), "random_cached_gaussian": numpy.array(cached_gaussian)}
+
+    @staticmethod
+    def set_random_state(state: Dict[str, numpy.ndarray]) -> None:
+        """
+        Restores the global numpy random generator from a state returned by random_state()
+        :param state: Arrays of the state, possibly along with other arrays
+        :return:
+        """
+        numpy.random.set_state(("MT19937", state["random_key"], int(state["random_position"]),
+                                int(state["random_has_gauss"]), float(state["random_cached_gaussian"])))
+
+    @staticmethod
+    def search_state(solver, assignments: [numpy.ndarray, None]) -> Dict[str, numpy.ndarray]:
+        """
+        :param solver: Solver
+        :param assignments: Assignments of the solver's best binding, None if there is none yet
+        :return: Arrays of the state every solver shares: best binding and loss, iteration count and random state
+        """
+        state = {"best_loss": numpy.array(solver.best_loss), "num_iter": numpy.array(solver.num_iter),
+                 "best_assignments": numpy.array([] if assignments is None else assignments, dtype=int),
+                 "has_best": numpy.array(assignments is not None),
+                 "num_abilities": numpy.array(solver.abilities.shape[0]), "num_keys": numpy.array(solver.graph.size)}
+        state.update(Checkpoint.random_state())
+        return state
+
+    @staticmethod
+    def check_problem(solver, state: Dict[str, numpy.ndarray]) -> None:
+        """
+        Checks that a checkpoint was written by a solver for a problem of the same size
+        :raises ValueError: If the sizes differ
+        """
+        if int(state["num_abilities"]) != solver.abilities.shape[0] or int(state["num_keys"]) != solver.graph.size:
+            raise ValueError(f"Checkpoint is for %d abilities on %d keys, not %d abilities on %d keys" %
+                             (int(state["num_abilities"]), int(state["num_keys"]), solver.abilities.shape[0],
+                              solver.graph.size))
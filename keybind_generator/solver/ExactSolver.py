@@ -0,0 +1,213 @@
+from datetime import timedelta
+from typing import List
+
+import numpy
+from pandas import DataFrame
+from scipy.optimize import linear_sum_assignment
+
+from keybind_generator.solver.Budget import Budget
+from keybind_generator.solver.GreedySolver import GreedySolver
+from keybind_generator.solver.Solver import Solver
+from keybind_generator.util.BindingProblem import BindingProblem
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.KeyBinding import KeyBinding
+
+
+class ExactSolver(Solver):
+    """
+    Exact solver. Without the combination term the loss is a linear assignment problem, solved directly with the
+    Hungarian algorithm. With it, a depth first branch and bound places abilities one at a time, bounding each partial
+    binding below by a linear assignment relaxation: segments to abilities already placed are linear in the key of
+    the ability being placed, and segments between two unplaced abilities are bounded by half their weight times the
+    shortest distance out of (or into) each endpoint's key (Gilmore-Lawler). Stopped early, it reports the gap between
+    the best binding found and the lowest bound of the partial bindings left to explore.
+    """
+
+    def __init__(self, graph: Graph, abilities: DataFrame, combinations: DataFrame, home_node_indices: List[int],
+                 individual_coefficient: float = 1, combination_coefficient: float = 1,
+                 initial_assignments: List[int] = None):
+        """
+        :param initial_assignments: Binding to start from as the best known one. Built by beam search if not provided
+        """
+        self.best_assignments: [numpy.ndarray, None] = None
+        self.best_loss: float = numpy.inf
+        self.num_iter = 0
+
+        self.graph = graph
+        self.abilities = abilities
+        self.combinations = combinations
+        self.home_node_indices = home_node_indices
+
+        self.individual_coefficient = individual_coefficient
+        self.combination_coefficient = combination_coefficient
+
+        self.problem = BindingProblem(graph, abilities, combinations, home_node_indices,
+                                      individual_coefficient=individual_coefficient,
+                                      combination_coefficient=combination_coefficient)
+        self.engine = engine = self.problem.engine
+        self.num_abilities = abilities.shape[0]
+
+        self.constant = engine.individual_coefficient * engine.node_priority_offset
+        self.linear_costs = engine.linear_costs()
+
+        # Segments joining an ability to itself are in the linear costs, the others make up the quadratic part
+        weight = engine.combination_coefficient * engine.segment_weight
+        loops = engine.segment_from == engine.segment_to
+        self.segment_from = engine.segment_from[~loops]
+        self.segment_to = engine.segment_to[~loops]
+        self.segment_weight = weight[~loops]
+
+        # Abilities in the most combinations are placed first, so that bounds tighten quickly
+        involvement = numpy.zeros(self.num_abilities)
+        numpy.add.at(involvement, self.segment_from, self.segment_weight)
+        numpy.add.at(involvement, self.segment_to, self.segment_weight)
+        self.order = numpy.lexsort((engine.ability_priority, -involvement))
+
+        # Partial bindings left to explore, as (lower bound, number placed, loss of the placed part, assignments)
+        self.stack = []
+
+        if initial_assignments is None:
+            initial_assignments = GreedySolver(graph, abilities, combinations, home_node_indices,
+                                               individual_coefficient, combination_coefficient,
+                                               beam_width=8).solve()[1].assignments
+        self.update_best(numpy.asarray(initial_assignments, dtype=int))
+
+        if combination_coefficient == 0 or not len(self.segment_weight):
+            _, keys = linear_sum_assignment(self.linear_costs)
+            self.update_best(keys)
+        else:
+            self.stack.append((-numpy.inf, 0, self.constant, numpy.full(self.num_abilities, -1, dtype=int)))
+
+    @property
+    def best_binding(self) -> [KeyBinding, None]:
+        if self.best_assignments is None:
+            return None
+        return KeyBinding.from_problem(self.problem, self.best_assignments)
+
+    @property
+    def optimal(self) -> bool:
+        """
+        :return: True once the best binding is proven optimal
+        """
+        return not self.stack
+
+    def finished(self) -> bool:
+        return self.optimal
+
+    @property
+    def lower_bound(self) -> float:
+        """
+        :return: Lowest loss any binding can have, as far as the search has shown so far. Entries of the stack are
+        only pruned once popped, so their bounds can exceed the best loss, which then is the lower bound
+        """
+        return min([self.best_loss] + [entry[0] for entry in self.stack])
+
+    @property
+    def gap(self) -> float:
+        """
+        :return: Gap between the best loss and the lower bound, relative to the best loss unless it is 0, in which
+        case the absolute gap. 0 once the best binding is proven optimal
+        """
+        gap = self.best_loss - self.lower_bound
+        if self.optimal or gap <= 0:
+            return 0
+        if numpy.isinf(self.best_loss):
+            return float("inf")
+        return gap / abs(self.best_loss) if self.best_loss != 0 else gap
+
+    def update_best(self, assignments: numpy.ndarray) -> None:
+        loss = self.engine.loss(assignments)
+        if loss < self.best_loss:
+            self.best_loss = loss
+            self.best_assignments = assignments.copy()
+
+    def placement_costs(self, assignments: numpy.ndarray) -> (numpy.ndarray, numpy.ndarray):
+        """
+        Bounds the cost of placing every unplaced ability on every key, given a partial binding
+        :param assignments: Key of each ability, -1 where unplaced
+        :return: (number of abilities x number of keys) arrays of the exact cost of the ability's individual term and
+        segments to placed abilities, and of the lower bound on its share of segments to other unplaced abilities
+        """
+        adjacency = self.engine.adjacency
+        exact = self.linear_costs.copy()
+        shared = numpy.zeros_like(exact)
+
+        from_nodes = assignments[self.segment_from]
+        to_nodes = assignments[self.segment_to]
+        from_placed = from_nodes >= 0
+        to_placed = to_nodes >= 0
+
+        entering = ~from_placed & to_placed
+        numpy.add.at(exact, self.segment_from[entering],
+                     self.segment_weight[entering, None] * adjacency[:, to_nodes[entering]].T)
+        leaving = from_placed & ~to_placed
+        numpy.add.at(exact, self.segment_to[leaving],
+                     self.segment_weight[leaving, None] * adjacency[from_nodes[leaving]])
+
+        unplaced = ~from_placed & ~to_placed
+        if numpy.any(unplaced):
+            # Shortest distance out of and into every key, to and from the other free keys
+            free = numpy.ones(self.graph.size, dtype=bool)
+            free[assignments[assignments >= 0]] = False
+            distances = numpy.where(free[None, :], adjacency, numpy.inf)
+            numpy.fill_diagonal(distances, numpy.inf)
+            out_distance = numpy.min(distances, axis=1)
+            distances = numpy.where(free[:, None], adjacency, numpy.inf)
+            numpy.fill_diagonal(distances, numpy.inf)
+            in_distance = numpy.min(distances, axis=0)
+
+            half_weight = self.segment_weight[unplaced, None] / 2
+            numpy.add.at(shared, self.segment_from[unplaced], half_weight * out_distance[None, :])
+            numpy.add.at(shared, self.segment_to[unplaced], half_weight * in_distance[None, :])
+        return exact, shared
+
+    def run_iter(self) -> float:
+        """
+        Explores the most recently found partial binding: bounds it, and either prunes it or branches on the key of
+        the next ability
+        :return: Lower bound of the partial binding
+        """
+        if not self.stack:
+            return self.best_loss
+        parent_bound, depth, fixed, assignments = self.stack.pop()
+        self.num_iter = self.num_iter + 1
+
+        if parent_bound >= self.best_loss:
+            return parent_bound
+        if depth == self.num_abilities:
+            self.update_best(assignments)
+            return fixed
+
+        exact, shared = self.placement_costs(assignments)
+        unplaced = self.order[depth:]
+        free = numpy.flatnonzero(~numpy.isin(numpy.arange(self.graph.size), assignments[assignments >= 0]))
+        relaxation = (exact + shared)[numpy.ix_(unplaced, free)]
+        rows, columns = linear_sum_assignment(relaxation)
+        bound = max(parent_bound, fixed + relaxation[rows, columns].sum())
+
+        # The relaxation's assignment is a complete binding as well, and often a good one
+        candidate = assignments.copy()
+        candidate[unplaced[rows]] = free[columns]
+        self.update_best(candidate)
+
+        if bound < self.best_loss:
+            ability = self.order[depth]
+            child_fixed = fixed + exact[ability, free]
+            child_bound = numpy.maximum(bound, child_fixed)
+            # Pushed worst first, so that the most promising key is explored next
+            for position in numpy.argsort(-(child_fixed + shared[ability, free]), kind="stable"):
+                if child_bound[position] < self.best_loss:
+                    child = assignments.copy()
+                    child[ability] = free[position]
+                    self.stack.append((child_bound[position], depth + 1, child_fixed[position], child))
+
+        return bound
+
+    def solve(self, time_limit: timedelta = None) -> (float, KeyBinding, float):
+        """
+        Searches until the best binding is proven optimal, or until the time limit
+        :param time_limit: Duration to search for at most, unlimited if not provided
+        :return: Best loss, best binding, and relative optimality gap (0 if proven optimal)
+        """
+        self.run(Budget(time=time_limit))
+        return self.best_loss, self.best_binding, self.gap
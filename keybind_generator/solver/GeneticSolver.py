@@ -0,0 +1,258 @@
+from typing import List, Tuple
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.Budget import Budget
+from keybind_generator.solver.ParallelRunner import ParallelRunner
+from keybind_generator.solver.Solver import Solver
+from keybind_generator.util.BindingProblem import BindingProblem
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.KeyBinding import KeyBinding
+
+
+class GeneticSolver(Solver):
+    """
+    Genetic solver over permutations of the keys, the first entries of which are the keys bound to each ability.
+    Every generation keeps the best individuals, and breeds the rest of the population from parents picked by
+    tournament, with order (OX) or partially mapped (PMX) crossover and swap mutation. The whole population is scored
+    in one batched loss evaluation. Several island populations can be evolved in separate processes, exchanging their
+    best individuals periodically.
+    """
+
+    def __init__(self, graph: Graph, abilities: DataFrame, combinations: DataFrame, home_node_indices: List[int],
+                 individual_coefficient: float = 1, combination_coefficient: float = 1, population_size: int = 100,
+                 crossover: str = "order", crossover_probability: float = .9, mutation_probability: float = .2,
+                 tournament_size: int = 3, elite: int = 2, initial_assignments: List[int] = None):
+        """
+        :param population_size: Number of individuals per population
+        :param crossover: Either "order" (OX) or "pmx" (partially mapped crossover)
+        :param crossover_probability: Probability of a child being bred from two parents, rather than copied from one
+        :param mutation_probability: Probability of a child having the keys of an ability and of another ability or
+        free key swapped
+        :param tournament_size: Number of individuals competing for each parent
+        :param elite: Number of best individuals carried over to the next generation unchanged
+        :param initial_assignments: Binding included in the initial population, which is otherwise random
+        """
+        self.best_binding: [KeyBinding, None] = None
+        self.best_loss: float = numpy.inf
+        self.num_iter = 0
+
+        self.graph = graph
+        self.abilities = abilities
+        self.combinations = combinations
+        self.home_node_indices = home_node_indices
+
+        self.individual_coefficient = individual_coefficient
+        self.combination_coefficient = combination_coefficient
+        self.population_size = population_size
+        self.crossover = {"order": GeneticSolver.order_crossover,
+                          "pmx": GeneticSolver.pmx_crossover}[crossover]
+        self.crossover_probability = crossover_probability
+        self.mutation_probability = mutation_probability
+        self.tournament_size = tournament_size
+        self.elite = elite
+
+        self.problem = BindingProblem(graph, abilities, combinations, home_node_indices,
+                                      individual_coefficient=individual_coefficient,
+                                      combination_coefficient=combination_coefficient)
+        self.engine = self.problem.engine
+        self.num_abilities = abilities.shape[0]
+
+        self.population = numpy.argsort(numpy.random.random((population_size, graph.size)), axis=1)
+        if initial_assignments is not None:
+            initial_assignments = numpy.asarray(initial_assignments, dtype=int)
+            free = numpy.setdiff1d(numpy.arange(graph.size), initial_assignments)
+            self.population[0] = numpy.concatenate([initial_assignments, free])
+        self.losses = self.evaluate(self.population)
+        self.update_best()
+
+    @staticmethod
+    def cut_points(num_children: int, size: int) -> numpy.ndarray:
+        """
+        :return: (number of children x size) mask of the segment each child inherits from its first parent
+        """
+        cuts = numpy.sort(numpy.random.randint(0, size + 1, (num_children, 2)), axis=1)
+        positions = numpy.arange(size)[None, :]
+        return (positions >= cuts[:, :1]) & (positions < cuts[:, 1:])
+
+    @staticmethod
+    def order_crossover(first: numpy.ndarray, second: numpy.ndarray) -> numpy.ndarray:
+        """
+        Order crossover: each child keeps a random segment of its first parent, and the remaining keys in the order
+        they appear in its second parent
+        :param first: (number of children x size) permutations of the first parents
+        :param second: (number of children x size) permutations of the second parents
+        :return: (number of children x size) permutations of the children
+        """
+        num_children, size = first.shape
+        segment = GeneticSolver.cut_points(num_children, size)
+        rows = numpy.repeat(numpy.arange(num_children), size).reshape(num_children, size)
+
+        taken = numpy.zeros((num_children, size), dtype=bool)
+        taken[rows[segment], first[segment]] = True
+        # Every row has as many keys left in the second parent as positions outside the segment
+        children = first.copy()
+        children[~segment] = second[~taken[rows, second]]
+        return children
+
+    @staticmethod
+    def pmx_crossover(first: numpy.ndarray, second: numpy.ndarray) -> numpy.ndarray:
+        """
+        Partially mapped crossover: each child keeps a random segment of its first parent, and the keys of its second
+        parent elsewhere. Keys of the second parent's segment that are displaced are put where the segment maps them
+        :param first: (number of children x size) permutations of the first parents
+        :param second: (number of children x size) permutations of the second parents
+        :return: (number of children x size) permutations of the children
+        """
+        num_children, size = first.shape
+        segment = GeneticSolver.cut_points(num_children, size)
+        rows = numpy.repeat(numpy.arange(num_children), size).reshape(num_children, size)
+
+        children = second.copy()
+        children[segment] = first[segment]
+        in_segment = numpy.zeros((num_children, size), dtype=bool)
+        in_segment[rows[segment], first[segment]] = True
+        second_position = numpy.empty_like(second)
+        second_position[rows, second] = numpy.arange(size)[None, :]
+
+        # Keys of the second parent's segment missing from the first parent's follow the mapping out of the segment
+        displaced = segment & ~in_segment[rows, second]
+        displaced_rows = rows[displaced]
+        keys = second[displaced]
+        positions = numpy.flatnonzero(displaced.ravel()) % size
+        active = numpy.ones(len(keys), dtype=bool)
+        while numpy.any(active):
+            positions[active] = second_position[displaced_rows[active], first[displaced_rows[active],
+                                                                              positions[active]]]
+            active = segment[displaced_rows, positions]
+        children[displaced_rows, positions] = keys
+        return children
+
+    def evaluate(self, population: numpy.ndarray) -> numpy.ndarray:
+        """
+        :param population: (number of individuals x number of keys) permutations
+        :return: Loss of each individual, computed in one batched call
+        """
+        return self.engine.batch_loss(population[:, :self.num_abilities])
+
+    def mutate(self, population: numpy.ndarray) -> None:
+        """
+        Swaps the key of a random ability with that of another ability or a free key, in a random subset of the
+        population
+        :param population: (number of individuals x number of keys) permutations, modified in place
+        :return:
+        """
+        rows = numpy.flatnonzero(numpy.random.random(len(population)) < self.mutation_probability)
+        first = numpy.random.randint(0, self.num_abilities, len(rows))
+        second = numpy.random.randint(0, self.graph.size, len(rows))
+        population[rows, first], population[rows, second] = population[rows, second], population[rows, first]
+
+    def select(self, num_parents: int) -> numpy.ndarray:
+        """
+        Tournament selection
+        :param num_parents: Number of parents to pick
+        :return: Index of each parent in the population
+        """
+        entrants = numpy.random.randint(0, len(self.population), (num_parents, self.tournament_size))
+        return entrants[numpy.arange(num_parents), numpy.argmin(self.losses[entrants], axis=1)]
+
+    def update_best(self) -> None:
+        best = numpy.argmin(self.losses)
+        if self.losses[best] < self.best_loss:
+            self.best_loss = self.losses[best]
+            self.best_binding = self.make_binding(self.population[best, :self.num_abilities])
+
+    def run_iter(self) -> float:
+        """
+        Breeds one generation
+        :return: Best loss of the generation
+        """
+        num_children = self.population_size - self.elite
+        elite = numpy.argsort(self.losses, kind="stable")[:self.elite]
+
+        first = self.population[self.select(num_children)]
+        second = self.population[self.select(num_children)]
+        crossed = numpy.random.random(num_children) < self.crossover_probability
+        children = first.copy()
+        if numpy.any(crossed):
+            children[crossed] = self.crossover(first[crossed], second[crossed])
+        self.mutate(children)
+
+        self.population = numpy.concatenate([self.population[elite], children])
+        self.losses = numpy.concatenate([self.losses[elite], self.evaluate(children)])
+        self.update_best()
+        self.num_iter = self.num_iter + 1
+
+        return numpy.min(self.losses)
+
+    def make_binding(self, assignments: List[int]) -> KeyBinding:
+        """
+        :param assignments: Node index of each ability
+        :return: Key binding for this solver's problem
+        """
+        return KeyBinding.from_problem(self.problem, assignments)
+
+    def make_worker(self):
+        """
+        :return: Solver for the same problem, to evolve islands in a worker process
+        """
+        worker = GeneticSolver.__new__(GeneticSolver)
+        worker.__dict__.update(self.__dict__)
+        worker.best_binding = None
+        worker.best_loss = numpy.inf
+        worker.num_iter = 0
+        return worker
+
+    def make_island(self) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        :return: New random population and its losses
+        """
+        population = numpy.argsort(numpy.random.random((self.population_size, self.graph.size)), axis=1)
+        return population, self.evaluate(population)
+
+    def get_island(self) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        return self.population, self.losses
+
+    def set_island(self, island: Tuple[numpy.ndarray, numpy.ndarray]) -> None:
+        self.population, self.losses = island
+
+    def migrate(self, islands: List[Tuple[numpy.ndarray, numpy.ndarray]], migration_size: int) \
+            -> List[Tuple[numpy.ndarray, numpy.ndarray]]:
+        """
+        Copies the best individuals of each island over the worst individuals of the next island, in a ring
+        :param islands: Population and losses of each island
+        :param migration_size: Number of individuals each island sends
+        :return: Population and losses of each island after migration
+        """
+        migrants = [(population[numpy.argsort(losses, kind="stable")[:migration_size]],
+                     numpy.sort(losses)[:migration_size]) for population, losses in islands]
+        migrated = []
+        for index, (population, losses) in enumerate(islands):
+            population, losses = population.copy(), losses.copy()
+            worst = numpy.argsort(losses, kind="stable")[len(losses) - migration_size:]
+            population[worst], losses[worst] = migrants[index - 1]
+            migrated.append((population, losses))
+        return migrated
+
+    def do_num_iter(self, num_iterations: int, num_islands: int = 1, migration_interval: int = 10,
+                    migration_size: int = 2, seed: int = None) -> (float, KeyBinding):
+        """
+        Breeds n generations
+        :param num_iterations: Number of generations to breed, on every island
+        :param num_islands: Number of island populations, each evolved in its own process. This solver's population
+        is the first island
+        :param migration_interval: Number of generations between migrations
+        :param migration_size: Number of individuals each island sends to the next on migration
+        :param seed: Seed for the islands' random streams, when running on several processes
+        :return:
+        """
+        if num_islands > 1:
+            islands = [self.get_island()] + [self.make_island() for _ in range(num_islands - 1)]
+            islands = ParallelRunner(num_islands, seed).run_islands(self, islands, num_iterations,
+                                                                    migration_interval, migration_size)
+            self.set_island(islands[0])
+            return self.best_loss, self.best_binding
+
+        self.run(Budget(iterations=num_iterations), progress=True)
+        return self.best_loss, self.best_binding
@@ -0,0 +1,123 @@
+from typing import List
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.Solver import Solver
+from keybind_generator.util.BindingProblem import BindingProblem
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.KeyBinding import KeyBinding
+
+
+class GreedySolver(Solver):
+    """
+    Greedy (beam search) solver: assign abilities from most to least important, each to the free key with the lowest
+    marginal cost, i.e. its individual term plus the combination segments joining it to abilities already placed.
+    With a beam width above 1, the best partial bindings are kept at each step instead of just one.
+
+    Importance follows the loss, which divides each ability's terms by its priority: priority 1 is the most important,
+    so abilities are placed in descending order of weight (1 / priority), i.e. ascending order of priority number.
+    """
+
+    def __init__(self, graph: Graph, abilities: DataFrame, combinations: DataFrame, home_node_indices: List[int],
+                 individual_coefficient: float = 1, combination_coefficient: float = 1, beam_width: int = 1,
+                 noise: float = 0):
+        """
+        :param beam_width: Number of partial bindings kept at each step
+        :param noise: Scale of the random noise added to marginal costs, relative to their spread. With noise, every
+        iteration builds a different binding (randomized greedy); without it, every iteration builds the same one
+        """
+        self.best_binding: [KeyBinding, None] = None
+        self.best_loss: float = numpy.inf
+        self.num_iter = 0
+
+        self.graph = graph
+        self.abilities = abilities
+        self.combinations = combinations
+        self.home_node_indices = home_node_indices
+
+        self.individual_coefficient = individual_coefficient
+        self.combination_coefficient = combination_coefficient
+        self.beam_width = beam_width
+        self.noise = noise
+
+        self.problem = BindingProblem(graph, abilities, combinations, home_node_indices,
+                                      individual_coefficient=individual_coefficient,
+                                      combination_coefficient=combination_coefficient)
+        self.engine = self.problem.engine
+
+        # Highest weight, i.e. lowest priority number, is the most important, and gets placed first
+        self.order = numpy.argsort(self.engine.ability_priority, kind="stable")
+
+    def marginal_costs(self, ability: int, assignments: numpy.ndarray) -> numpy.ndarray:
+        """
+        Scores every key for an ability, given partial bindings
+        :param ability: Index of the ability to place
+        :param assignments: (number of partial bindings x number of abilities) array of keys, -1 where unassigned
+        :return: (number of partial bindings x number of keys) array of the cost of placing the ability on each key
+        """
+        engine = self.engine
+        individual = engine.individual_coefficient * engine.home_distance * engine.ability_weight[ability]
+        costs = numpy.tile(individual, (len(assignments), 1))
+
+        segments = engine.ability_segments[ability]
+        if len(segments):
+            segment_from = engine.segment_from[segments]
+            segment_to = engine.segment_to[segments]
+            # The ability's partner in each segment, and that partner's key in each partial binding
+            partners = numpy.where(segment_from == ability, segment_to, segment_from)
+            partner_nodes = assignments[:, partners]
+            placed = (partner_nodes >= 0) & (partners != ability)[None, :]
+            partner_nodes = numpy.maximum(partner_nodes, 0)
+
+            # Distance from every key to the partner's key, in the segment's direction
+            lengths = numpy.where((segment_from == ability)[None, :, None],
+                                  engine.adjacency.T[partner_nodes], engine.adjacency[partner_nodes])
+            weights = placed * engine.segment_weight[segments][None, :]
+            costs = costs + engine.combination_coefficient * numpy.einsum("bsk,bs->bk", lengths, weights)
+        return costs
+
+    def solve(self) -> (float, KeyBinding):
+        """
+        Builds a binding
+        :return: Loss and binding
+        """
+        num_keys = self.graph.size
+        assignments = numpy.full((1, self.problem.num_abilities), -1, dtype=int)
+        used = numpy.zeros((1, num_keys), dtype=bool)
+        costs = numpy.zeros(1)
+
+        for ability in self.order:
+            candidate_costs = costs[:, None] + self.marginal_costs(ability, assignments)
+            if self.noise:
+                spread = numpy.std(candidate_costs[~used]) if numpy.any(~used) else 0
+                candidate_costs = candidate_costs + self.noise * spread * numpy.random.random(candidate_costs.shape)
+            candidate_costs[used] = numpy.inf
+
+            flat = candidate_costs.ravel()
+            width = min(self.beam_width, numpy.count_nonzero(numpy.isfinite(flat)))
+            best = numpy.argpartition(flat, width - 1)[:width] if width < len(flat) else numpy.arange(len(flat))
+            best = best[numpy.argsort(flat[best], kind="stable")][:width]
+            beams, keys = numpy.divmod(best, num_keys)
+
+            assignments = assignments[beams]
+            assignments[:, ability] = keys
+            used = used[beams]
+            used[numpy.arange(width), keys] = True
+            costs = flat[best]
+
+        losses = self.engine.batch_loss(assignments)
+        best = numpy.argmin(losses)
+        return losses[best], KeyBinding.from_problem(self.problem, assignments[best])
+
+    def run_iter(self) -> (float, KeyBinding):
+        """
+        Builds a binding, keeping it if it is the best so far
+        :return:
+        """
+        loss, binding = self.solve()
+        if loss < self.best_loss:
+            self.best_loss = loss
+            self.best_binding = binding
+        self.num_iter = self.num_iter + 1
+        return loss, binding
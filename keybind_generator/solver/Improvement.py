@@ -0,0 +1,36 @@
+import numpy
+
+from keybind_generator.util.KeyBinding import KeyBinding
+
+
+class Improvement:
+    """
+    Event of a solver finding a better binding, as streamed by Solver.improvements()
+    """
+
+    def __init__(self, num_iter: int, seconds: float, best_loss: float, binding: KeyBinding, final: bool = False):
+        """
+        :param num_iter: Solver's iteration count when the event was emitted
+        :param seconds: Time since the start of the run
+        :param best_loss: Best loss found so far
+        :param binding: Best binding found so far
+        :param final: True for the last event of the run, emitted once the run has stopped
+        """
+        self.num_iter = num_iter
+        self.seconds = seconds
+        self.best_loss = best_loss
+        self.binding = binding
+        # Snapshot, unaffected by whatever the solver does next
+        self.assignments = numpy.array(binding.assignments, dtype=int)
+        self.final = final
+
+    def to_dict(self) -> dict:
+        """
+        :return: Event as plain values, e.g. to send as JSON
+        """
+        return {"num_iter": self.num_iter, "seconds": self.seconds, "best_loss": self.best_loss,
+                "assignments": self.assignments.tolist(), "final": self.final}
+
+    def __repr__(self):
+        return f"Improvement(num_iter=%d, seconds=%.3f, best_loss=%f%s)" % \
+               (self.num_iter, self.seconds, self.best_loss, ", final" if self.final else "")
@@ -1,66 +1,68 @@
-from typing import List
+import time as clock
+from typing import List, Tuple, Union, Callable
 
 import numpy
-import progressbar
 
 from pandas import DataFrame
 
+from keybind_generator.solver.Budget import Budget
+from keybind_generator.solver.Checkpoint import Checkpoint
+from keybind_generator.solver.ParallelRunner import ParallelRunner
+from keybind_generator.solver.Solver import Solver
+from keybind_generator.solver.TreeStore import TreeStore
+from keybind_generator.util.BindingProblem import BindingProblem
 from keybind_generator.util.Graph import Graph
 from keybind_generator.util.KeyBinding import KeyBinding
+from keybind_generator.util.Stats import Stats
 
 
-class MonteCarloTreeSearchSolver:
+class MonteCarloTreeSearchSolver(Solver):
 
     class Node:
         """
-        A Node in the monte carlo tree
-        """
-        def __init__(self, num_children):
-            self.visits: int = 0
-            self.loss: float = 0
-            self.children: List = [None] * num_children
-
-        @staticmethod
-        def compute_uct(parent, child):
-            if parent.visits == 0 or child.visits == 0:
-                return 0
-            # We add an epsilon to the loss in case loss is ever 0
-            return 1 / (child.loss + .01) + numpy.sqrt(numpy.log(parent.visits) / child.visits)
-
-        def update_loss(self, new_loss):
-            self.loss = (self.loss * self.visits + new_loss)/(self.visits + 1)
-            self.visits = self.visits + 1
-
-        def run_iteration(self, binding: KeyBinding) -> (float, KeyBinding):
-            # Leaf node
-            if binding.fully_assigned():
-                loss = binding.eval_loss()
-                self.update_loss(loss)
-                return loss, binding
-
-            # If at least one child hasn't been visited, visit that child
-            unvisited_children = [idx for idx, value in enumerate(self.children) if value is None]
-            if len(unvisited_children) > 0:
-                index = numpy.random.randint(0, len(unvisited_children))
-                binding.assign_next(binding.unassigned[unvisited_children[index]])
-                # Make sure we call copy constructor on list of assignments and bindings
-                self.children[unvisited_children[index]] =\
-                    MonteCarloTreeSearchSolver.Node(len(binding.unassigned))
-                loss, binding = self.children[unvisited_children[index]].run_iteration(binding)
-                self.update_loss(loss)
-                return loss, binding
-            else:
-                # Else, visit the child with the highest UCT value
-                uct_values = [MonteCarloTreeSearchSolver.Node.compute_uct(self, child) for child in self.children]
-                indices = numpy.where(uct_values == numpy.max(uct_values))[0]
-                index = numpy.random.randint(0, len(indices))
-                binding.assign_next(binding.unassigned[indices[index]])
-                loss, binding = self.children[indices[index]].run_iteration(binding)
-                self.update_loss(loss)
-                return loss, binding
+        View of a node in the monte carlo tree, which is stored in a TreeStore
+        """
+        def __init__(self, tree: TreeStore, index: int):
+            self.tree = tree
+            self.index = index
+
+        @property
+        def visits(self) -> int:
+            return int(self.tree.visits[self.index])
+
+        @property
+        def loss(self) -> float:
+            return float(self.tree.loss[self.index])
+
+        @property
+        def virtual_visits(self) -> int:
+            return int(self.tree.virtual_visits[self.index])
+
+        @property
+        def children(self) -> List:
+            """
+            :return: View of each child, None for children that haven't been created
+            """
+            if self.tree.child_start[self.index] < 0:
+                return [None] * int(self.tree.num_children[self.index])
+            return [None if child < 0 else MonteCarloTreeSearchSolver.Node(self.tree, child)
+                    for child in self.tree.child_node[self.tree.children(self.index)]]
 
     def __init__(self, graph: Graph, abilities: DataFrame, combinations: DataFrame, home_node_indices: List[int],
-                 assignments: List[int] = None):
+                 assignments: List[int] = None, leaf_batch_size: int = 1, virtual_loss: float = None,
+                 max_nodes: int = None, chunk_size: int = 1 << 16,
+                 rollout_policy: Union[str, Callable[[KeyBinding], KeyBinding]] = "random"):
+        """
+        :param assignments: Keys of the abilities already assigned, from which the search starts
+        :param leaf_batch_size: Number of leaves selected (under virtual loss) and then evaluated together in one
+        vectorized call per batch
+        :param virtual_loss: Loss temporarily attributed to selections in flight. Defaults to the worst loss seen
+        :param max_nodes: Maximum number of tree nodes. Once reached, iterations finish their binding at random
+        below the deepest existing node instead of growing the tree
+        :param chunk_size: Number of nodes by which the tree's arrays grow
+        :param rollout_policy: How a binding is completed below the node an iteration creates: "random", "greedy"
+        (remaining abilities by importance onto the free keys closest to home), or a function completing a binding
+        """
         self.graph = graph
         self.abilities = abilities
         self.combinations = combinations
@@ -68,28 +70,284 @@ class MonteCarloTreeSearchSolver:
 
         self.best_binding = None
         self.best_loss = numpy.inf
+        self.num_iter = 0
+        self.worst_loss = None
+
+        self.leaf_batch_size = leaf_batch_size
+        self.virtual_loss = virtual_loss
+        self.rollout_policy = rollout_policy
 
         self.assignments: List[int] = []
         if assignments is not None:
             self.assignments = assignments
 
-        binding = KeyBinding(self.graph, self.abilities, self.combinations, self.home_node_indices,
-                             self.assignments)
-        self.root = MonteCarloTreeSearchSolver.Node(len(binding.unassigned))
+        # Compiled once, shared by every binding this solver generates
+        self.problem = BindingProblem(graph, abilities, combinations, home_node_indices)
+        self.engine = self.problem.engine
+        # Every iteration starts from a copy of this binding
+        self.root_binding = KeyBinding.from_problem(self.problem, self.assignments)
+
+        self.tree = TreeStore(chunk_size, max_nodes)
+        self.tree.add_node(len(self.root_binding.unassigned))
+
+    def set_stats(self, stats: [Stats, None]) -> None:
+        """
+        :param stats: Stats to record selections, expansions, backpropagations, loss evaluations and assignments
+        into, None to stop recording
+        :return:
+        """
+        self.stats = stats
+        self.root_binding.stats = stats
+
+    def record_stats(self, stats: Stats) -> None:
+        super().record_stats(stats)
+        stats.set("tree nodes", self.tree.num_nodes)
+
+    @property
+    def root(self) -> Node:
+        return MonteCarloTreeSearchSolver.Node(self.tree, 0)
+
+    def new_binding(self) -> KeyBinding:
+        """
+        :return: Binding with only the solver's initial assignments
+        """
+        return self.root_binding.copy()
+
+    def rollout(self, binding: KeyBinding) -> KeyBinding:
+        """
+        Completes a binding with the solver's rollout policy
+        """
+        if self.rollout_policy == "random":
+            return self.random_rollout(binding)
+        if self.rollout_policy == "greedy":
+            return self.greedy_rollout(binding)
+        return self.rollout_policy(binding)
+
+    def random_rollout(self, binding: KeyBinding) -> KeyBinding:
+        """
+        Assigns the remaining abilities to random keys
+        """
+        binding.assign_remaining(numpy.random.permutation(binding.get_unassigned()))
+        return binding
+
+    def greedy_rollout(self, binding: KeyBinding) -> KeyBinding:
+        """
+        Assigns the remaining abilities to the free keys closest to home, the most important abilities first
+        """
+        unassigned = binding.get_unassigned()
+        num_assigned = len(binding.assignments)
+        keys = unassigned[numpy.argsort(self.engine.home_distance[unassigned], kind="stable")]
+        order = numpy.argsort(-self.engine.ability_weight[num_assigned:], kind="stable")
+        remaining = numpy.empty(len(order), dtype=int)
+        remaining[order] = keys[:len(order)]
+        binding.assign_remaining(remaining)
+        return binding
+
+    def descend(self, node: int, binding: KeyBinding) -> (int, bool):
+        """
+        Picks the child of a node to visit, assigns its key and creates it if necessary
+        :param node: Index of the node
+        :param binding: Binding at the node, to which the child's key is assigned
+        :return: Index of the child, or -1 if it doesn't exist and the tree is full, and whether it was just created
+        """
+        if self.stats is not None and self.tree.child_start[node] < 0:
+            start = clock.perf_counter()
+            self.tree.expand(node, binding.unassigned)
+            self.stats.add("expand", clock.perf_counter() - start)
+        else:
+            self.tree.expand(node, binding.unassigned)
+        slot = self.tree.select_slot(node, self.current_virtual_loss())
+        binding.assign_next(self.tree.child_key[slot])
+        child = self.tree.child_node[slot]
+        if child >= 0:
+            return child, False
+        return self.tree.add_child(slot, len(binding.unassigned)), True
+
+    def select(self, binding: KeyBinding) -> (List[int], KeyBinding):
+        """
+        Selects a path from the root using UCT until a new node is created (or the tree is full, or the binding is
+        complete), then finishes the binding with the rollout policy
+        :param binding: Binding at the root
+        :return: Nodes on the path, and the completed binding
+        """
+        start = clock.perf_counter() if self.stats is not None else 0
+        path = [0]
+        node = 0
+        while not binding.fully_assigned():
+            node, created = self.descend(node, binding)
+            if node < 0:
+                break
+            path.append(node)
+            if created:
+                break
+        if not binding.fully_assigned():
+            self.rollout(binding)
+        if self.stats is not None:
+            self.stats.add("select", clock.perf_counter() - start)
+            self.stats.maximum("tree depth", len(path) - 1)
+        return path, binding
+
+    def backpropagate(self, path: List[int], loss: float) -> None:
+        """
+        Removes the virtual visits of a path selected in a batch, and adds the real visit
+        """
+        self.tree.virtual_visits[path] -= 1
+        self.tree.update(path, loss)
+
+    def current_virtual_loss(self) -> float:
+        if self.virtual_loss is not None:
+            return self.virtual_loss
+        return numpy.inf if self.worst_loss is None else self.worst_loss
 
     def run_iter(self) -> (float, KeyBinding):
-        binding = KeyBinding(self.graph, self.abilities, self.combinations, self.home_node_indices,
-                             self.assignments)
-        loss, binding = self.root.run_iteration(binding)
+        path, binding = self.select(self.new_binding())
+        loss = binding.eval_loss()
+        start = clock.perf_counter() if self.stats is not None else 0
+        self.tree.update(numpy.array(path), loss)
+        if self.stats is not None:
+            self.stats.add("backpropagate", clock.perf_counter() - start)
 
         if loss < self.best_loss:
             self.best_loss = loss
             self.best_binding = binding
             # print(f"New loss: %f" % loss)
+        self.num_iter = self.num_iter + 1
         return loss, binding
 
-    def do_num_iter(self, num_iterations) -> (float, KeyBinding):
-        for i in progressbar.progressbar(range(num_iterations)):
-            self.run_iter()
-        return self.best_loss, self.best_binding
+    def run_batch(self, batch_size: int) -> (float, KeyBinding):
+        """
+        Selects several leaves, with virtual loss steering later selections away from earlier ones, then evaluates
+        them in one batched call and backpropagates their losses
+        :param batch_size: Number of leaves to select
+        :return: Best loss and binding of the batch
+        """
+        paths = []
+        bindings = []
+        for i in range(batch_size):
+            path, binding = self.select(self.new_binding())
+            # Virtual visits steer the following selections of the batch away from this path
+            self.tree.virtual_visits[path] += 1
+            paths.append(path)
+            bindings.append(binding)
+
+        losses = bindings[0].eval_batch_loss([binding.assignments for binding in bindings])
+        start = clock.perf_counter() if self.stats is not None else 0
+        for path, loss in zip(paths, losses):
+            self.backpropagate(path, loss)
+        if self.stats is not None:
+            self.stats.add("backpropagate", clock.perf_counter() - start, batch_size)
+
+        best = numpy.argmin(losses)
+        if losses[best] < self.best_loss:
+            self.best_loss = losses[best]
+            self.best_binding = bindings[best]
+        if self.worst_loss is None or numpy.max(losses) > self.worst_loss:
+            self.worst_loss = numpy.max(losses)
+        self.num_iter = self.num_iter + batch_size
+        return losses[best], bindings[best]
+
+    def step(self, max_iterations: int = None) -> int:
+        if self.leaf_batch_size > 1:
+            batch_size = self.leaf_batch_size if max_iterations is None else min(self.leaf_batch_size, max_iterations)
+            self.run_batch(batch_size)
+            return batch_size
+        self.run_iter()
+        return 1
+
+    def root_statistics(self) -> (numpy.ndarray, numpy.ndarray, numpy.ndarray):
+        """
+        :return: Key, visit count and mean loss of each child of the root, for merging into another tree
+        """
+        self.tree.expand(0, self.new_binding().unassigned)
+        slots = self.tree.children(0)
+        children = self.tree.child_node[slots]
+        created = children >= 0
+        return self.tree.child_key[slots][created], self.tree.visits[children[created]],\
+            self.tree.loss[children[created]]
+
+    def make_binding(self, assignments: List[int]) -> KeyBinding:
+        """
+        :param assignments: Node index of each ability
+        :return: Key binding for this solver's problem
+        """
+        return KeyBinding.from_problem(self.problem, assignments)
+
+    def make_worker(self):
+        """
+        :return: Solver with an empty tree for the same problem, to run in a worker process
+        """
+        worker = MonteCarloTreeSearchSolver.__new__(MonteCarloTreeSearchSolver)
+        worker.__dict__.update(self.__dict__)
+        worker.best_binding = None
+        worker.best_loss = numpy.inf
+        worker.num_iter = 0
+        worker.worst_loss = None
+        worker.root_binding = self.root_binding.copy()
+        worker.set_stats(None)
+        worker.tree = TreeStore(self.tree.chunk_size, self.tree.max_nodes)
+        worker.tree.add_node(self.tree.num_children[0])
+        return worker
+
+    def merge_worker_statistics(self, statistics: List[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]]) -> None:
+        """
+        Merges the root statistics of independently grown trees into this tree's root (root parallelization)
+        :param statistics: Root statistics of each tree
+        :return:
+        """
+        self.tree.expand(0, self.new_binding().unassigned)
+        for keys, visits, losses in statistics:
+            self.tree.merge_children(0, keys, visits, losses)
+
+    def get_state(self) -> dict:
+        """
+        :return: State of the search, including the tree, as arrays, for checkpointing
+        """
+        state = Checkpoint.search_state(self, None if self.best_binding is None else self.best_binding.assignments)
+        state["worst_loss"] = numpy.array(numpy.nan if self.worst_loss is None else self.worst_loss)
+        state["root_assignments"] = numpy.asarray(self.root_binding.assignments, dtype=int)
+        state.update(self.tree.to_arrays())
+        return state
 
+    def set_state(self, state: dict) -> None:
+        """
+        Restores the state of the search, including the tree, from a checkpoint
+        :param state: Arrays returned by get_state()
+        :return:
+        """
+        Checkpoint.check_problem(self, state)
+        if not numpy.array_equal(state["root_assignments"], self.root_binding.assignments):
+            raise ValueError("Checkpoint was written by a search starting from different assignments")
+        self.best_loss = float(state["best_loss"])
+        self.best_binding = self.make_binding(state["best_assignments"]) if state["has_best"] else None
+        self.num_iter = int(state["num_iter"])
+        self.worst_loss = None if numpy.isnan(state["worst_loss"]) else float(state["worst_loss"])
+        self.tree = TreeStore.from_arrays(state, self.tree.chunk_size, self.tree.max_nodes)
+        Checkpoint.set_random_state(state)
+
+    def save_checkpoint(self, path: str) -> None:
+        Checkpoint.write(path, self.get_state())
+
+    def load_checkpoint(self, path: str) -> None:
+        self.set_state(Checkpoint.read(path))
+
+    def do_num_iter(self, num_iterations, num_workers: int = 1, seed: int = None, checkpoint_path: str = None,
+                    checkpoint_interval: int = 10000) -> (float, KeyBinding):
+        """
+        Runs n iterations of tree search
+        :param num_iterations: Number of iterations to run
+        :param num_workers: Number of processes to spread the iterations over. Each process grows its own tree, and
+        the root statistics of all trees are merged into this solver's root (root parallelization).
+        :param seed: Seed for the workers' random streams, when running on several processes
+        :param checkpoint_path: File to checkpoint the search (tree included) to, resumable with load_checkpoint().
+        When running on several processes, the checkpoint is only written once all iterations are done
+        :param checkpoint_interval: Number of iterations between checkpoints
+        :return:
+        """
+        checkpoint = None if checkpoint_path is None else Checkpoint(checkpoint_path, checkpoint_interval)
+        if num_workers > 1:
+            ParallelRunner(num_workers, seed).run(self, num_iterations)
+            if checkpoint is not None:
+                checkpoint.save(self)
+        else:
+            self.run(Budget(iterations=num_iterations), checkpoint, progress=True)
+        return self.best_loss, self.best_binding
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+from typing import List
+
+import numpy
+import progressbar
+
+# Solver owned by the current worker process, set once by the pool initializer
+_worker_solver = None
+
+
+def _initialize_worker(solver) -> None:
+    global _worker_solver
+    _worker_solver = solver
+
+
+def _run_task(task: (numpy.random.SeedSequence, int)) -> (float, List[int], int, int, object):
+    seed, num_iterations = task
+    numpy.random.seed(seed.generate_state(4))
+    _worker_solver.run_iterations(num_iterations)
+    best_binding = _worker_solver.best_binding
+    assignments = None if best_binding is None else [int(entry) for entry in best_binding.assignments]
+    statistics = None
+    if hasattr(_worker_solver, "root_statistics"):
+        statistics = _worker_solver.root_statistics()
+    return _worker_solver.best_loss, assignments, num_iterations, os.getpid(), statistics
+
+
+def _run_island(task: (numpy.random.SeedSequence, object, int)) -> (object, float, List[int]):
+    seed, island, num_iterations = task
+    numpy.random.seed(seed.generate_state(4))
+    _worker_solver.set_island(island)
+    _worker_solver.best_loss = numpy.inf
+    _worker_solver.run_iterations(num_iterations)
+    assignments = [int(entry) for entry in _worker_solver.best_binding.assignments]
+    return _worker_solver.get_island(), _worker_solver.best_loss, assignments
+
+
+class ParallelRunner:
+    """
+    Runs a solver's iterations over a pool of worker processes, and reduces the workers' best bindings back into the
+    solver.
+
+    Solvers used with the runner implement make_worker(), returning a fresh solver for the same problem, and
+    run_iterations(n), running n iterations without a progress bar. The worker solver (graph, abilities and compiled
+    loss engine) is sent to each process once, when the pool starts; tasks only carry a seed and an iteration count.
+    If the graph was shared with Graph.share() before the solver was made, its adjacency matrix isn't copied to the
+    workers, which all map the same matrix.
+
+    Solvers that also implement root_statistics() and merge_worker_statistics(statistics) get the final statistics
+    of every worker's search merged back in once all tasks are done.
+
+    Population based solvers can instead be run as islands, implementing get_island() and set_island(island) to
+    move a population between processes, and migrate(islands, migration_size) to exchange individuals between them.
+    """
+
+    def __init__(self, num_workers: int, seed: int = None, tasks_per_worker: int = 4):
+        """
+        :param num_workers: Number of worker processes
+        :param seed: Seed from which each task's random stream is derived
+        :param tasks_per_worker: Number of chunks the iterations are split into per worker, for progress reporting
+        """
+        self.num_workers = num_workers
+        self.seed_sequence = numpy.random.SeedSequence(seed)
+        self.tasks_per_worker = tasks_per_worker
+
+    def run(self, solver, num_iterations: int) -> None:
+        """
+        Runs iterations in parallel, updating the solver's best loss, best binding and iteration count
+        :param solver: Solver to run
+        :param num_iterations: Total number of iterations, split evenly between tasks
+        :return:
+        """
+        num_tasks = min(self.num_workers * self.tasks_per_worker, num_iterations)
+        if num_tasks == 0:
+            return
+        chunks = numpy.full(num_tasks, num_iterations // num_tasks)
+        chunks[:num_iterations % num_tasks] += 1
+        seeds = self.seed_sequence.spawn(num_tasks)
+
+        with multiprocessing.Pool(self.num_workers, initializer=_initialize_worker,
+                                  initargs=(solver.make_worker(),)) as pool:
+            results = pool.imap_unordered(_run_task, zip(seeds, [int(entry) for entry in chunks]))
+            # Workers keep their solver between tasks, so only the latest statistics of each worker are kept
+            worker_statistics = {}
+            for loss, assignments, iterations, worker, statistics in progressbar.progressbar(results,
+                                                                                           max_value=num_tasks):
+                solver.num_iter = solver.num_iter + iterations
+                if assignments is not None and loss < solver.best_loss:
+                    solver.best_loss = loss
+                    solver.best_binding = solver.make_binding(assignments)
+                worker_statistics[worker] = statistics
+
+        if hasattr(solver, "merge_worker_statistics"):
+            solver.merge_worker_statistics(list(worker_statistics.values()))
+
+    def run_islands(self, solver, islands: list, num_iterations: int, migration_interval: int,
+                    migration_size: int) -> list:
+        """
+        Evolves island populations in parallel, migrating individuals between them periodically, and updates the
+        solver's best loss, best binding and iteration count
+        :param solver: Solver to run
+        :param islands: Initial state of each island
+        :param num_iterations: Number of iterations to run on every island
+        :param migration_interval: Number of iterations between migrations
+        :param migration_size: Number of individuals each island sends on migration
+        :return: Final state of each island
+        """
+        epochs = [min(migration_interval, num_iterations - start)
+                  for start in range(0, num_iterations, migration_interval)]
+
+        with multiprocessing.Pool(self.num_workers, initializer=_initialize_worker,
+                                  initargs=(solver.make_worker(),)) as pool:
+            for epoch, epoch_iterations in enumerate(progressbar.progressbar(epochs)):
+                seeds = self.seed_sequence.spawn(len(islands))
+                results = pool.map(_run_island, zip(seeds, islands, [epoch_iterations] * len(islands)))
+                islands = [island for island, _, _ in results]
+                solver.num_iter = solver.num_iter + epoch_iterations * len(islands)
+                for _, loss, assignments in results:
+                    if loss < solver.best_loss:
+                        solver.best_loss = loss
+                        solver.best_binding = solver.make_binding(assignments)
+                # Islands evolve independently after the last epoch
+                if epoch < len(epochs) - 1:
+                    islands = solver.migrate(islands, migration_size)
+        return islands
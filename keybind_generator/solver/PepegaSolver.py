@@ -1,22 +1,28 @@
-import datetime
-from datetime import timedelta
+import time as clock
 from typing import List
 
 import numpy
 from pandas import DataFrame
-import progressbar
 
+from keybind_generator.solver.Budget import Budget
+from keybind_generator.solver.Checkpoint import Checkpoint
+from keybind_generator.solver.ParallelRunner import ParallelRunner
+from keybind_generator.solver.Solver import Solver
+from keybind_generator.util.BindingProblem import BindingProblem
 from keybind_generator.util.Graph import Graph
 from keybind_generator.util.KeyBinding import KeyBinding
 
 
-class PepegaSolver:
+class PepegaSolver(Solver):
     """
     Random solver: pick a random key and bind an ability to it
     """
 
     def __init__(self, graph: Graph, abilities: DataFrame, combinations: DataFrame, home_node_indices: List[int],
-                 individual_coefficient: float = 1, combination_coefficient: float = 1):
+                 individual_coefficient: float = 1, combination_coefficient: float = 1, batch_size: int = 1):
+        """
+        :param batch_size: Number of random bindings generated and scored together per vectorized call
+        """
         self.best_binding: [KeyBinding, None] = None
         self.best_loss: numpy.float = numpy.inf
         self.num_iter = 0
@@ -28,18 +34,23 @@ class PepegaSolver:
 
         self.individual_coefficient = individual_coefficient
         self.combination_coefficient = combination_coefficient
+        self.batch_size = batch_size
+
+        # Compiled once, shared by every binding this solver generates
+        self.problem = BindingProblem(graph, abilities, combinations, home_node_indices,
+                                      individual_coefficient=individual_coefficient,
+                                      combination_coefficient=combination_coefficient)
+        self.engine = self.problem.engine
 
     def run_iter(self) -> (float, KeyBinding):
         """
         Generates a random binding
         :return:
         """
-        current_binding = KeyBinding(self.graph, self.abilities, self.combinations, self.home_node_indices)
+        current_binding = KeyBinding.from_problem(self.problem, stats=self.stats)
 
         while not current_binding.fully_assigned():
-            current_unassigned = current_binding.get_unassigned()
-            choice = numpy.random.randint(0, len(current_unassigned))
-            current_binding.assign_next(current_unassigned[choice])
+            current_binding.assign_next(current_binding.random_unassigned())
         loss = current_binding.eval_loss()
         if loss < self.best_loss:
             # print(f"New best loss: %f" % loss)
@@ -49,24 +60,101 @@ class PepegaSolver:
 
         return loss, current_binding
 
-    def do_num_iter(self, num_iterations: int) -> (float, KeyBinding):
+    def run_batch(self, batch_size: int) -> (float, KeyBinding):
         """
-        Picks the best from randomly generated bindings, running for n iterations
-        :param num_iterations: Number of iterations to run
+        Generates and scores a batch of random bindings in one vectorized call
+        :param batch_size: Number of bindings to generate
+        :return: Best loss and binding of the batch
+        """
+        stats = self.stats
+        start = clock.perf_counter() if stats is not None else 0
+        # The first n columns of a random permutation of the nodes are a uniformly random binding
+        permutations = numpy.argsort(numpy.random.random((batch_size, self.graph.size)), axis=1)
+        candidates = permutations[:, :self.abilities.shape[0]]
+        if stats is not None:
+            assigned = clock.perf_counter()
+            stats.add("assign", assigned - start, candidates.size)
+        losses = self.engine.batch_loss(candidates)
+        if stats is not None:
+            stats.add("loss", clock.perf_counter() - assigned, batch_size)
+
+        best = numpy.argmin(losses)
+        binding = self.make_binding(candidates[best])
+        if losses[best] < self.best_loss:
+            self.best_loss = losses[best]
+            self.best_binding = binding
+        self.num_iter = self.num_iter + batch_size
+
+        return losses[best], binding
+
+    def step(self, max_iterations: int = None) -> int:
+        if self.batch_size > 1:
+            batch_size = self.batch_size if max_iterations is None else min(self.batch_size, max_iterations)
+            self.run_batch(batch_size)
+            return batch_size
+        self.run_iter()
+        return 1
+
+    def make_binding(self, assignments: List[int]) -> KeyBinding:
+        """
+        :param assignments: Node index of each ability
+        :return: Key binding for this solver's problem
+        """
+        return KeyBinding.from_problem(self.problem, assignments)
+
+    def make_worker(self):
+        """
+        :return: Fresh solver for the same problem, to run in a worker process
+        """
+        worker = PepegaSolver.__new__(PepegaSolver)
+        worker.__dict__.update(self.__dict__)
+        worker.best_binding = None
+        worker.best_loss = numpy.inf
+        worker.num_iter = 0
+        worker.stats = None
+        return worker
+
+    def get_state(self) -> dict:
+        """
+        :return: State of the search, as arrays, for checkpointing
+        """
+        return Checkpoint.search_state(self, None if self.best_binding is None else self.best_binding.assignments)
+
+    def set_state(self, state: dict) -> None:
+        """
+        Restores the state of the search from a checkpoint
+        :param state: Arrays returned by get_state()
         :return:
         """
-        for i in progressbar.progressbar(range(num_iterations)):
-            self.run_iter()
-        return self.best_loss, self.best_binding
+        Checkpoint.check_problem(self, state)
+        self.best_loss = float(state["best_loss"])
+        self.best_binding = self.make_binding(state["best_assignments"]) if state["has_best"] else None
+        self.num_iter = int(state["num_iter"])
+        Checkpoint.set_random_state(state)
 
-    def do_time(self, time: timedelta) -> int:
+    def save_checkpoint(self, path: str) -> None:
+        Checkpoint.write(path, self.get_state())
+
+    def load_checkpoint(self, path: str) -> None:
+        self.set_state(Checkpoint.read(path))
+
+    def do_num_iter(self, num_iterations: int, num_workers: int = 1, seed: int = None, checkpoint_path: str = None,
+                    checkpoint_interval: int = 10000) -> (float, KeyBinding):
         """
-        :param time: Duration to run iterations for
-        :return: Number of iterations done
+        Picks the best from randomly generated bindings, running for n iterations
+        :param num_iterations: Number of iterations to run
+        :param num_workers: Number of processes to spread the iterations over
+        :param seed: Seed for the workers' random streams, when running on several processes
+        :param checkpoint_path: File to checkpoint the search to, resumable with load_checkpoint(). When running on
+        several processes, the checkpoint is only written once all iterations are done
+        :param checkpoint_interval: Number of iterations between checkpoints
+        :return:
         """
-        start_time = datetime.datetime.now()
-        iterations_run = 0
-        while datetime.datetime.now() < start_time + time:
-            self.run_iter()
-            iterations_run = iterations_run + 1
-        return iterations_run
+        checkpoint = None if checkpoint_path is None else Checkpoint(checkpoint_path, checkpoint_interval)
+        if num_workers > 1:
+            ParallelRunner(num_workers, seed).run(self, num_iterations)
+            if checkpoint is not None:
+                checkpoint.save(self)
+        else:
+            self.run(Budget(iterations=num_iterations), checkpoint, progress=True)
+        return self.best_loss, self.best_binding
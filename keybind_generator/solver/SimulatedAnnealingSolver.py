@@ -0,0 +1,178 @@
+from typing import List, Callable, Union
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.Solver import Solver
+from keybind_generator.util.BindingProblem import BindingProblem
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.KeyBinding import KeyBinding
+
+
+class SimulatedAnnealingSolver(Solver):
+    """
+    Simulated annealing solver: starting from a random binding, repeatedly swap the keys of two abilities or move an
+    ability to a free key, accepting worse bindings with a probability that decreases as the temperature cools.
+    """
+
+    @staticmethod
+    def exponential_schedule(step: int, num_steps: int, initial: float, final: float) -> float:
+        return initial * (final / initial) ** (step / num_steps)
+
+    @staticmethod
+    def linear_schedule(step: int, num_steps: int, initial: float, final: float) -> float:
+        return initial + (final - initial) * step / num_steps
+
+    @staticmethod
+    def logarithmic_schedule(step: int, num_steps: int, initial: float, final: float) -> float:
+        # Scaled so that the temperature reaches the final temperature at the last step
+        rate = (initial / final - 1) / numpy.log(1 + num_steps)
+        return initial / (1 + rate * numpy.log(1 + step))
+
+    def __init__(self, graph: Graph, abilities: DataFrame, combinations: DataFrame, home_node_indices: List[int],
+                 individual_coefficient: float = 1, combination_coefficient: float = 1,
+                 initial_temperature: float = None, final_temperature: float = None, steps_per_restart: int = 10000,
+                 cooling_schedule: Union[str, Callable[[int, int, float, float], float]] = "exponential",
+                 relocate_probability: float = .5, restart_from_best: bool = True,
+                 initial_assignments: List[int] = None):
+        """
+        :param initial_temperature: Temperature at the start of each restart. Estimated from the loss changes of
+        random moves if not provided
+        :param final_temperature: Temperature at the end of each restart. Defaults to a thousandth of the initial
+        temperature
+        :param steps_per_restart: Number of moves between restarts
+        :param cooling_schedule: One of "exponential", "linear" or "logarithmic", or a function of
+        (step, steps per restart, initial temperature, final temperature) returning the temperature
+        :param relocate_probability: Probability of moving an ability to a free key rather than swapping two
+        abilities, when free keys exist
+        :param restart_from_best: Restart from the best binding found so far rather than from a random binding
+        :param initial_assignments: Binding to start from (e.g. one built by GreedySolver), random if not provided
+        """
+        self.best_assignments: [numpy.ndarray, None] = None
+        self.best_loss: float = numpy.inf
+        self.num_iter = 0
+
+        self.graph = graph
+        self.abilities = abilities
+        self.combinations = combinations
+        self.home_node_indices = home_node_indices
+
+        self.individual_coefficient = individual_coefficient
+        self.combination_coefficient = combination_coefficient
+
+        self.problem = BindingProblem(graph, abilities, combinations, home_node_indices,
+                                      individual_coefficient=individual_coefficient,
+                                      combination_coefficient=combination_coefficient)
+        self.engine = self.problem.engine
+
+        if isinstance(cooling_schedule, str):
+            cooling_schedule = {"exponential": SimulatedAnnealingSolver.exponential_schedule,
+                                "linear": SimulatedAnnealingSolver.linear_schedule,
+                                "logarithmic": SimulatedAnnealingSolver.logarithmic_schedule}[cooling_schedule]
+        self.cooling_schedule = cooling_schedule
+        self.steps_per_restart = steps_per_restart
+        self.relocate_probability = relocate_probability
+        self.restart_from_best = restart_from_best
+
+        self.num_abilities = abilities.shape[0]
+        # The first num_abilities entries are the keys bound to each ability, the rest are the free keys
+        if initial_assignments is None:
+            self.permutation = numpy.random.permutation(graph.size)
+        else:
+            self.permutation = self.complete_permutation(numpy.asarray(initial_assignments, dtype=int))
+        self.current_loss = self.engine.loss(self.permutation[:self.num_abilities])
+        self.annealing_step = 0
+
+        if initial_temperature is None:
+            initial_temperature = self.estimate_temperature()
+        if final_temperature is None:
+            final_temperature = initial_temperature / 1000
+        self.initial_temperature = initial_temperature
+        self.final_temperature = final_temperature
+
+        self.update_best()
+
+    @property
+    def best_binding(self) -> [KeyBinding, None]:
+        if self.best_assignments is None:
+            return None
+        return KeyBinding.from_problem(self.problem, self.best_assignments)
+
+    def estimate_temperature(self, num_samples: int = 200) -> float:
+        """
+        Estimates an initial temperature at which an average worsening move is accepted half of the time
+        :param num_samples: Number of random moves to sample
+        :return: Initial temperature
+        """
+        if self.num_abilities < 2:
+            return 1
+        assignments = self.permutation[:self.num_abilities]
+        deltas = numpy.abs([self.engine.swap_delta(assignments, *numpy.random.choice(self.num_abilities, 2, False))
+                            for _ in range(num_samples)])
+        deltas = deltas[deltas > 0]
+        if not len(deltas):
+            return 1
+        return numpy.mean(deltas) / numpy.log(2)
+
+    def temperature(self) -> float:
+        return self.cooling_schedule(self.annealing_step, self.steps_per_restart, self.initial_temperature,
+                                     self.final_temperature)
+
+    def update_best(self) -> None:
+        if self.current_loss < self.best_loss:
+            self.best_loss = self.current_loss
+            self.best_assignments = self.permutation[:self.num_abilities].copy()
+
+    def complete_permutation(self, assignments: numpy.ndarray) -> numpy.ndarray:
+        """
+        :param assignments: Key of each ability
+        :return: Permutation of all keys starting with the given assignments, followed by the free keys
+        """
+        free = numpy.setdiff1d(numpy.arange(self.graph.size), assignments)
+        return numpy.concatenate([assignments, numpy.random.permutation(free)])
+
+    def restart(self) -> None:
+        """
+        Reheats, starting again from the best binding found so far or from a new random binding
+        :return:
+        """
+        if self.restart_from_best:
+            self.permutation = self.complete_permutation(self.best_assignments)
+        else:
+            self.permutation = numpy.random.permutation(self.graph.size)
+        # Recompute from scratch so accumulated rounding from deltas doesn't drift
+        self.current_loss = self.engine.loss(self.permutation[:self.num_abilities])
+        self.annealing_step = 0
+        self.update_best()
+
+    def run_iter(self) -> float:
+        """
+        Proposes a single move, and accepts or rejects it
+        :return: Loss of the current binding
+        """
+        assignments = self.permutation[:self.num_abilities]
+        num_free = self.graph.size - self.num_abilities
+
+        if num_free and (self.num_abilities < 2 or numpy.random.random() < self.relocate_probability):
+            ability = numpy.random.randint(0, self.num_abilities)
+            free = numpy.random.randint(self.num_abilities, self.graph.size)
+            delta = self.engine.move_delta(assignments, ability, self.permutation[free])
+        elif self.num_abilities >= 2:
+            ability, free = numpy.random.choice(self.num_abilities, 2, False)
+            delta = self.engine.swap_delta(assignments, ability, free)
+        else:
+            ability, free, delta = 0, 0, 0
+
+        if delta <= 0 or numpy.random.random() < numpy.exp(-delta / self.temperature()):
+            # Both moves are a swap of two positions in the permutation
+            self.permutation[ability], self.permutation[free] = self.permutation[free], self.permutation[ability]
+            self.current_loss = self.current_loss + delta
+            if delta < 0:
+                self.update_best()
+
+        self.annealing_step = self.annealing_step + 1
+        if self.annealing_step >= self.steps_per_restart:
+            self.restart()
+        self.num_iter = self.num_iter + 1
+
+        return self.current_loss
@@ -0,0 +1,213 @@
+import asyncio
+import threading
+import time as clock
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import AsyncIterator, Iterator
+
+import progressbar
+
+from keybind_generator.solver.Budget import Budget
+from keybind_generator.solver.Checkpoint import Checkpoint
+from keybind_generator.solver.Improvement import Improvement
+from keybind_generator.util.Stats import Stats
+
+
+class Solver(ABC):
+    """
+    Base class of the solvers. Solvers keep best_loss, best_binding and num_iter up to date, and implement run_iter(),
+    running one iteration. Solvers that run several iterations at once (batches, generations over islands...)
+    override step() instead, and solvers that can tell when there is nothing left to search override finished().
+
+    run() then runs the solver within a Budget, and do_num_iter(), do_time() and run_iterations() are shorthands for
+    the usual budgets.
+
+    Attaching a Stats object with set_stats() records the solver's state after every step, and the timings of the
+    operations the solver instruments.
+
+    improvements() and stream_improvements() run the solver within a budget while streaming its improvements, as a
+    generator and as an async iterator.
+    """
+
+    stats: Stats = None
+
+    @abstractmethod
+    def run_iter(self):
+        """
+        Runs one iteration
+        :return:
+        """
+        pass
+
+    def step(self, max_iterations: int = None) -> int:
+        """
+        Runs at least one iteration
+        :param max_iterations: Number of iterations left in the budget, None if unlimited
+        :return: Number of iterations run
+        """
+        self.run_iter()
+        return 1
+
+    def finished(self) -> bool:
+        """
+        :return: True if running more iterations can't find a better binding
+        """
+        return False
+
+    def set_stats(self, stats: [Stats, None]) -> None:
+        """
+        :param stats: Stats to record into, None to stop recording
+        :return:
+        """
+        self.stats = stats
+
+    def record_stats(self, stats: Stats) -> None:
+        """
+        Records the solver's current state
+        :param stats: Stats to record into
+        :return:
+        """
+        stats.set("iterations", self.num_iter)
+        stats.set("best loss", float(self.best_loss))
+
+    def run(self, budget: Budget, checkpoint: Checkpoint = None, progress: bool = False) -> int:
+        """
+        Runs iterations until the budget is exhausted
+        :param budget: Limits of the run
+        :param checkpoint: Checkpoint to update as iterations run, and to save at the end
+        :param progress: Show a progress bar
+        :return: Number of iterations run
+        :raises ValueError: If a checkpoint is given but the solver doesn't support checkpoints
+        """
+        if checkpoint is not None:
+            Checkpoint.check_solver(self)
+        budget.start(self)
+        bar = None
+        if progress:
+            bar = progressbar.ProgressBar(max_value=budget.iterations if budget.iterations is not None
+                                          else progressbar.UnknownLength)
+            bar.start()
+
+        while not self.finished() and not budget.exhausted(self):
+            self.step(budget.remaining_iterations(self))
+            if self.stats is not None:
+                self.stats.update(self)
+            if checkpoint is not None:
+                checkpoint.update(self)
+            if bar is not None:
+                bar.update(budget.iterations_run(self))
+
+        if bar is not None:
+            bar.finish()
+        if checkpoint is not None:
+            checkpoint.save(self)
+        return budget.iterations_run(self)
+
+    def improvements(self, budget: Budget, min_interval: timedelta = timedelta(milliseconds=100),
+                     checkpoint: Checkpoint = None) -> Iterator[Improvement]:
+        """
+        Runs iterations until the budget is exhausted, yielding events as better bindings are found. Events are
+        throttled to one per interval: the first improvement is yielded right away, later ones once the interval since
+        the previous event has passed, and a final event with the best binding is yielded when the run stops. The
+        clock is only read while an improvement is waiting to be yielded.
+
+        Closing the generator, e.g. breaking out of a loop over it, stops the run, as does cancelling the budget.
+        :param budget: Limits of the run
+        :param min_interval: Minimum time between events
+        :param checkpoint: Checkpoint to update as iterations run, and to save at the end
+        :return: Improvement events
+        :raises ValueError: If a checkpoint is given but the solver doesn't support checkpoints
+        """
+        if checkpoint is not None:
+            Checkpoint.check_solver(self)
+        min_interval = min_interval.total_seconds()
+        budget.start(self)
+        start = clock.perf_counter()
+        emitted_loss = self.best_loss
+        emitted_time = -min_interval
+        try:
+            while not self.finished() and not budget.exhausted(self):
+                self.step(budget.remaining_iterations(self))
+                if checkpoint is not None:
+                    checkpoint.update(self)
+                if self.stats is not None:
+                    self.stats.update(self)
+                if self.best_loss < emitted_loss:
+                    now = clock.perf_counter() - start
+                    if now - emitted_time >= min_interval:
+                        emitted_loss = self.best_loss
+                        emitted_time = now
+                        yield Improvement(self.num_iter, now, self.best_loss, self.best_binding)
+        finally:
+            if checkpoint is not None:
+                checkpoint.save(self)
+        if self.best_binding is not None:
+            yield Improvement(self.num_iter, clock.perf_counter() - start, self.best_loss, self.best_binding,
+                              final=True)
+
+    async def stream_improvements(self, budget: Budget, min_interval: timedelta = timedelta(milliseconds=100),
+                                  checkpoint: Checkpoint = None) -> AsyncIterator[Improvement]:
+        """
+        Async iterator over the events of improvements(), running the solver in a separate thread so that the event
+        loop stays responsive. Closing the iterator (breaking out of an async for loop only closes it once it is
+        garbage collected, contextlib.aclosing closes it on the spot), or cancelling the task iterating it, cancels the
+        budget and waits for the current step to finish
+        :param budget: Limits of the run
+        :param min_interval: Minimum time between events
+        :param checkpoint: Checkpoint to update as iterations run, and to save at the end
+        :return: Improvement events
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for event in self.improvements(budget, min_interval, checkpoint):
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except BaseException as exception:
+                loop.call_soon_threadsafe(queue.put_nowait, exception)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        thread = threading.Thread(target=produce, name="solver", daemon=True)
+        thread.start()
+        try:
+            while True:
+                event = await queue.get()
+                if event is done:
+                    break
+                if isinstance(event, BaseException):
+                    raise event
+                yield event
+        finally:
+            budget.cancel()
+            await loop.run_in_executor(None, thread.join)
+
+    def run_iterations(self, num_iterations: int) -> None:
+        """
+        Runs n iterations without reporting progress
+        :param num_iterations: Number of iterations to run
+        :return:
+        """
+        self.run(Budget(iterations=num_iterations))
+
+    def do_num_iter(self, num_iterations: int):
+        """
+        Runs n iterations
+        :param num_iterations: Number of iterations to run
+        :return: Best loss and binding
+        """
+        self.run(Budget(iterations=num_iterations), progress=True)
+        return self.best_loss, self.best_binding
+
+    def do_time(self, time: timedelta, checkpoint_path: str = None, checkpoint_interval: int = 10000) -> int:
+        """
+        :param time: Duration to run iterations for
+        :param checkpoint_path: File to checkpoint the search to, for solvers that support checkpoints
+        :param checkpoint_interval: Number of iterations between checkpoints
+        :return: Number of iterations done
+        :raises ValueError: If a checkpoint path is given but the solver doesn't support checkpoints
+        """
+        checkpoint = None if checkpoint_path is None else Checkpoint(checkpoint_path, checkpoint_interval)
+        return self.run(Budget(time=time), checkpoint)
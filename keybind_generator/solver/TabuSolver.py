@@ -0,0 +1,233 @@
+from typing import List
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.Solver import Solver
+from keybind_generator.util.BindingProblem import BindingProblem
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.KeyBinding import KeyBinding
+
+
+class TabuSolver(Solver):
+    """
+    Robust tabu search solver (Taillard). The loss is a quadratic assignment problem once abilities are padded with
+    dummy abilities to one per key: binding abilities i and j to keys k and l costs flow[i, j] * adjacency[k, l], on
+    top of a linear cost per ability and key. Every iteration makes the best swap of two abilities' keys that isn't
+    tabu, where swapping with a dummy ability moves an ability to a free key. The loss change of every swap is kept in
+    a matrix, updated after each move in O(n^2) instead of recomputed in O(n^3). When the search stops finding better
+    bindings, it restarts from a perturbed copy of the best one.
+    """
+
+    def __init__(self, graph: Graph, abilities: DataFrame, combinations: DataFrame, home_node_indices: List[int],
+                 individual_coefficient: float = 1, combination_coefficient: float = 1, tenure: float = None,
+                 aspiration: int = None, stagnation: int = None, perturbation: int = None,
+                 initial_assignments: List[int] = None):
+        """
+        :param tenure: Average number of iterations an ability may not return to a key it left. Defaults to the
+        number of keys; each tenure is drawn from 90% to 110% of it
+        :param aspiration: Number of iterations after which a move bringing both abilities back to keys they haven't
+        been on for that long is made regardless of its loss change. Defaults to five times the number of keys squared
+        :param stagnation: Number of iterations without a new best binding after which the search restarts from a
+        perturbed copy of the best binding (iterated tabu search). Defaults to the number of keys
+        :param perturbation: Number of random swaps applied to the best binding on restart. Defaults to a fifth of the
+        number of keys
+        :param initial_assignments: Binding to start from, random if not provided
+        """
+        self.best_assignments: [numpy.ndarray, None] = None
+        self.best_loss: float = numpy.inf
+        self.num_iter = 0
+
+        self.graph = graph
+        self.abilities = abilities
+        self.combinations = combinations
+        self.home_node_indices = home_node_indices
+
+        self.individual_coefficient = individual_coefficient
+        self.combination_coefficient = combination_coefficient
+
+        self.problem = BindingProblem(graph, abilities, combinations, home_node_indices,
+                                      individual_coefficient=individual_coefficient,
+                                      combination_coefficient=combination_coefficient)
+        self.engine = engine = self.problem.engine
+        self.num_abilities = abilities.shape[0]
+        size = graph.size
+
+        # Flow and linear cost matrices, padded with dummy abilities to be square
+        self.flow = numpy.zeros((size, size))
+        self.flow[:self.num_abilities, :self.num_abilities] = engine.flow_matrix()
+        self.costs = numpy.zeros((size, size))
+        self.costs[:self.num_abilities] = engine.linear_costs()
+
+        # Swapping two interchangeable abilities (same costs and flows, e.g. two dummy abilities) never changes
+        # anything, and would only let the search wander
+        profiles = numpy.concatenate([self.costs, self.flow, self.flow.T], axis=1)
+        _, kind = numpy.unique(profiles, axis=0, return_inverse=True)
+        kind = kind.ravel()
+        self.allowed = numpy.triu(kind[:, None] != kind[None, :], 1)
+
+        self.tenure = size if tenure is None else tenure
+        self.aspiration = 5 * size * size if aspiration is None else aspiration
+        self.current_tenure = self.draw_tenure()
+        self.stagnation = size if stagnation is None else stagnation
+        self.perturbation = max(2, size // 5) if perturbation is None else perturbation
+        self.best_iter = 0
+        # Iteration from which each ability may be bound to each key again
+        self.tabu = numpy.zeros((size, size), dtype=int)
+        # Iteration at which each ability was last bound to each key
+        self.last_bound = numpy.zeros((size, size), dtype=int)
+
+        if initial_assignments is None:
+            self.permutation = numpy.random.permutation(size)
+        else:
+            initial_assignments = numpy.asarray(initial_assignments, dtype=int)
+            free = numpy.setdiff1d(numpy.arange(size), initial_assignments)
+            self.permutation = numpy.concatenate([initial_assignments, numpy.random.permutation(free)])
+        self.reset()
+
+    @property
+    def best_binding(self) -> [KeyBinding, None]:
+        if self.best_assignments is None:
+            return None
+        return KeyBinding.from_problem(self.problem, self.best_assignments)
+
+    def draw_tenure(self) -> int:
+        return max(1, int(round(numpy.random.uniform(0.9, 1.1) * self.tenure)))
+
+    def reset(self) -> None:
+        """
+        Recomputes the loss, the permuted distance matrix and the whole swap delta matrix from the current binding
+        :return:
+        """
+        # distance[i, j] is the distance between the keys of abilities i and j
+        self.distance = self.engine.adjacency[numpy.ix_(self.permutation, self.permutation)]
+        self.current_loss = self.engine.loss(self.permutation[:self.num_abilities])
+        self.deltas = numpy.array([self.delta_row(row) for row in range(self.graph.size)])
+        self.update_best()
+
+    def update_best(self) -> None:
+        if self.current_loss < self.best_loss:
+            # Recompute from scratch so accumulated rounding from deltas doesn't drift
+            self.current_loss = self.engine.loss(self.permutation[:self.num_abilities])
+            self.best_loss = self.current_loss
+            self.best_assignments = self.permutation[:self.num_abilities].copy()
+            self.best_iter = self.num_iter
+
+    def perturb(self) -> None:
+        """
+        Restarts from the best binding found so far, with a number of random swaps applied
+        :return:
+        """
+        free = numpy.setdiff1d(numpy.arange(self.graph.size), self.best_assignments)
+        self.permutation = numpy.concatenate([self.best_assignments, numpy.random.permutation(free)])
+        for i in range(self.perturbation):
+            # Each swap moves at least one real ability
+            first = numpy.random.randint(0, self.num_abilities)
+            second = numpy.random.randint(0, self.graph.size)
+            self.permutation[[first, second]] = self.permutation[[second, first]]
+        self.best_iter = self.num_iter
+        self.reset()
+
+    def delta_row(self, first: int) -> numpy.ndarray:
+        """
+        Computes the loss change of swapping the keys of an ability with those of every ability, in O(n^2)
+        :param first: Index of the (possibly dummy) ability
+        :return: Loss after the swap minus loss before the swap, for every second ability
+        """
+        flow = self.flow
+        distance = self.distance
+        permutation = self.permutation
+        size = self.graph.size
+
+        # Terms of every third ability k other than the two swapped ones: flows into and out of the pair
+        incoming = (flow[:, first][None, :] - flow.T) * (distance.T - distance[:, first][None, :])
+        outgoing = (flow[first][None, :] - flow) * (distance - distance[first][None, :])
+        terms = incoming + outgoing
+        terms[:, first] = 0
+        terms[numpy.arange(size), numpy.arange(size)] = 0
+        delta = numpy.sum(terms, axis=1)
+
+        # Terms between the two swapped abilities
+        diagonal = numpy.diag(flow)
+        distance_diagonal = numpy.diag(distance)
+        delta = delta + (flow[first, first] - diagonal) * (distance_diagonal - distance[first, first]) +\
+            (flow[first] - flow[:, first]) * (distance[:, first] - distance[first])
+
+        # Linear terms
+        delta = delta + self.costs[first, permutation] + self.costs[:, permutation[first]] -\
+            self.costs[first, permutation[first]] - self.costs[numpy.arange(size), permutation]
+        delta[first] = 0
+        return delta
+
+    def swap(self, first: int, second: int) -> None:
+        """
+        Swaps the keys of two abilities, updating the swap delta matrix
+        :param first: Index of the first (possibly dummy) ability
+        :param second: Index of the second (possibly dummy) ability
+        :return:
+        """
+        self.current_loss = self.current_loss + self.deltas[first, second]
+        permutation = self.permutation
+        permutation[[first, second]] = permutation[[second, first]]
+        self.distance[[first, second]] = self.distance[[second, first]]
+        self.distance[:, [first, second]] = self.distance[:, [second, first]]
+
+        # For pairs disjoint from the swapped one, the delta changes by two rank one products
+        flow = self.flow
+        distance = self.distance
+        for flow_difference, distance_difference in [(flow[first] - flow[second],
+                                                      distance[second] - distance[first]),
+                                                     (flow[:, first] - flow[:, second],
+                                                      distance[:, second] - distance[:, first])]:
+            self.deltas += (flow_difference[:, None] - flow_difference[None, :]) *\
+                (distance_difference[:, None] - distance_difference[None, :])
+
+        # Pairs including one of the swapped abilities are recomputed
+        for row in [first, second]:
+            self.deltas[row] = self.delta_row(row)
+            self.deltas[:, row] = self.deltas[row]
+
+    def run_iter(self) -> float:
+        """
+        Makes the best swap that isn't tabu
+        :return: Loss of the current binding
+        """
+        iteration = self.num_iter
+        permutation = self.permutation
+
+        # A swap is tabu if it brings either ability back to a key it recently left. Dummy abilities can go anywhere
+        tabu = self.tabu[:, permutation] > iteration
+        tabu[self.num_abilities:] = False
+        tabu = tabu | tabu.T
+        # A swap bringing both abilities to keys they haven't been on for long is made regardless
+        forgotten = iteration - self.last_bound[:, permutation] > self.aspiration
+        forgotten[self.num_abilities:] = True
+        forgotten = forgotten & forgotten.T & self.allowed
+
+        if numpy.any(forgotten):
+            deltas = numpy.where(forgotten, self.deltas, numpy.inf)
+            first, second = numpy.unravel_index(numpy.argmin(deltas), deltas.shape)
+        else:
+            improving = self.current_loss + self.deltas < self.best_loss - 1e-9
+            candidates = self.allowed & (~tabu | improving)
+            if not numpy.any(candidates):
+                candidates = self.allowed
+            deltas = numpy.where(candidates, self.deltas, numpy.inf)
+            # Ties are broken at random, so that plateaus of equally good moves don't lead to cycles
+            best = numpy.flatnonzero(deltas <= numpy.min(deltas) + 1e-9)
+            first, second = numpy.unravel_index(numpy.random.choice(best), deltas.shape)
+
+        if first != second:
+            self.tabu[first, permutation[first]] = iteration + self.current_tenure
+            self.tabu[second, permutation[second]] = iteration + self.current_tenure
+            self.swap(first, second)
+            self.last_bound[first, permutation[first]] = iteration
+            self.last_bound[second, permutation[second]] = iteration
+            self.update_best()
+
+        self.num_iter = self.num_iter + 1
+        if self.num_iter % max(1, int(2 * self.tenure)) == 0:
+            self.current_tenure = self.draw_tenure()
+        if self.num_iter - self.best_iter >= self.stagnation:
+            self.perturb()
+        return self.current_loss
@@ -0,0 +1,217 @@
+import numpy
+
+
+class TreeStore:
+    """
+    Struct-of-arrays storage for a Monte Carlo search tree.
+
+    Nodes are rows of preallocated arrays (visits, mean loss, virtual visits, child block). A node's children live in
+    a contiguous block of child slots, one per key that can be assigned next; each slot holds the key and the index
+    of the child node, or -1 if that child hasn't been created yet. Child blocks are only allocated the first time a
+    node is expanded, and all arrays grow in chunks.
+    """
+
+    def __init__(self, chunk_size: int = 1 << 16, max_nodes: int = None):
+        """
+        :param chunk_size: Number of nodes (and child slots) added each time the arrays grow
+        :param max_nodes: Maximum number of nodes, after which new nodes are no longer created
+        """
+        self.chunk_size = chunk_size
+        self.max_nodes = max_nodes
+
+        self.num_nodes = 0
+        self.visits = numpy.zeros(chunk_size, dtype=numpy.int64)
+        self.loss = numpy.zeros(chunk_size)
+        self.virtual_visits = numpy.zeros(chunk_size, dtype=numpy.int32)
+        self.child_start = numpy.zeros(chunk_size, dtype=numpy.int64)
+        self.num_children = numpy.zeros(chunk_size, dtype=numpy.int32)
+
+        self.num_slots = 0
+        self.child_key = numpy.zeros(chunk_size, dtype=numpy.int32)
+        self.child_node = numpy.zeros(chunk_size, dtype=numpy.int32)
+
+    @staticmethod
+    def grow(array: numpy.ndarray, size: int, chunk_size: int) -> numpy.ndarray:
+        if size <= len(array):
+            return array
+        grown = numpy.zeros(len(array) + max(chunk_size, size - len(array)), dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def is_full(self) -> bool:
+        return self.max_nodes is not None and self.num_nodes >= self.max_nodes
+
+    def add_node(self, num_children: int) -> int:
+        """
+        Creates a node without allocating its children
+        :param num_children: Number of keys that can be assigned below this node
+        :return: Index of the new node, or -1 if the tree is full
+        """
+        if self.is_full():
+            return -1
+        node = self.num_nodes
+        self.num_nodes = self.num_nodes + 1
+        if node >= len(self.visits):
+            self.visits = TreeStore.grow(self.visits, self.num_nodes, self.chunk_size)
+            self.loss = TreeStore.grow(self.loss, self.num_nodes, self.chunk_size)
+            self.virtual_visits = TreeStore.grow(self.virtual_visits, self.num_nodes, self.chunk_size)
+            self.child_start = TreeStore.grow(self.child_start, self.num_nodes, self.chunk_size)
+            self.num_children = TreeStore.grow(self.num_children, self.num_nodes, self.chunk_size)
+        self.visits[node] = 0
+        self.loss[node] = 0
+        self.virtual_visits[node] = 0
+        self.child_start[node] = -1
+        self.num_children[node] = num_children
+        return node
+
+    def expand(self, node: int, keys: numpy.ndarray) -> None:
+        """
+        Allocates the child slots of a node, if not yet allocated
+        :param node: Index of the node
+        :param keys: Keys that can be assigned below this node, one per child
+        :return:
+        """
+        if self.child_start[node] >= 0:
+            return
+        start = self.num_slots
+        self.num_slots = self.num_slots + len(keys)
+        if self.num_slots > len(self.child_key):
+            self.child_key = TreeStore.grow(self.child_key, self.num_slots, self.chunk_size)
+            self.child_node = TreeStore.grow(self.child_node, self.num_slots, self.chunk_size)
+        self.child_key[start:self.num_slots] = keys
+        self.child_node[start:self.num_slots] = -1
+        self.child_start[node] = start
+        self.num_children[node] = len(keys)
+
+    def children(self, node: int) -> slice:
+        """
+        :param node: Index of an expanded node
+        :return: Slice of the node's child slots
+        """
+        start = self.child_start[node]
+        return slice(start, start + self.num_children[node])
+
+    def select_slot(self, node: int, virtual_loss: float = numpy.inf) -> int:
+        """
+        Picks the child slot to descend into: a random child that hasn't been created yet if there is one, otherwise
+        the child with the highest UCT value, ties broken at random
+        :param node: Index of an expanded node
+        :param virtual_loss: Loss attributed to virtual visits
+        :return: Index of the slot
+        """
+        slots = self.children(node)
+        children = self.child_node[slots]
+        unvisited = numpy.flatnonzero(children < 0)
+        if len(unvisited):
+            return slots.start + unvisited[numpy.random.randint(0, len(unvisited))]
+
+        uct_values = self.compute_uct(node, children, virtual_loss)
+        indices = numpy.flatnonzero(uct_values == numpy.max(uct_values))
+        return slots.start + indices[numpy.random.randint(0, len(indices))]
+
+    def compute_uct(self, node: int, children: numpy.ndarray, virtual_loss: float = numpy.inf) -> numpy.ndarray:
+        parent_visits = self.visits[node] + self.virtual_visits[node]
+        visits = self.visits[children]
+        virtual_visits = self.virtual_visits[children]
+        child_visits = visits + virtual_visits
+        if parent_visits == 0:
+            return numpy.zeros(len(children))
+
+        # Pending selections count as visits with a pessimistic loss, so concurrent selections spread out
+        penalty = numpy.multiply(virtual_visits, virtual_loss, out=numpy.zeros(len(children)),
+                                 where=virtual_visits > 0)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            loss = numpy.where(virtual_visits > 0, (self.loss[children] * visits + penalty) / child_visits,
+                               self.loss[children])
+            # We add an epsilon to the loss in case loss is ever 0
+            uct = 1 / (loss + .01) + numpy.sqrt(numpy.log(parent_visits) / child_visits)
+        return numpy.where(child_visits == 0, 0, uct)
+
+    def add_child(self, slot: int, num_children: int) -> int:
+        """
+        Creates the child node of a slot
+        :param slot: Index of the slot
+        :param num_children: Number of keys that can be assigned below the child
+        :return: Index of the child node, or -1 if the tree is full
+        """
+        child = self.add_node(num_children)
+        self.child_node[slot] = child
+        return child
+
+    def update(self, nodes: numpy.ndarray, loss: float) -> None:
+        """
+        Adds a visit with the given loss to each node, updating their mean loss
+        :param nodes: Indices of distinct nodes
+        :param loss: Loss of the visit
+        :return:
+        """
+        self.visits[nodes] += 1
+        self.loss[nodes] += (loss - self.loss[nodes]) / self.visits[nodes]
+
+    def merge_children(self, node: int, keys: numpy.ndarray, visits: numpy.ndarray, losses: numpy.ndarray) -> None:
+        """
+        Adds the child statistics of the same node from another tree to this node's children
+        :param node: Index of an expanded node
+        :param keys: Key of each child
+        :param visits: Visit count of each child
+        :param losses: Mean loss of each child
+        :return:
+        """
+        slots = self.children(node)
+        slot_of_key = {int(key): slots.start + index for index, key in enumerate(self.child_key[slots])}
+        for key, child_visits, child_loss in zip(keys, visits, losses):
+            if child_visits == 0:
+                continue
+            slot = slot_of_key[int(key)]
+            child = self.child_node[slot]
+            if child < 0:
+                child = self.add_child(slot, self.num_children[node] - 1)
+                if child < 0:
+                    continue
+            total = self.visits[child] + child_visits
+            self.loss[child] = (self.loss[child] * self.visits[child] + child_loss * child_visits) / total
+            self.visits[child] = total
+
+        merged_visits = numpy.sum(visits)
+        if merged_visits:
+            total = self.visits[node] + merged_visits
+            self.loss[node] = (self.loss[node] * self.visits[node] + numpy.dot(visits, losses)) / total
+            self.visits[node] = total
+
+    def to_arrays(self) -> dict:
+        """
+        :return: Compact copy of the tree: its used nodes and slots, without virtual visits (which only exist while a
+        batch is in flight)
+        """
+        return {"tree_visits": self.visits[:self.num_nodes], "tree_loss": self.loss[:self.num_nodes],
+                "tree_child_start": self.child_start[:self.num_nodes],
+                "tree_num_children": self.num_children[:self.num_nodes],
+                "tree_child_key": self.child_key[:self.num_slots], "tree_child_node": self.child_node[:self.num_slots]}
+
+    @staticmethod
+    def from_arrays(arrays: dict, chunk_size: int = 1 << 16, max_nodes: int = None):
+        """
+        Rebuilds a tree from the arrays returned by to_arrays()
+        :param arrays: Arrays of the tree
+        :param chunk_size: Number of nodes (and child slots) added each time the arrays grow
+        :param max_nodes: Maximum number of nodes, after which new nodes are no longer created
+        :return: Tree
+        """
+        tree = TreeStore(chunk_size, max_nodes)
+        tree.num_nodes = len(arrays["tree_visits"])
+        tree.num_slots = len(arrays["tree_child_key"])
+        for name in ["visits", "loss", "child_start", "num_children", "child_key", "child_node"]:
+            array = getattr(tree, name)
+            size = tree.num_nodes if name in ["visits", "loss", "child_start", "num_children"] else tree.num_slots
+            array = TreeStore.grow(array, size, chunk_size)
+            array[:size] = arrays["tree_" + name]
+            setattr(tree, name, array)
+        tree.virtual_visits = TreeStore.grow(tree.virtual_visits, tree.num_nodes, chunk_size)
+        return tree
+
+    def nbytes(self) -> int:
+        """
+        :return: Memory used by the tree's arrays, in bytes
+        """
+        return sum(array.nbytes for array in [self.visits, self.loss, self.virtual_visits, self.child_start,
+                                              self.num_children, self.child_key, self.child_node])
@@ -0,0 +1,71 @@
+from typing import List
+
+from pandas import DataFrame, Index
+
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.LossEngine import LossEngine
+
+
+class BindingProblem:
+    """
+    Immutable description of a key binding problem: the key graph, the abilities and combinations to bind, the home
+    nodes and the loss coefficients, along with everything derived from them once (ability name index, compiled
+    loss engine). Shared by every KeyBinding of the problem, which then only hold their own assignment state.
+    """
+
+    __slots__ = ["graph", "abilities", "combinations", "home_nodes", "node_priority", "individual_coefficient",
+                 "combination_coefficient", "shortest_paths", "ability_index", "num_abilities", "_engine", "_frozen"]
+
+    def __init__(self, graph: Graph, abilities: DataFrame, combinations: DataFrame, home_nodes: List[int],
+                 node_priority: List[float] = None, individual_coefficient: float = 1,
+                 combination_coefficient: float = 1, engine: LossEngine = None, shortest_paths: bool = False):
+        """
+        :param graph: Graph object for keys
+        :param abilities: Data frame of abilities, with their priority
+        :param combinations: Data frame of combinations, with an "indices" column of ability indices
+        :param home_nodes: Index of home nodes
+        :param node_priority: If certain nodes are to be preferred over others
+        :param individual_coefficient: Weight of the individual term
+        :param combination_coefficient: Weight of the combination term
+        :param engine: Loss engine already compiled for this problem. Compiled on first use if not provided
+        :param shortest_paths: Measure distances along the graph's shortest paths rather than its direct edges
+        """
+        self.graph = graph
+        self.abilities = abilities
+        self.combinations = combinations
+        self.home_nodes = home_nodes
+        self.node_priority: List[float] = [] if node_priority is None else node_priority
+        self.individual_coefficient = individual_coefficient
+        self.combination_coefficient = combination_coefficient
+        self.shortest_paths = shortest_paths
+        self.ability_index = Index(abilities["name"])
+        self.num_abilities = abilities.shape[0]
+        self._engine = engine
+        self._frozen = True
+
+    def __setattr__(self, key, value):
+        if getattr(self, "_frozen", False) and key != "_engine":
+            raise AttributeError(f"BindingProblem is immutable, cannot set %s" % key)
+        object.__setattr__(self, key, value)
+
+    def __getstate__(self):
+        return {key: getattr(self, key) for key in BindingProblem.__slots__}
+
+    def __setstate__(self, state):
+        for key in BindingProblem.__slots__:
+            object.__setattr__(self, key, state[key])
+
+    @property
+    def engine(self) -> LossEngine:
+        """
+        :return: Loss engine for this problem, compiled on first use
+        """
+        if self._engine is None:
+            self._engine = LossEngine(self.graph, self.abilities, self.combinations, self.home_nodes,
+                                      self.node_priority, self.individual_coefficient, self.combination_coefficient,
+                                      self.shortest_paths)
+        return self._engine
+
+    @property
+    def num_keys(self) -> int:
+        return self.graph.size
@@ -1,10 +1,28 @@
-from typing import List, Union, Iterable
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import List, Union, Iterable, Dict
 
 import numpy
 from pandas import Index
+from scipy.sparse import csgraph
 
 
 class Graph:
+    """
+    Weighted graph of the keys, as a dense adjacency matrix.
+
+    share() moves the adjacency matrix to a read-only memory mapped file or shared memory block, optionally in
+    single precision. Shared graphs are pickled by handle rather than by value, so that every process a graph is sent
+    to maps the same matrix instead of holding its own copy. Shared memory blocks belong to the process that created
+    them and should only be used by it and its child processes, memory mapped files can be opened by any process with
+    open_shared().
+
+    Distances from every node to the closest of a set of home nodes, and the all-pairs shortest path closure of the
+    matrix, are computed on first use and cached until the adjacency matrix is replaced. Code modifying the matrix
+    in place calls invalidate(). Only the home distances of the last few sets of home nodes are kept.
+    """
+
+    HOME_DISTANCE_CACHE_SIZE = 8
 
     def __init__(self, size: int, names: List[str]):
         """
@@ -15,7 +33,180 @@ class Graph:
         self.adjacency = numpy.zeros((size, size))  # Weights between nodes
         self.size = size
         self.names = names
-        self.name_index = Index(names)
+        self.node_index: Dict[str, int] = {}  # Node index of each name, for constant time lookups
+        for index, name in enumerate(names):
+            self.node_index.setdefault(name, index)
+        # Unique names, and the node index of each, for vectorized lookups. Duplicate names resolve to their first
+        # node, as in node_index
+        self.name_index = Index(list(self.node_index))
+        self.name_nodes = numpy.fromiter(self.node_index.values(), dtype=int, count=len(self.node_index))
+
+        # Shared storage backing the adjacency matrix, if any
+        self._shared_array: [numpy.ndarray, None] = None
+        self._shared_handle: [tuple, None] = None
+        self._shared_memory: [shared_memory.SharedMemory, None] = None
+        self._owner = False
+
+    @property
+    def adjacency(self) -> numpy.ndarray:
+        """
+        :return: Weights between nodes
+        """
+        return self._adjacency
+
+    @adjacency.setter
+    def adjacency(self, adjacency: numpy.ndarray) -> None:
+        self._adjacency = adjacency
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        Clears the distances cached from the adjacency matrix
+        :return:
+        """
+        self._home_distances: Dict[tuple, numpy.ndarray] = OrderedDict()
+        self._shortest_paths: [numpy.ndarray, None] = None
+
+    def shortest_paths(self) -> numpy.ndarray:
+        """
+        Floyd-Warshall closure of the adjacency matrix: the length of the shortest path between every pair of nodes,
+        for layouts where going through another key can be cheaper than going directly. The diagonal is kept from the
+        adjacency matrix, pressing a key twice not going anywhere
+        :return: Read-only matrix of path lengths, computed on first use
+        """
+        if self._shortest_paths is None:
+            adjacency = numpy.asarray(self.adjacency, dtype=float)
+            # Only infinite weights are missing edges, zero weights are edges
+            paths = csgraph.floyd_warshall(csgraph.csgraph_from_dense(adjacency, null_value=numpy.inf))
+            numpy.fill_diagonal(paths, numpy.diag(adjacency))
+            paths.flags.writeable = False
+            self._shortest_paths = paths
+        return self._shortest_paths
+
+    def home_distance(self, home_nodes: Iterable[int], shortest_paths: bool = False) -> numpy.ndarray:
+        """
+        :param home_nodes: Index of home nodes
+        :param shortest_paths: Measure distances along shortest paths rather than direct edges
+        :return: Read-only vector of the minimum distance from every node to the closest home node, computed once per
+        set of home nodes
+        """
+        key = (tuple(sorted(set(int(node) for node in home_nodes))), shortest_paths)
+        distance = self._home_distances.get(key)
+        if distance is not None:
+            self._home_distances.move_to_end(key)
+            return distance
+
+        distances = self.shortest_paths() if shortest_paths else numpy.asarray(self.adjacency)
+        distance = numpy.min(distances[:, list(key[0])], axis=1)
+        if not numpy.issubdtype(distance.dtype, numpy.floating):
+            distance = distance.astype(float)
+        distance.flags.writeable = False
+        self._home_distances[key] = distance
+        if len(self._home_distances) > Graph.HOME_DISTANCE_CACHE_SIZE:
+            self._home_distances.popitem(last=False)
+        return distance
+
+    @property
+    def shared(self) -> bool:
+        """
+        :return: True if the adjacency matrix is in shared storage, and has not been replaced since
+        """
+        return self._shared_array is not None and self.adjacency is self._shared_array
+
+    def share(self, path: str = None, dtype: numpy.dtype = numpy.float64) -> None:
+        """
+        Moves the adjacency matrix to read-only shared storage. Loss engines built before sharing keep their own copy,
+        so graphs should be shared before creating solvers
+        :param path: File to memory map the matrix to. A shared memory block is used if not provided
+        :param dtype: Type of the shared matrix, numpy.float32 to halve its size
+        :return:
+        """
+        self.close()
+        adjacency = numpy.asarray(self.adjacency, dtype=dtype)
+        if path is not None:
+            array = numpy.lib.format.open_memmap(path, mode="w+", dtype=adjacency.dtype, shape=adjacency.shape)
+            array[:] = adjacency
+            array.flush()
+            del array
+            self._shared_handle = ("memmap", path, adjacency.dtype.str, adjacency.shape)
+        else:
+            self._shared_memory = shared_memory.SharedMemory(create=True, size=max(1, adjacency.nbytes))
+            array = numpy.ndarray(adjacency.shape, dtype=adjacency.dtype, buffer=self._shared_memory.buf)
+            array[:] = adjacency
+            self._shared_handle = ("shared_memory", self._shared_memory.name, adjacency.dtype.str, adjacency.shape)
+        self._owner = True
+        self.attach()
+
+    def attach(self) -> None:
+        """
+        Maps the adjacency matrix from the graph's shared storage handle, read-only
+        :return:
+        """
+        kind, location, dtype, shape = self._shared_handle
+        if kind == "memmap":
+            array = numpy.load(location, mmap_mode="r")
+        else:
+            if self._shared_memory is None:
+                self._shared_memory = shared_memory.SharedMemory(name=location)
+            array = numpy.ndarray(shape, dtype=numpy.dtype(dtype), buffer=self._shared_memory.buf)
+            array.flags.writeable = False
+        self._shared_array = array
+        self.adjacency = array
+
+    @staticmethod
+    def open_shared(path: str, names: List[str]):
+        """
+        Opens a graph whose adjacency matrix was shared to a memory mapped file by another graph
+        :param path: File the matrix was shared to
+        :param names: Names of the nodes
+        :return: Graph, sharing the file's matrix
+        """
+        graph = Graph(0, names)
+        graph._shared_handle = ("memmap", path, None, None)
+        graph.attach()
+        graph.size = graph.adjacency.shape[0]
+        return graph
+
+    def close(self) -> None:
+        """
+        Releases the graph's shared storage, removing its shared memory block if the graph created it. The adjacency
+        matrix is left as a private copy
+        :return:
+        """
+        if self._shared_handle is None:
+            return
+        if self.shared:
+            self.adjacency = numpy.array(self.adjacency)
+        self._shared_array = None
+        self._shared_handle = None
+        if self._shared_memory is not None:
+            if self._owner:
+                self._shared_memory.unlink()
+            try:
+                self._shared_memory.close()
+            except BufferError:
+                # Arrays still view the block, which is unmapped once they are gone
+                pass
+            self._shared_memory = None
+        self._owner = False
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shared_array"] = None
+        state["_shared_memory"] = None
+        state["_owner"] = False
+        state["_home_distances"] = OrderedDict()
+        state["_shortest_paths"] = None
+        if self.shared:
+            del state["_adjacency"]
+        else:
+            state["_shared_handle"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "_adjacency" not in state:
+            self.attach()
 
     def minimum_distance(self, nodes_from: Union[int, List[int]], nodes_to: Union[int, List[int]]) -> float:
         """
@@ -24,9 +215,12 @@ class Graph:
         :param nodes_to: Index of node or nodes to which to compute the distance
         :return: Minimum distance between nodes
         """
+        if isinstance(nodes_to, Iterable):
+            # Arbitrary sets of nodes, not worth caching like home distances
+            return numpy.min(self.adjacency[numpy.ix_(numpy.atleast_1d(nodes_from), list(nodes_to))])
         if isinstance(nodes_from, Iterable):
-            return numpy.min([numpy.min(self.adjacency[i, nodes_to]) for i in nodes_from])
-        return numpy.min(self.adjacency[nodes_from, nodes_to])
+            return numpy.min(self.adjacency[nodes_from, nodes_to])
+        return self.adjacency[nodes_from, nodes_to]
 
     def path_length(self, nodes: List[int]) -> float:
         """
@@ -47,7 +241,18 @@ class Graph:
         :param name: Name of node
         :return: index of node
         """
-        return self.name_index.get_loc(name)
+        return self.node_index[name]
 
     def get_node_indices(self, names: List[str]) -> List[int]:
-        return [self.get_node_index(name) for name in names]
+        return [self.node_index[name] for name in names]
+
+    def get_node_index_array(self, names: Iterable[str]) -> numpy.ndarray:
+        """
+        Gets indices of many nodes in one vectorized lookup
+        :param names: Names of nodes
+        :return: Array of node indices
+        """
+        positions = self.name_index.get_indexer(names)
+        if numpy.any(positions < 0):
+            raise KeyError(list(numpy.asarray(names)[positions < 0]))
+        return self.name_nodes[positions]
@@ -1,77 +1,186 @@
+import time as clock
 from typing import List
 
 import numpy
 from pandas import DataFrame, Index
 
+from keybind_generator.util.BindingProblem import BindingProblem
 from keybind_generator.util.Graph import Graph
+from keybind_generator.util.LossEngine import LossEngine
+from keybind_generator.util.Stats import Stats
 
 
 class KeyBinding:
     """
     Key binding class, for computing loss for a particular binding, as well as representing the model
+
+    Assignments are kept in a fixed size array, and unassigned keys in a pool from which keys are removed by swapping
+    in the last free key, so assigning, membership checks and drawing a random free key are constant time. Everything
+    else lives in the shared BindingProblem, so bindings are cheap to create from a problem and to copy.
+
+    Loss evaluations and assignments are recorded into the binding's stats, if any, which copies share.
     """
 
+    __slots__ = ["problem", "assignment_array", "num_assigned", "free_keys", "free_position", "num_free", "stats"]
+
     def __init__(self, graph: Graph, abilities: DataFrame, combinations: DataFrame, home_nodes: List[int],
                  assignments: List[int] = None, node_priority: List[float] = None,
-                 individual_coefficient: float = 1, combination_coefficient: float = 1):
+                 individual_coefficient: float = 1, combination_coefficient: float = 1, engine: LossEngine = None):
         """
-        Initializes Key binding object.
+        Initializes Key binding object. Solvers creating many bindings should build a BindingProblem once and use
+        from_problem() or copy() instead.
         :param graph: Graph object for keys
         :param abilities: List of ability names, in order of assignment
         :param home_nodes: Index of home nodes
         :param node_priority: If certain nodes are to be preferred over others
+        :param engine: Precompiled loss engine for this problem, shared between bindings. Built on first use if
+        not provided.
 
         """
+        self.problem = BindingProblem(graph, abilities, combinations, home_nodes, node_priority,
+                                      individual_coefficient, combination_coefficient, engine)
+        self.stats: [Stats, None] = None
+        self.assignments = [] if assignments is None else assignments
 
-        self.graph = graph
-        self.abilities = abilities
-        self.ability_index = Index(abilities["name"])
-        self.combinations = combinations
-        self.home_nodes = home_nodes
-        self.unassigned: numpy.array = numpy.array(range(self.graph.size))
+    @staticmethod
+    def from_problem(problem: BindingProblem, assignments: List[int] = None, stats: Stats = None):
+        """
+        Creates a binding for an existing problem, without recomputing anything from the problem's data frames
+        :param problem: Problem the binding belongs to
+        :param assignments: Keys of the first abilities, in ability order
+        :param stats: Stats to record loss evaluations and assignments into
+        :return: Key binding
+        """
+        binding = KeyBinding.__new__(KeyBinding)
+        binding.problem = problem
+        binding.stats = stats
+        binding.assignments = [] if assignments is None else assignments
+        return binding
 
-        self.node_priority: List[float] = []
-        if node_priority is not None:
-            self.node_priority = node_priority
+    def copy(self):
+        """
+        :return: Copy of this binding's assignment state, sharing the same problem
+        """
+        binding = KeyBinding.__new__(KeyBinding)
+        binding.problem = self.problem
+        binding.assignment_array = self.assignment_array.copy()
+        binding.num_assigned = self.num_assigned
+        binding.free_keys = self.free_keys.copy()
+        binding.free_position = self.free_position.copy()
+        binding.num_free = self.num_free
+        binding.stats = self.stats
+        return binding
+
+    @property
+    def graph(self) -> Graph:
+        return self.problem.graph
+
+    @property
+    def abilities(self) -> DataFrame:
+        return self.problem.abilities
+
+    @property
+    def combinations(self) -> DataFrame:
+        return self.problem.combinations
+
+    @property
+    def home_nodes(self) -> List[int]:
+        return self.problem.home_nodes
+
+    @property
+    def ability_index(self) -> Index:
+        return self.problem.ability_index
+
+    @property
+    def num_abilities(self) -> int:
+        return self.problem.num_abilities
+
+    @property
+    def engine(self) -> LossEngine:
+        return self.problem.engine
+
+    @property
+    def assignments(self) -> numpy.ndarray:
+        """
+        :return: Key of each assigned ability, in ability order
+        """
+        return self.assignment_array[:self.num_assigned]
 
-        self.assignments: List[int] = []
-        if assignments is not None:
-            self.assignments = list(assignments)
+    @assignments.setter
+    def assignments(self, assignments: List[int]) -> None:
+        """
+        Replaces all assignments, rebuilding the pool of unassigned keys
+        :param assignments: Keys of the first abilities, in ability order
+        """
+        assignments = numpy.asarray(assignments, dtype=int)
+        self.assignment_array = numpy.full(self.num_abilities, -1, dtype=int)
+        self.assignment_array[:len(assignments)] = assignments
+        self.num_assigned = len(assignments)
+
+        size = self.problem.graph.size
+        assigned = numpy.zeros(size, dtype=bool)
+        assigned[assignments] = True
+        free = numpy.flatnonzero(~assigned)
+        self.num_free = len(free)
+        self.free_keys = numpy.zeros(size, dtype=int)
+        self.free_keys[:self.num_free] = free
+        self.free_position = numpy.full(size, -1, dtype=int)
+        self.free_position[self.free_keys[:self.num_free]] = numpy.arange(self.num_free)
+
+    @property
+    def unassigned(self) -> numpy.ndarray:
+        """
+        :return: Unassigned keys, in no particular order
+        """
+        return self.free_keys[:self.num_free]
 
-        self.individual_coefficient = individual_coefficient
-        self.combination_coefficient = combination_coefficient
+    def get_engine(self) -> LossEngine:
+        """
+        Returns the loss engine for this binding's problem, compiling it if necessary
+        :return:
+        """
+        return self.problem.engine
 
     def assign_from_data(self, data: DataFrame):
         """
-        Assigns keys from a data frame containing binding data
+        Assigns keys from a data frame containing binding data, resolving all ability and key names in one
+        vectorized lookup each
         :param data:
         :return:
         """
-        self.assignments = [0] * self.abilities.shape[0]
-
-        def assignment_function(row):
-            # print(f"Assigning %s : %s" % (row["ability"], str(row["bind"])))
-
-            ability_index = self.ability_index.get_loc(row["ability"])
-            # print(f"Ability index: %d" % ability_index)
-
-            bind_index = self.graph.get_node_index(row["bind"])
-            # print(f"Bind index: %d" % bind_index)
-
-            self.assignments[ability_index] = bind_index
+        ability_indices = self.ability_index.get_indexer(data["ability"])
+        if numpy.any(ability_indices < 0):
+            raise KeyError(list(data["ability"][ability_indices < 0]))
+        bind_indices = self.graph.get_node_index_array(data["bind"])
 
-        data.apply(assignment_function, axis=1)
-
-        # TODO
-        pass
+        assignments = numpy.zeros(self.num_abilities, dtype=int)
+        assignments[ability_indices] = bind_indices
+        self.assignments = assignments
 
     def get_unassigned(self) -> numpy.array:
         """
         Returns list of unassigned indices
-        :return:
+        :return: Unassigned keys, in ascending order
+        """
+        return numpy.sort(self.unassigned)
+
+    def random_unassigned(self) -> int:
+        """
+        :return: An unassigned key, picked uniformly at random
+        """
+        return self.free_keys[numpy.random.randint(0, self.num_free)]
+
+    def remove_free(self, index: int) -> None:
+        """
+        Removes a key from the pool of unassigned keys, moving the last key of the pool into its place
+        :param index: Unassigned key
         """
-        return self.unassigned
-        # return numpy.setdiff1d(range(self.graph.size), self.assignments)
+        position = self.free_position[index]
+        last = self.free_keys[self.num_free - 1]
+        self.free_keys[position] = last
+        self.free_position[last] = position
+        self.free_position[index] = -1
+        self.num_free = self.num_free - 1
 
     def get_assignment(self, ability_name: str) -> [int, None]:
         """
@@ -80,9 +189,9 @@ class KeyBinding:
         :return:
         """
         ability_position = self.ability_index.get_loc(ability_name)
-        if ability_position > len(self.assignments):
+        if ability_position >= self.num_assigned:
             return None
-        return self.assignments[ability_position]
+        return self.assignment_array[ability_position]
 
     def has_assigned(self, index: int) -> bool:
         """
@@ -90,14 +199,14 @@ class KeyBinding:
         :param index: Key index we wish to assign
         :return: True if already assigned, false if not
         """
-        return index in self.assignments
+        return self.free_position[index] < 0
 
     def fully_assigned(self) -> bool:
         """
         Determines whether or not this key binding has assigned all abilities to keys
         :return: True if all abilities have been assigned, false if not
         """
-        return len(self.assignments) == self.abilities.shape[0]
+        return self.num_assigned == self.problem.num_abilities
 
     def assign_next(self, index: int) -> bool:
         """
@@ -105,13 +214,41 @@ class KeyBinding:
         :param index: Index of key to assign next ability
         :return: True if success, false if unable
         """
-        if not self.has_assigned(index) and len(self.assignments) < self.graph.size:
-            self.assignments.append(index)
-            self.unassigned = numpy.delete(self.unassigned, numpy.where(self.unassigned == index))
+        if self.free_position[index] >= 0 and self.num_assigned < self.problem.num_abilities:
+            start = clock.perf_counter() if self.stats is not None else 0
+            self.assignment_array[self.num_assigned] = index
+            self.num_assigned = self.num_assigned + 1
+            self.remove_free(index)
+            if self.stats is not None:
+                self.stats.add("assign", clock.perf_counter() - start)
             return True
         else:
             return False
 
+    def assign_remaining(self, indices: numpy.ndarray) -> bool:
+        """
+        Assigns the remaining abilities, in order, to the given keys in one step
+        :param indices: Distinct unassigned keys, at least one per remaining ability
+        :return: True if success, false if unable
+        """
+        start = clock.perf_counter() if self.stats is not None else 0
+        indices = numpy.asarray(indices, dtype=int)[:self.num_abilities - self.num_assigned]
+        if numpy.any(self.free_position[indices] < 0) or len(numpy.unique(indices)) != len(indices):
+            return False
+        self.assignment_array[self.num_assigned:self.num_assigned + len(indices)] = indices
+        self.num_assigned = self.num_assigned + len(indices)
+
+        # Compact the pool of unassigned keys
+        self.free_position[indices] = -1
+        free = self.free_keys[:self.num_free]
+        free = free[self.free_position[free] >= 0]
+        self.num_free = len(free)
+        self.free_keys[:self.num_free] = free
+        self.free_position[free] = numpy.arange(self.num_free)
+        if self.stats is not None:
+            self.stats.add("assign", clock.perf_counter() - start, len(indices))
+        return True
+
     def eval_loss(self) -> float:
         """
         Computes loss function for current binding
@@ -124,40 +261,87 @@ class KeyBinding:
             Individual term is given by minimum distance to home divided by ability priority, plus node priority,
             summed over all abilities,
 
-            Combination term is given by path distance for combinations divided by priority
+            Combination term is given by the path distance between the keys bound to each combination's abilities,
+            divided by priority
             """
+            if self.stats is None:
+                return self.get_engine().loss(self.assignments)
+            start = clock.perf_counter()
+            loss = self.get_engine().loss(self.assignments)
+            self.stats.add("loss", clock.perf_counter() - start)
+            return loss
+        else:
+            return numpy.nan
 
-            # Minimum distance of each ability to the home nodes, divided by priority
-            minimum_distances = [self.graph.minimum_distance(node, self.home_nodes) for node in self.assignments]
-
-            ability_priorities = self.abilities["priority"]
-
-            individual_terms = numpy.divide(minimum_distances, ability_priorities)
-
-            if self.node_priority:
-                individual_terms = numpy.add(individual_terms, self.node_priority)
+    def swap_delta(self, first: int, second: int) -> float:
+        """
+        Computes the change in loss from swapping the keys of two assigned abilities, without re-evaluating the
+        whole binding
+        :param first: Index of the first ability
+        :param second: Index of the second ability
+        :return: Loss after the swap minus loss before the swap
+        """
+        return self.get_engine().swap_delta(self.assignment_array, first, second)
 
-            combination_terms = 0
+    def move_delta(self, ability: int, index: int) -> float:
+        """
+        Computes the change in loss from moving an assigned ability to an unassigned key, without re-evaluating the
+        whole binding
+        :param ability: Index of the ability to move
+        :param index: Index of the unassigned key
+        :return: Loss after the move minus loss before the move
+        """
+        return self.get_engine().move_delta(self.assignment_array, ability, index)
 
-            if self.combinations.shape[0]:
-                combination_terms = numpy.divide([
-                    self.graph.path_length(entry) for entry in self.combinations["indices"]],
-                    self.combinations["priority"])
+    def swap(self, first: int, second: int) -> None:
+        """
+        Swaps the keys of two assigned abilities
+        :param first: Index of the first ability
+        :param second: Index of the second ability
+        :return:
+        """
+        self.assignment_array[[first, second]] = self.assignment_array[[second, first]]
 
-            return self.individual_coefficient * numpy.sum(individual_terms) +\
-                   self.combination_coefficient * numpy.sum(combination_terms)
-        else:
-            return numpy.nan
+    def move(self, ability: int, index: int) -> bool:
+        """
+        Moves an assigned ability to an unassigned key
+        :param ability: Index of the ability to move
+        :param index: Index of the unassigned key
+        :return: True if success, false if the ability is unassigned or the key is already assigned
+        """
+        if ability >= self.num_assigned or self.has_assigned(index):
+            return False
+        # The ability's old key takes the new key's place in the pool
+        old = self.assignment_array[ability]
+        position = self.free_position[index]
+        self.free_keys[position] = old
+        self.free_position[old] = position
+        self.free_position[index] = -1
+        self.assignment_array[ability] = index
+        return True
+
+    def eval_batch_loss(self, assignments: numpy.ndarray) -> numpy.ndarray:
+        """
+        Computes the loss for many candidate bindings of this binding's problem in one vectorized call
+        :param assignments: (number of candidates x number of abilities) array of node indices
+        :return: Value of the loss function for each candidate
+        """
+        if self.stats is None:
+            return self.get_engine().batch_loss(assignments)
+        start = clock.perf_counter()
+        losses = self.get_engine().batch_loss(assignments)
+        self.stats.add("loss", clock.perf_counter() - start, len(losses))
+        return losses
 
     def __str__(self):
         """
         String representation of key binding
         :return: String representation of key binding
         """
-        if not self.assignments:
+        if not self.num_assigned:
             return ""
 
-        ability_names = self.abilities["name"][0:len(self.assignments)]
+        ability_names = self.abilities["name"][0:self.num_assigned]
         key_strings = [self.graph.names[entry] for entry in self.assignments]
         binding_strings = [value + " : " + key_strings[index] for index, value in enumerate(ability_names)]
         return "\n".join(binding_strings)
\ No newline at end of file
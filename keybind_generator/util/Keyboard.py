@@ -1,7 +1,6 @@
+import math
 from abc import ABC, abstractmethod
-from typing import List
-
-from pandas import Index
+from typing import List, Dict
 
 from keybind_generator.util.Graph import Graph
 
@@ -64,8 +63,8 @@ class Keyboard:
         def distance_to(self, other):
             if isinstance(other, Keyboard.KeyEntry):
                 # Return euclidean distance to other key entry
-                distance = numpy.sqrt(numpy.square(self.horizontal_coefficient*(other.x-self.x)) +
-                                      numpy.square((other.y-self.y)*self.vertical_coefficient))
+                distance = math.sqrt((self.horizontal_coefficient*(other.x-self.x)) ** 2 +
+                                     ((other.y-self.y)*self.vertical_coefficient) ** 2)
             else:
                 # Distance between keyboard keys and mouse keys and vice versa is 0
                 distance = 0
@@ -121,9 +120,48 @@ class Keyboard:
         Constructs a keyboard object.
         """
         self.entries: List[Keyboard.Key] = []
+        self.key_index: Dict[str, int] = {}  # Node index of each key name, maintained as keys are added
         self.horizontal_coefficient = horizontal_coefficient
         self.vertical_coefficient = vertical_coefficient
 
+    @staticmethod
+    def default() -> "Keyboard":
+        """
+        :return: Keyboard and mouse layout with Shift and Alt layers, as used by the integration tests
+        """
+        keyboard = Keyboard(horizontal_coefficient=1, vertical_coefficient=1)
+        keyboard.add_key_row(Keyboard.KeyRow(0, 2, ["F1", "F2", "F3", "F4", "F5", "F6"]))
+        for modifier, penalty in [("", 0), ("Shift", 4)]:
+            keyboard.add_key_row(Keyboard.KeyRow(1.5, 1, ["1", "2", "3", "4", "5", "6", "7"]), modifier, penalty)
+        for keys, modifiers in [(["Q", "W", "E", "R", "T", "Y"], [("", 0), ("Shift", 4)]),
+                                (["Q", "W", "E", "R", "T"], [("Alt", 8)])]:
+            for modifier, penalty in modifiers:
+                keyboard.add_key_row(Keyboard.KeyRow(2.5, 1.5, keys), modifier, penalty)
+        for vertical_offset, horizontal_offset, keys in [(3.5, 1.8, ["A", "S", "D", "F", "G", "H"]),
+                                                         (4.5, 2, ["Z", "X", "C", "V", "B", "N"])]:
+            keyboard.add_key_row(Keyboard.KeyRow(vertical_offset, horizontal_offset, keys))
+            for modifier, penalty in [("Shift", 4), ("Alt", 8)]:
+                keyboard.add_key_row(Keyboard.KeyRow(vertical_offset, horizontal_offset, keys[:5]), modifier, penalty)
+
+        keyboard.add_default_mouse_keys()
+        return keyboard
+
+    def add_default_mouse_keys(self) -> None:
+        """
+        Adds the 12 buttons of the default layout's mouse, with Shift and Alt layers
+        :return:
+        """
+        mouse_keys = ["Mouse" + str(index) for index in range(1, 13)]
+        self.add_mouse_keys(mouse_keys, mouse_penalty=6)
+        self.add_mouse_keys(mouse_keys, mouse_penalty=6, modifier="Shift", modifier_penalty=4)
+        self.add_mouse_keys(mouse_keys, mouse_penalty=6, modifier="Alt", modifier_penalty=6)
+
+    def has_mouse_keys(self) -> bool:
+        """
+        :return: True if any key of the keyboard is a mouse key
+        """
+        return any(isinstance(entry, Keyboard.MouseKeyEntry) for entry in self.entries)
+
     def add_key_row(self, key_row: KeyRow, modifier: str = "", modifier_penalty: float = 0) -> None:
         """
         Add a row of keys to the keyboard.
@@ -134,9 +172,9 @@ class Keyboard:
         """
 
         for index, value in enumerate(key_row.keys):
-            self.entries.append(Keyboard.KeyEntry(key_row.keys[index], key_row.horizontal_offset + index,
-                                                  key_row.vertical_offset, modifier, modifier_penalty,
-                                                  self.horizontal_coefficient, self.vertical_coefficient))
+            self.add_entry(Keyboard.KeyEntry(key_row.keys[index], key_row.horizontal_offset + index,
+                                             key_row.vertical_offset, modifier, modifier_penalty,
+                                             self.horizontal_coefficient, self.vertical_coefficient))
 
     def add_mouse_keys(self, keys: List[str], mouse_penalty: float, modifier: str = "", modifier_penalty: float = 0)\
             -> None:
@@ -151,7 +189,16 @@ class Keyboard:
         """
 
         for key in keys:
-            self.entries.append(Keyboard.MouseKeyEntry(key, mouse_penalty, modifier, modifier_penalty))
+            self.add_entry(Keyboard.MouseKeyEntry(key, mouse_penalty, modifier, modifier_penalty))
+
+    def add_entry(self, entry: Key) -> None:
+        """
+        Adds a key to the keyboard, and to the key name index
+        :param entry: Key to add
+        :return:
+        """
+        self.key_index.setdefault(str(entry), len(self.entries))
+        self.entries.append(entry)
 
     def get_index(self, key: str):
         """
@@ -159,7 +206,7 @@ class Keyboard:
         :param key: Name of key
         :return: node index of key
         """
-        return Index([str(entry) for entry in self.entries]).get_loc(key)
+        return self.key_index[key]
 
     def generate_graph(self, node_groups: List[int] = None, group_penalty: float = 0) -> Graph:
         """
@@ -172,12 +219,62 @@ class Keyboard:
         size = len(self.entries)
         names = [str(entry) for entry in self.entries]
         graph = Graph(size, names)
-        # Compute keyboard coordinates, and compute distances
-        for i in range(size):
-            for j in range(i+1, size):
-                distance = self.entries[i].distance_to(self.entries[j])
-                if node_groups is not None and node_groups[i] == node_groups[j]:
-                    distance = distance + group_penalty
-                graph.adjacency[i, j] = distance
-                graph.adjacency[j, i] = distance
+
+        if not all(isinstance(entry, (Keyboard.KeyEntry, Keyboard.MouseKeyEntry)) for entry in self.entries):
+            # Unknown key types only define distance_to, so compute distances pair by pair
+            for i in range(size):
+                for j in range(i+1, size):
+                    distance = self.entries[i].distance_to(self.entries[j])
+                    if node_groups is not None and node_groups[i] == node_groups[j]:
+                        distance = distance + group_penalty
+                    graph.adjacency[i, j] = distance
+                    graph.adjacency[j, i] = distance
+            return graph
+
+        graph.adjacency = self.distance_matrix(node_groups, group_penalty)
         return graph
+
+    def distance_matrix(self, node_groups: List[int] = None, group_penalty: float = 0) -> numpy.ndarray:
+        """
+        Computes the distance between every pair of keys at once, with the same result as calling distance_to on
+        each pair (the earlier key being the one distance_to is called on)
+        :param node_groups: If nodes are grouped (e.g. by finger)
+        :param group_penalty: Penalty for repeating groups
+        :return: Symmetric matrix of distances
+        """
+        entries = self.entries
+        is_key = numpy.array([isinstance(entry, Keyboard.KeyEntry) for entry in entries])
+        is_mouse = ~is_key
+
+        x = numpy.array([entry.x if key else 0 for entry, key in zip(entries, is_key)], dtype=float)
+        y = numpy.array([entry.y if key else 0 for entry, key in zip(entries, is_key)], dtype=float)
+        horizontal = numpy.array([entry.horizontal_coefficient if key else 0 for entry, key in zip(entries, is_key)],
+                                 dtype=float)
+        vertical = numpy.array([entry.vertical_coefficient if key else 0 for entry, key in zip(entries, is_key)],
+                               dtype=float)
+        mouse_penalty = numpy.array([entry.mouse_penalty if mouse else 0 for entry, mouse in zip(entries, is_mouse)],
+                                    dtype=float)
+        modifier_penalty = numpy.array([entry.modifier_penalty for entry in entries], dtype=float)
+        _, modifier = numpy.unique([entry.modifier for entry in entries], return_inverse=True)
+        _, key_name = numpy.unique([entry.key for entry in entries], return_inverse=True)
+
+        # Row i holds the distances from entry i, so its coefficients are used, as in distance_to
+        distance = numpy.sqrt((horizontal[:, None] * (x[None, :] - x[:, None])) ** 2 +
+                              ((y[None, :] - y[:, None]) * vertical[:, None]) ** 2)
+        distance = numpy.where(is_key[:, None] & is_key[None, :], distance, 0)
+
+        # Different mouse buttons in succession
+        different_buttons = is_mouse[:, None] & is_mouse[None, :] & (key_name[:, None] != key_name[None, :])
+        distance = numpy.where(different_buttons, mouse_penalty[None, :] + mouse_penalty[:, None], distance)
+
+        different_modifiers = modifier[:, None] != modifier[None, :]
+        distance = numpy.where(different_modifiers, distance + modifier_penalty[None, :] + modifier_penalty[:, None],
+                               distance)
+
+        if node_groups is not None:
+            node_groups = numpy.asarray(node_groups)
+            distance = numpy.where(node_groups[:, None] == node_groups[None, :], distance + group_penalty, distance)
+
+        # Only the upper triangle is computed from the earlier key's point of view, mirror it
+        distance = numpy.triu(distance, 1)
+        return distance + distance.T
@@ -0,0 +1,226 @@
+from typing import List
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.util.Graph import Graph
+
+
+class LossEngine:
+    """
+    Compiled form of the key binding loss function. Built once per (graph, abilities, combinations, home nodes)
+    problem, after which evaluating a binding only takes a few array gathers and reductions.
+    """
+
+    def __init__(self, graph: Graph, abilities: DataFrame, combinations: DataFrame, home_nodes: List[int],
+                 node_priority: List[float] = None, individual_coefficient: float = 1,
+                 combination_coefficient: float = 1, shortest_paths: bool = False):
+        """
+        Precomputes the arrays the loss function needs
+        :param graph: Graph object for keys
+        :param abilities: Data frame of abilities, with their priority
+        :param combinations: Data frame of combinations, with an "indices" column of ability indices
+        :param home_nodes: Index of home nodes
+        :param node_priority: Additional per-ability term added to the individual loss
+        :param individual_coefficient: Weight of the individual term
+        :param combination_coefficient: Weight of the combination term
+        :param shortest_paths: Measure distances along the graph's shortest paths rather than its direct edges
+        """
+        self.graph = graph
+        self.shortest_paths = shortest_paths
+        self.adjacency = LossEngine.graph_adjacency(graph, shortest_paths)
+        self.num_abilities = abilities.shape[0]
+        self.individual_coefficient = individual_coefficient
+        self.combination_coefficient = combination_coefficient
+
+        # Minimum distance from every node to the closest home node, shared with every engine on this graph
+        self.home_distance = graph.home_distance(home_nodes, shortest_paths)
+        self.ability_priority = numpy.asarray(abilities["priority"], dtype=float)
+        self.ability_weight = 1 / self.ability_priority
+
+        self.node_priority_offset = 0
+        if node_priority:
+            self.node_priority_offset = numpy.sum(node_priority)
+
+        # Combinations are stored as a padded matrix of ability indices, one row per combination. Each segment
+        # (consecutive pair of abilities) gets the weight 1 / priority, padded segments get a weight of 0.
+        num_combinations = combinations.shape[0]
+        indices = list(combinations["indices"]) if num_combinations else []
+        lengths = numpy.array([len(entry) for entry in indices], dtype=int)
+        width = max(numpy.max(lengths) if num_combinations else 0, 2)
+
+        self.combination_indices = numpy.zeros((num_combinations, width), dtype=int)
+        for row, entry in enumerate(indices):
+            self.combination_indices[row, :len(entry)] = entry
+        self.combination_lengths = lengths
+        self.combination_priority = numpy.asarray(combinations["priority"], dtype=float) if num_combinations \
+            else numpy.zeros(0)
+
+        segment_mask = numpy.arange(width - 1)[None, :] < (lengths[:, None] - 1)
+        self.segment_weights = numpy.where(segment_mask, 1 / self.combination_priority[:, None], 0)
+
+        # Flat list of the segments of all combinations, and for each ability the segments it is an endpoint of.
+        # Used to compute loss changes of local moves without touching unaffected combinations.
+        self.segment_from = self.combination_indices[:, :-1][segment_mask]
+        self.segment_to = self.combination_indices[:, 1:][segment_mask]
+        self.segment_weight = self.segment_weights[segment_mask]
+
+        ability_segments = [[] for _ in range(self.num_abilities)]
+        for segment, (first, second) in enumerate(zip(self.segment_from, self.segment_to)):
+            ability_segments[first].append(segment)
+            if second != first:
+                ability_segments[second].append(segment)
+        self.ability_segments: List[numpy.ndarray] = [numpy.array(entry, dtype=int) for entry in ability_segments]
+
+    @staticmethod
+    def graph_adjacency(graph: Graph, shortest_paths: bool = False) -> numpy.ndarray:
+        """
+        :param graph: Graph object for keys
+        :param shortest_paths: Use the graph's shortest path closure
+        :return: Graph's adjacency matrix (or closure) as a plain array, without copying it if it is already floating
+        point (shared single precision matrices stay shared)
+        """
+        if shortest_paths:
+            return graph.shortest_paths()
+        adjacency = numpy.asarray(graph.adjacency)
+        if not numpy.issubdtype(adjacency.dtype, numpy.floating):
+            adjacency = adjacency.astype(float)
+        return adjacency
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Shared matrices are sent by the graph's handle, and mapped again on arrival
+        if not self.shortest_paths and self.graph.shared and \
+                numpy.may_share_memory(self.adjacency, self.graph.adjacency):
+            del state["adjacency"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "adjacency" not in state:
+            self.adjacency = LossEngine.graph_adjacency(self.graph, self.shortest_paths)
+
+    def linear_costs(self) -> numpy.ndarray:
+        """
+        Linear part of the loss, when seen as a quadratic assignment problem: individual terms, and segments joining
+        an ability to itself. The node priority offset is left out
+        :return: (number of abilities x number of nodes) array of the cost of binding each ability to each node
+        """
+        costs = self.individual_coefficient * numpy.outer(self.ability_weight, self.home_distance)
+        loops = self.segment_from == self.segment_to
+        numpy.add.at(costs, self.segment_from[loops],
+                     self.combination_coefficient * self.segment_weight[loops, None] *
+                     numpy.diag(self.adjacency)[None, :])
+        return costs
+
+    def flow_matrix(self) -> numpy.ndarray:
+        """
+        Quadratic part of the loss: binding abilities i and j to nodes k and l costs flow[i, j] * adjacency[k, l]
+        :return: (number of abilities x number of abilities) array of the combination weight from ability to ability,
+        with segments joining an ability to itself left to linear_costs()
+        """
+        flow = numpy.zeros((self.num_abilities, self.num_abilities))
+        loops = self.segment_from == self.segment_to
+        numpy.add.at(flow, (self.segment_from[~loops], self.segment_to[~loops]),
+                     self.combination_coefficient * self.segment_weight[~loops])
+        return flow
+
+    def individual_terms(self, assignments: numpy.ndarray) -> numpy.ndarray:
+        """
+        :param assignments: Node index of each ability
+        :return: Individual loss term of each ability (minimum distance to home divided by priority)
+        """
+        return self.home_distance[assignments] * self.ability_weight
+
+    def combination_terms(self, assignments: numpy.ndarray) -> numpy.ndarray:
+        """
+        :param assignments: Node index of each ability
+        :return: Combination loss term of each combination (path length divided by priority)
+        """
+        nodes = assignments[self.combination_indices]
+        return numpy.sum(self.adjacency[nodes[:, :-1], nodes[:, 1:]] * self.segment_weights, axis=1)
+
+    def loss(self, assignments: List[int]) -> float:
+        """
+        Computes the loss of a full binding
+        :param assignments: Node index of each ability, in ability order
+        :return: Value of the loss function
+        """
+        assignments = numpy.asarray(assignments, dtype=int)
+        return self.individual_coefficient * (numpy.sum(self.individual_terms(assignments)) +
+                                              self.node_priority_offset) +\
+            self.combination_coefficient * numpy.sum(self.combination_terms(assignments))
+
+    def batch_loss(self, assignments: numpy.ndarray) -> numpy.ndarray:
+        """
+        Computes the loss of many full bindings in one vectorized call
+        :param assignments: (number of candidates x number of abilities) array of node indices
+        :return: Value of the loss function for each candidate
+        """
+        assignments = numpy.asarray(assignments, dtype=int)
+        individual = numpy.sum(self.home_distance[assignments] * self.ability_weight, axis=1)
+
+        nodes = assignments[:, self.combination_indices]
+        segments = self.adjacency[nodes[:, :, :-1], nodes[:, :, 1:]] * self.segment_weights
+        combination = numpy.sum(segments, axis=(1, 2))
+
+        return self.individual_coefficient * (individual + self.node_priority_offset) +\
+            self.combination_coefficient * combination
+
+    def swap_delta(self, assignments: numpy.ndarray, first: int, second: int) -> float:
+        """
+        Computes the change in loss from swapping the keys of two abilities, touching only the individual terms of
+        the two abilities and the combination segments they are part of
+        :param assignments: Node index of each ability
+        :param first: Index of the first ability
+        :param second: Index of the second ability
+        :return: Loss after the swap minus loss before the swap
+        """
+        first_node = assignments[first]
+        second_node = assignments[second]
+        individual = (self.home_distance[second_node] - self.home_distance[first_node]) *\
+            (self.ability_weight[first] - self.ability_weight[second])
+
+        segments = numpy.union1d(self.ability_segments[first], self.ability_segments[second])
+        if not len(segments):
+            return self.individual_coefficient * individual
+
+        segment_from = self.segment_from[segments]
+        segment_to = self.segment_to[segments]
+        old_from = assignments[segment_from]
+        old_to = assignments[segment_to]
+        new_from = numpy.where(segment_from == first, second_node,
+                               numpy.where(segment_from == second, first_node, old_from))
+        new_to = numpy.where(segment_to == first, second_node,
+                             numpy.where(segment_to == second, first_node, old_to))
+        combination = numpy.dot(self.adjacency[new_from, new_to] - self.adjacency[old_from, old_to],
+                                self.segment_weight[segments])
+
+        return self.individual_coefficient * individual + self.combination_coefficient * combination
+
+    def move_delta(self, assignments: numpy.ndarray, ability: int, node: int) -> float:
+        """
+        Computes the change in loss from moving an ability to a free key, touching only the individual term of the
+        ability and the combination segments it is part of
+        :param assignments: Node index of each ability
+        :param ability: Index of the ability to move
+        :param node: Index of the free node to move the ability to
+        :return: Loss after the move minus loss before the move
+        """
+        individual = (self.home_distance[node] - self.home_distance[assignments[ability]]) *\
+            self.ability_weight[ability]
+
+        segments = self.ability_segments[ability]
+        if not len(segments):
+            return self.individual_coefficient * individual
+
+        segment_from = self.segment_from[segments]
+        segment_to = self.segment_to[segments]
+        old_from = assignments[segment_from]
+        old_to = assignments[segment_to]
+        new_from = numpy.where(segment_from == ability, node, old_from)
+        new_to = numpy.where(segment_to == ability, node, old_to)
+        combination = numpy.dot(self.adjacency[new_from, new_to] - self.adjacency[old_from, old_to],
+                                self.segment_weight[segments])
+
+        return self.individual_coefficient * individual + self.combination_coefficient * combination
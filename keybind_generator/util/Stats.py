@@ -0,0 +1,83 @@
+from typing import Callable, Dict
+
+
+class Stats:
+    """
+    Counts and timings of the operations on a solver's hot paths (loss evaluations, assignments, tree selections and
+    expansions...), along with values such as the tree's node count and depth.
+
+    Instrumented code only does anything when a Stats object is attached: it checks for None once per operation, and
+    reads the clock only when attached. Timings of an operation include those of the operations it calls, e.g.
+    selections include the assignments and expansions made while selecting.
+    """
+
+    def __init__(self, callback: Callable = None, callback_interval: int = 1000):
+        """
+        :param callback: Function called with the solver and these stats as the solver runs
+        :param callback_interval: Number of iterations between callbacks
+        """
+        self.counts: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.values: Dict[str, float] = {}
+        self.callback = callback
+        self.callback_interval = callback_interval
+        self.next_callback_iter = callback_interval
+
+    def add(self, name: str, seconds: float, count: int = 1) -> None:
+        """
+        Records operations
+        :param name: Name of the operation
+        :param seconds: Time taken by the operations
+        :param count: Number of operations
+        :return:
+        """
+        self.counts[name] = self.counts.get(name, 0) + count
+        self.seconds[name] = self.seconds.get(name, 0) + seconds
+
+    def set(self, name: str, value: float) -> None:
+        self.values[name] = value
+
+    def maximum(self, name: str, value: float) -> None:
+        """
+        Records a value, keeping the largest recorded
+        """
+        if value > self.values.get(name, value - 1):
+            self.values[name] = value
+
+    def update(self, solver) -> None:
+        """
+        Records the solver's state, and calls the callback if an interval's worth of iterations has run since the
+        last call
+        :param solver: Running solver
+        :return:
+        """
+        solver.record_stats(self)
+        if self.callback is not None and solver.num_iter >= self.next_callback_iter:
+            self.next_callback_iter = solver.num_iter + self.callback_interval
+            self.callback(solver, self)
+
+    def reset(self) -> None:
+        self.counts.clear()
+        self.seconds.clear()
+        self.values.clear()
+        self.next_callback_iter = self.callback_interval
+
+    def summary(self) -> dict:
+        """
+        :return: Count, total time and mean time of each operation, and each value, by name
+        """
+        summary = {name: {"count": count, "seconds": self.seconds[name],
+                          "mean_seconds": self.seconds[name] / count if count else 0}
+                   for name, count in self.counts.items()}
+        summary.update(self.values)
+        return summary
+
+    def __str__(self):
+        """
+        :return: One line per operation and per value
+        """
+        lines = [f"%-12s %10d calls %10.4fs %10.2fus/call" % (name, count, self.seconds[name],
+                                                              1e6 * self.seconds[name] / count if count else 0)
+                 for name, count in self.counts.items()]
+        lines += [f"%-12s %s" % (name, value) for name, value in self.values.items()]
+        return "\n".join(lines)
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from keybind_generator.batch.BatchRunner import BatchRunner
+from keybind_generator.data.SpreadsheetReader import SpreadsheetReader
+from test import base_dir
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.directory = tempfile.TemporaryDirectory()
+        manifest = {"defaults": {"workbook": os.path.join(str(base_dir), "assets", "abilities.xlsx"),
+                                 "abilities": "Magic DW Abilities", "combinations": "Magic Combinations",
+                                 "iterations": 20},
+                    "jobs": [{"name": "random", "solver": "random", "seed": 1},
+                             {"name": "greedy", "solver": "greedy", "layout": "default", "iterations": 1},
+                             {"name": "annealing", "solver": "annealing", "layout": "default", "seconds": 0.2},
+                             {"name": "too few keys", "solver": "random", "layout": {"sheet": "Key Layout"}},
+                             {"name": "no iterations", "solver": "greedy", "iterations": 0}]}
+        cls.manifest = os.path.join(cls.directory.name, "manifest.json")
+        with open(cls.manifest, "w") as file:
+            json.dump(manifest, file)
+        cls.jobs = BatchRunner.read_manifest(cls.manifest)
+
+        cls.output = os.path.join(cls.directory.name, "results.json")
+        runner = BatchRunner(cls.jobs, num_workers=2, cache_directory=os.path.join(cls.directory.name, "cache"))
+        with mock.patch.object(SpreadsheetReader, "read_keyboard_layout",
+                               autospec=True, side_effect=SpreadsheetReader.read_keyboard_layout) as read_layout:
+            cls.results = runner.run(cls.output)
+        cls.layout_reads = read_layout.call_count
+        cls.runner = runner
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.directory.cleanup()
+
+    def test_read_manifest(self):
+        self.assertEqual([job.name for job in self.jobs], ["random", "greedy", "annealing", "too few keys",
+                                                           "no iterations"])
+        self.assertEqual(self.jobs[0].iterations, 20)
+        self.assertEqual(self.jobs[1].iterations, 1)
+        self.assertEqual(self.jobs[0].layout, "default")
+        self.assertEqual(self.jobs[0].home_keys, ["A", "S", "D", "F"])
+        self.assertEqual(self.jobs[3].layout, {"workbook": self.jobs[3].workbook, "sheet": "Key Layout"})
+        self.assertEqual(len({job.sheet_key for job in self.jobs}), 1)
+        self.assertEqual(len({job.layout_key for job in self.jobs}), 2)
+
+    def test_unknown_solver(self):
+        with self.assertRaises(ValueError):
+            BatchRunner.Job("job", "abilities.xlsx", "abilities", "combinations", solver="unknown")
+
+    def test_results(self):
+        self.assertEqual([result["name"] for result in self.results], ["random", "greedy", "annealing",
+                                                                         "too few keys", "no iterations"])
+        for result in self.results[:3]:
+            self.assertNotIn("error", result)
+            self.assertGreater(result["iterations"], 0)
+            self.assertEqual(len(result["binding"]), 76)
+            self.assertEqual(len(set(result["binding"].values())), 76)
+        self.assertIn("76 abilities can't be bound to 69 keys", self.results[3]["error"])
+        self.assertEqual(self.results[4]["error"], "No binding found within the budget")
+        self.assertEqual(self.results[4]["iterations"], 0)
+
+        # Layouts are read once, and their graphs released after the batch
+        self.assertEqual(self.layout_reads, 1)
+        self.assertEqual(self.runner.graphs, {})
+
+    def test_output(self):
+        with open(self.output) as file:
+            output = json.load(file)
+        self.assertEqual(output["results"], self.results)
+        self.assertFalse(os.path.exists(self.output + ".tmp"))
+        self.assertEqual(len(os.listdir(os.path.join(self.directory.name, "cache"))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+
+import numpy
+
+from keybind_generator.benchmark.Benchmark import Benchmark
+from keybind_generator.data.SpreadsheetReader import SpreadsheetReader
+from test import base_dir
+
+
+class TestBenchmark(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.problem = Benchmark.synthetic_problem(12, seed=1)
+        solvers = Benchmark.default_solvers()
+        cls.benchmark = Benchmark([cls.problem], {name: solvers[name] for name in ["random", "annealing"]},
+                                  time=timedelta(milliseconds=50))
+        cls.results = cls.benchmark.run()
+
+    def test_synthetic_problem(self):
+        self.assertEqual(self.problem.graph.size, 12)
+        self.assertEqual(self.problem.abilities.shape[0], 8)
+        self.assertEqual(self.problem.combinations.shape[0], 4)
+        for indices in self.problem.combinations["indices"]:
+            self.assertTrue(2 <= len(indices) <= 3)
+            self.assertTrue(all(0 <= index < 8 for index in indices))
+        self.assertTrue(all(0 <= node < 12 for node in self.problem.home_nodes))
+
+    def test_results(self):
+        self.assertEqual([result["solver"] for result in self.results], ["random", "annealing"])
+        best = min(result["best_loss"] for result in self.results)
+        for result in self.results:
+            self.assertGreater(result["iterations"], 0)
+            self.assertGreater(result["iterations_per_second"], 0)
+            self.assertGreater(result["peak_memory_bytes"], 0)
+            self.assertAlmostEqual(result["target_loss"], best * 1.05)
+
+            # The curve is the best loss at every improvement, ending at the best loss found
+            seconds = [entry[0] for entry in result["curve"]]
+            losses = [entry[2] for entry in result["curve"]]
+            self.assertEqual(seconds, sorted(seconds))
+            self.assertTrue(numpy.all(numpy.diff(losses) < 0))
+            self.assertAlmostEqual(losses[-1], result["best_loss"])
+
+        winner = min(self.results, key=lambda result: result["best_loss"])
+        self.assertIsNotNone(winner["time_to_target"])
+        self.assertLessEqual(winner["time_to_target"], winner["seconds"])
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.benchmark.save(directory)
+
+            with open(os.path.join(directory, "results.json")) as file:
+                saved = json.load(file)
+            self.assertEqual(len(saved["results"]), 2)
+            self.assertEqual(saved["results"][0]["curve"], [list(entry) for entry in self.results[0]["curve"]])
+
+            with open(os.path.join(directory, "results.csv")) as file:
+                rows = list(csv.DictReader(file))
+            self.assertEqual([row["solver"] for row in rows], ["random", "annealing"])
+            self.assertNotIn("curve", rows[0])
+
+            self.assertTrue(os.path.exists(os.path.join(directory, "synthetic_12.png")))
+
+    def test_sheet_problems(self):
+        file = os.path.join(str(base_dir), "assets", "abilities.xlsx")
+        self.assertEqual(Benchmark.sheet_pairs(file), [["Magic DW Abilities", "Magic Combinations"],
+                                                       ["Melee DW Abilities", "Melee Combinations"]])
+        with tempfile.TemporaryDirectory() as directory:
+            problems = Benchmark.sheet_problems(file, cache_directory=directory)
+            self.assertEqual(len(os.listdir(directory)), 2)
+        self.assertFalse(os.path.exists(os.path.join(str(base_dir), "assets", ".cache")))
+
+        self.assertEqual([problem.name for problem in problems], ["Magic DW Abilities", "Melee DW Abilities"])
+        # Keys of the workbook's layout sheet, and the default mouse keys the sheet leaves out
+        graph = problems[0].graph
+        self.assertEqual(graph.size, 69 + 36)
+        layout = SpreadsheetReader(file).read_keyboard_layout("Key Layout").generate_graph()
+        self.assertEqual(graph.names[:69], layout.names)
+        self.assertTrue(numpy.allclose(graph.adjacency[:69, :69], layout.adjacency))
+        self.assertIn("Alt+Mouse12", graph.names[69:])
+        for problem in problems:
+            self.assertFalse(problem.abilities["priority"].isna().any())
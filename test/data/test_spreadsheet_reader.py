@@ -1,7 +1,10 @@
+import os
+import tempfile
 import unittest
 import xlrd
 import numpy
 from pandas import DataFrame, Series, Index
+from pandas.testing import assert_frame_equal
 
 from keybind_generator.data.SpreadsheetReader import SpreadsheetReader
 from test import base_dir
@@ -44,6 +47,55 @@ class TestSpreadsheetReader(unittest.TestCase):
         self.assertTrue(numpy.array_equal(index, [1, 0]))
         pass
 
+    def test_parse_combination_strings(self):
+        ability_index = Index(["Ability 1", "Ability 2", "Ability 3"])
+        indices = SpreadsheetReader.parse_combination_strings(ability_index, ["Ability 2 > Ability 1",
+                                                                              "Ability 3>Ability 1>Ability 3"])
+        self.assertEqual(indices, [[1, 0], [2, 0, 2]])
+        self.assertEqual(SpreadsheetReader.parse_combination_strings(ability_index, []), [])
+        with self.assertRaises(KeyError):
+            SpreadsheetReader.parse_combination_strings(ability_index, ["Ability 1>Ability 4"])
+
+    def test_compile(self):
+        file = os.path.join(str(base_dir), "assets", "abilities.xlsx")
+        spreadsheet_reader = SpreadsheetReader(file)
+        abilities = spreadsheet_reader.read_abilities("Magic DW Abilities")
+        combinations = spreadsheet_reader.read_combinations(abilities, "Magic Combinations")
+
+        with tempfile.TemporaryDirectory() as directory:
+            compiled_abilities, compiled_combinations = SpreadsheetReader(file).compile(
+                "Magic DW Abilities", "Magic Combinations", directory)
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+            # The second compile reads the cache, without opening the workbook
+            cached_reader = SpreadsheetReader(file)
+            cached_abilities, cached_combinations = cached_reader.compile("Magic DW Abilities", "Magic Combinations",
+                                                                          directory)
+            self.assertIsNone(cached_reader.sheets)
+
+            for data in [compiled_abilities, cached_abilities]:
+                assert_frame_equal(data, abilities)
+            for data in [compiled_combinations, cached_combinations]:
+                assert_frame_equal(data, combinations)
+
+            # Other sheets are cached separately
+            SpreadsheetReader(file).compile("Melee DW Abilities", "Melee Combinations", directory)
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_read_keyboard_layout(self):
+        spreadsheet_reader = SpreadsheetReader(os.path.join(str(base_dir), "assets", "abilities.xlsx"))
+        graph = spreadsheet_reader.read_keyboard_layout("Key Layout").generate_graph()
+        self.assertEqual(graph.size, 69)
+        a, s = graph.get_node_indices(["A", "S"])
+        self.assertAlmostEqual(graph.adjacency[a, s], 1)
+        self.assertIn("Shift+A", graph.names)
+
+        # Layouts with key priorities or groups are rejected rather than read without them
+        spreadsheet_reader.read_sheet("Key Layout")
+        spreadsheet_reader.sheets["Key Layout"].loc[6, "Group Penalty"] = 2
+        with self.assertRaises(ValueError):
+            spreadsheet_reader.read_keyboard_layout("Key Layout")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,97 @@
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.Budget import Budget
+from keybind_generator.solver.ExactSolver import ExactSolver
+from keybind_generator.solver.MonteCarloTreeSearchSolver import MonteCarloTreeSearchSolver
+from keybind_generator.solver.PepegaSolver import PepegaSolver
+from keybind_generator.solver.Solver import Solver
+from keybind_generator.util.Graph import Graph
+
+
+class TestBudget(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 2, "Yes", numpy.nan],
+                                   ["dbreath", 3, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 1, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 1, "Yes", "", [2, 1]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.home_nodes = cls.graph.get_node_indices(["a", "b"])
+
+    def test_iterations(self):
+        pepega = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes, batch_size=64)
+        self.assertEqual(pepega.run(Budget(iterations=100)), 100)
+        self.assertEqual(pepega.run(Budget(iterations=100)), 100)
+        self.assertEqual(pepega.num_iter, 200)
+
+    def test_target_loss(self):
+        pepega = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        pepega.run(Budget(target_loss=1e9, iterations=100))
+        self.assertEqual(pepega.num_iter, 1)
+
+    def test_patience(self):
+        pepega = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        pepega.run(Budget(patience=50))
+        # Only stops once 50 iterations in a row found nothing better
+        self.assertGreaterEqual(pepega.num_iter, 50)
+        pepega.best_loss = 0
+        iterations = pepega.run(Budget(patience=50))
+        self.assertEqual(iterations, 50)
+
+    def test_time(self):
+        mcts = MonteCarloTreeSearchSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        calls = []
+        original = time.perf_counter
+
+        def perf_counter():
+            calls.append(None)
+            return original()
+
+        start = original()
+        with mock.patch("keybind_generator.solver.Budget.clock.perf_counter", perf_counter):
+            iterations = mcts.do_time(timedelta(seconds=.2))
+        elapsed = original() - start
+
+        self.assertEqual(mcts.num_iter, iterations)
+        self.assertGreaterEqual(elapsed, .2)
+        self.assertLess(elapsed, .5)
+        # The clock is read about once per check interval, not once per iteration
+        self.assertLess(len(calls), iterations / 5)
+
+    def test_finished(self):
+        solver = ExactSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        iterations = solver.run(Budget(time=timedelta(seconds=10)))
+
+        self.assertTrue(solver.optimal)
+        self.assertEqual(iterations, solver.num_iter)
+
+    def test_abstract_solver(self):
+        class IncompleteSolver(Solver):
+            pass
+
+        # Solvers without run_iter() can't be created, rather than failing once run
+        with self.assertRaises(TypeError):
+            IncompleteSolver()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.Checkpoint import Checkpoint
+from keybind_generator.solver.MonteCarloTreeSearchSolver import MonteCarloTreeSearchSolver
+from keybind_generator.solver.PepegaSolver import PepegaSolver
+from keybind_generator.solver.SimulatedAnnealingSolver import SimulatedAnnealingSolver
+from keybind_generator.util.Graph import Graph
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 2, "Yes", numpy.nan],
+                                   ["dbreath", 3, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 1, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 1, "Yes", "", [2, 1]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.home_nodes = cls.graph.get_node_indices(["a", "b"])
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "checkpoint.npz")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_write_read(self):
+        Checkpoint.write(self.path, {"a": numpy.arange(3), "b": numpy.array(1.5)})
+        state = Checkpoint.read(self.path)
+
+        self.assertEqual(list(state["a"]), [0, 1, 2])
+        self.assertEqual(float(state["b"]), 1.5)
+        self.assertEqual(os.listdir(self.directory.name), ["checkpoint.npz"])
+
+    def test_random_state(self):
+        numpy.random.seed(0)
+        state = Checkpoint.random_state()
+        expected = numpy.random.random(5)
+        Checkpoint.set_random_state(state)
+        self.assertTrue(numpy.array_equal(numpy.random.random(5), expected))
+
+    def test_pepega_resume(self):
+        numpy.random.seed(0)
+        pepega = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        pepega.do_num_iter(100, checkpoint_path=self.path, checkpoint_interval=30)
+        expected = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        expected.set_state(pepega.get_state())
+        expected.do_num_iter(100)
+
+        resumed = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        resumed.load_checkpoint(self.path)
+        self.assertEqual(resumed.num_iter, 100)
+        self.assertEqual(resumed.best_loss, pepega.best_loss)
+        self.assertEqual(list(resumed.best_binding.assignments), list(pepega.best_binding.assignments))
+
+        resumed.do_num_iter(100)
+        self.assertEqual(resumed.num_iter, 200)
+        self.assertEqual(resumed.best_loss, expected.best_loss)
+
+    def test_monte_carlo_resume(self):
+        numpy.random.seed(0)
+        continuous = MonteCarloTreeSearchSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        continuous.do_num_iter(60)
+
+        numpy.random.seed(0)
+        interrupted = MonteCarloTreeSearchSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        interrupted.do_num_iter(30, checkpoint_path=self.path, checkpoint_interval=10)
+        numpy.random.seed(1)
+
+        resumed = MonteCarloTreeSearchSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        resumed.load_checkpoint(self.path)
+        self.assertEqual(resumed.tree.num_nodes, interrupted.tree.num_nodes)
+        resumed.do_num_iter(30)
+
+        self.assertEqual(resumed.num_iter, 60)
+        self.assertEqual(resumed.best_loss, continuous.best_loss)
+        self.assertEqual(resumed.tree.num_nodes, continuous.tree.num_nodes)
+        for name, array in continuous.tree.to_arrays().items():
+            self.assertTrue(numpy.array_equal(resumed.tree.to_arrays()[name], array), name)
+
+    def test_problem_mismatch(self):
+        pepega = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        pepega.do_num_iter(10, checkpoint_path=self.path)
+
+        other = PepegaSolver(self.graph, self.abilities[:3], self.combinations, self.home_nodes)
+        with self.assertRaises(ValueError):
+            other.load_checkpoint(self.path)
+
+    def test_unsupported_solver(self):
+        annealing = SimulatedAnnealingSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        with self.assertRaises(ValueError):
+            annealing.do_time(timedelta(milliseconds=10), checkpoint_path=self.path)
+        self.assertEqual(annealing.num_iter, 0)
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
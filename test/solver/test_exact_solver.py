@@ -0,0 +1,93 @@
+import itertools
+import unittest
+from datetime import timedelta
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.ExactSolver import ExactSolver
+from keybind_generator.util.Graph import Graph
+
+
+class TestExactSolver(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 2, "Yes", numpy.nan],
+                                   ["dbreath", 3, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 1, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 1, "Yes", "", [2, 1]],
+                                      ["dbreath>wrack", 2, "Yes", "", [3, 0]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.home_nodes = cls.graph.get_node_indices(["e"])
+
+    def optimal_loss(self, solver):
+        return min(solver.engine.loss(list(entry)) for entry in itertools.permutations(range(5), 4))
+
+    def test_exact_solver(self):
+        solver = ExactSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                             initial_assignments=[0, 1, 2, 3])
+        loss, binding, gap = solver.solve()
+
+        self.assertTrue(solver.optimal)
+        self.assertEqual(gap, 0)
+        self.assertAlmostEqual(loss, self.optimal_loss(solver))
+        self.assertAlmostEqual(loss, binding.eval_loss())
+        print(f"Loss: %f, %d nodes" % (loss, solver.num_iter))
+        print(binding)
+
+    def test_linear_assignment(self):
+        solver = ExactSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                             combination_coefficient=0, initial_assignments=[0, 1, 2, 3])
+
+        self.assertTrue(solver.optimal)
+        self.assertEqual(solver.num_iter, 0)
+        self.assertAlmostEqual(solver.best_loss, self.optimal_loss(solver))
+
+    def test_lower_bound(self):
+        solver = ExactSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                             initial_assignments=[0, 1, 2, 3])
+        optimum = self.optimal_loss(solver)
+        self.assertLessEqual(solver.run_iter(), optimum + 1e-9)
+        while not solver.optimal:
+            self.assertLessEqual(solver.lower_bound, optimum + 1e-9)
+            self.assertLessEqual(solver.lower_bound, solver.best_loss)
+            self.assertGreaterEqual(solver.gap, 0)
+            solver.run_iter()
+
+    def test_gap(self):
+        solver = ExactSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                             initial_assignments=[0, 1, 2, 3])
+        solver.run_iter()
+        # Entries left on the stack with bounds above the best loss, pruned only once popped
+        solver.stack = [(solver.best_loss + 1, 0, 0, numpy.full(4, -1, dtype=int))]
+        self.assertEqual(solver.lower_bound, solver.best_loss)
+        self.assertEqual(solver.gap, 0)
+
+        solver.stack = [(-1, 0, 0, numpy.full(4, -1, dtype=int))]
+        solver.best_loss = 0
+        self.assertEqual(solver.gap, 1)
+
+    def test_time_limit(self):
+        solver = ExactSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        loss, binding, gap = solver.solve(timedelta(seconds=0))
+
+        self.assertEqual(solver.num_iter, 0)
+        self.assertGreaterEqual(gap, 0)
+        self.assertAlmostEqual(loss, binding.eval_loss())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from unittest import mock
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.GeneticSolver import GeneticSolver
+from keybind_generator.util.Graph import Graph
+
+
+class TestGeneticSolver(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 2, "Yes", numpy.nan],
+                                   ["dbreath", 3, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 1, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 1, "Yes", "", [2, 1]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.home_nodes = cls.graph.get_node_indices(["a", "b"])
+
+    def assert_crossover(self, crossover):
+        first = numpy.argsort(numpy.random.random((200, 12)), axis=1)
+        second = numpy.argsort(numpy.random.random((200, 12)), axis=1)
+        children = crossover(first, second)
+
+        self.assertTrue(numpy.all(numpy.sort(children, axis=1) == numpy.arange(12)))
+        # Every key comes from one of the parents, at the same position for PMX or anywhere for OX
+        inherited = (children == first) | (children == second)
+        self.assertTrue(numpy.all(numpy.any(inherited, axis=1)))
+
+    def test_order_crossover(self):
+        self.assert_crossover(GeneticSolver.order_crossover)
+        first = numpy.array([[0, 1, 2, 3, 4, 5]])
+        second = numpy.array([[5, 4, 3, 2, 1, 0]])
+        children = GeneticSolver.order_crossover(first, second)
+        # Keys outside the inherited segment keep the second parent's order
+        outside = [key for key in children[0] if key not in first[0][children[0] == first[0]]]
+        self.assertEqual(outside, sorted(outside, reverse=True))
+
+    def test_pmx_crossover(self):
+        self.assert_crossover(GeneticSolver.pmx_crossover)
+        first = numpy.array([[0, 1, 2, 3, 4, 5, 6, 7, 8]])
+        second = numpy.array([[8, 2, 6, 7, 1, 5, 4, 0, 3]])
+        segment = numpy.zeros((1, 9), dtype=bool)
+        segment[0, 3:7] = True
+        with mock.patch.object(GeneticSolver, "cut_points", return_value=segment):
+            children = GeneticSolver.pmx_crossover(first, second)
+        self.assertEqual(list(children[0]), [8, 2, 1, 3, 4, 5, 6, 0, 7])
+
+    def test_genetic_solver(self):
+        solver = GeneticSolver(self.graph, self.abilities, self.combinations, self.home_nodes, population_size=20)
+        solver.do_num_iter(30)
+
+        self.assertEqual(solver.num_iter, 30)
+        self.assertEqual(solver.population.shape, (20, 5))
+        self.assertTrue(numpy.allclose(solver.losses, solver.evaluate(solver.population)))
+        self.assertAlmostEqual(solver.best_loss, solver.best_binding.eval_loss())
+        print(f"Loss: %f" % solver.best_loss)
+        print(solver.best_binding)
+
+    def test_genetic_solver_pmx(self):
+        solver = GeneticSolver(self.graph, self.abilities, self.combinations, self.home_nodes, population_size=20,
+                               crossover="pmx", initial_assignments=[4, 3, 2, 1])
+        initial_loss = solver.best_loss
+        solver.do_num_iter(30)
+
+        self.assertLessEqual(solver.best_loss, initial_loss)
+        self.assertAlmostEqual(solver.best_loss, solver.best_binding.eval_loss())
+
+    def test_migration(self):
+        solver = GeneticSolver(self.graph, self.abilities, self.combinations, self.home_nodes, population_size=10)
+        islands = [solver.make_island() for _ in range(3)]
+        migrated = solver.migrate(islands, 2)
+
+        for index, (population, losses) in enumerate(migrated):
+            self.assertEqual(population.shape, (10, 5))
+            self.assertTrue(numpy.allclose(losses, solver.evaluate(population)))
+            self.assertLessEqual(numpy.min(losses), numpy.min(islands[index - 1][1]))
+
+    def test_genetic_solver_islands(self):
+        solver = GeneticSolver(self.graph, self.abilities, self.combinations, self.home_nodes, population_size=10)
+        solver.do_num_iter(20, num_islands=2, migration_interval=5, seed=0)
+
+        self.assertEqual(solver.num_iter, 40)
+        self.assertAlmostEqual(solver.best_loss, solver.best_binding.eval_loss())
+        print(f"Loss: %f" % solver.best_loss)
+
+
+if __name__ == '__main__':
+    unittest.main()
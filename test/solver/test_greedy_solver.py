@@ -0,0 +1,88 @@
+import itertools
+import unittest
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.GreedySolver import GreedySolver
+from keybind_generator.solver.SimulatedAnnealingSolver import SimulatedAnnealingSolver
+from keybind_generator.util.Graph import Graph
+
+
+class TestGreedySolver(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 2, "Yes", numpy.nan],
+                                   ["dbreath", 3, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 1, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 1, "Yes", "", [2, 1]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.home_nodes = cls.graph.get_node_indices(["a", "b"])
+
+    def optimal_loss(self, solver):
+        return min(solver.engine.loss(list(entry)) for entry in itertools.permutations(range(5), 4))
+
+    def test_greedy_solver(self):
+        solver = GreedySolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        loss, binding = solver.solve()
+
+        self.assertAlmostEqual(loss, binding.eval_loss())
+        self.assertEqual(sorted(binding.assignments[:2]), [0, 1])
+        print(f"Loss: %f" % loss)
+        print(binding)
+
+    def test_priority_order(self):
+        abilities = DataFrame([["filler", 3, "Yes", numpy.nan],
+                               ["important", 1, "Yes", numpy.nan],
+                               ["minor", 2, "Yes", numpy.nan]], columns=self.abilities.columns)
+        combinations = DataFrame(columns=self.combinations.columns)
+        solver = GreedySolver(self.graph, abilities, combinations, self.graph.get_node_indices(["a"]))
+        # Priority 1 has the highest weight in the loss, and is placed first, on the home key
+        self.assertEqual(list(solver.order), [1, 2, 0])
+        loss, binding = solver.solve()
+        self.assertEqual(list(binding.assignments), [2, 0, 1])
+
+    def test_marginal_costs(self):
+        solver = GreedySolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        partial = numpy.array([[0, -1, -1, -1], [4, 3, -1, -1]])
+        costs = solver.marginal_costs(2, partial)
+        for row, assignments in enumerate(partial):
+            for key in range(5):
+                placed = [ability for ability in range(4) if assignments[ability] >= 0]
+                expected = solver.engine.home_distance[key] / 2 +\
+                    sum(self.graph.adjacency[key, assignments[ability]] for ability in placed)
+                self.assertAlmostEqual(costs[row, key], expected)
+
+    def test_beam_search(self):
+        solver = GreedySolver(self.graph, self.abilities, self.combinations, self.home_nodes, beam_width=8)
+        solver.do_num_iter(1)
+        self.assertAlmostEqual(solver.best_loss, self.optimal_loss(solver))
+
+    def test_randomized_greedy(self):
+        solver = GreedySolver(self.graph, self.abilities, self.combinations, self.home_nodes, noise=1)
+        solver.do_num_iter(20)
+        self.assertEqual(solver.num_iter, 20)
+        self.assertAlmostEqual(solver.best_loss, solver.best_binding.eval_loss())
+
+    def test_seed_annealing(self):
+        loss, binding = GreedySolver(self.graph, self.abilities, self.combinations, self.home_nodes).solve()
+        annealing = SimulatedAnnealingSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                                             initial_assignments=binding.assignments)
+        self.assertLessEqual(annealing.best_loss, loss)
+
+
+if __name__ == '__main__':
+    unittest.main()
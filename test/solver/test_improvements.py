@@ -0,0 +1,109 @@
+import asyncio
+import contextlib
+import unittest
+from datetime import timedelta
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.Budget import Budget
+from keybind_generator.solver.PepegaSolver import PepegaSolver
+from keybind_generator.solver.SimulatedAnnealingSolver import SimulatedAnnealingSolver
+from keybind_generator.util.Graph import Graph
+
+
+class TestImprovements(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 2, "Yes", numpy.nan],
+                                   ["dbreath", 3, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 1, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 1, "Yes", "", [2, 1]],
+                                      ["dbreath>wrack>dbreath", 2, "Yes", "", [3, 0, 3]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.home_nodes = cls.graph.get_node_indices(["a", "b"])
+
+    def make_solver(self):
+        numpy.random.seed(0)
+        return PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+
+    def test_improvements(self):
+        solver = self.make_solver()
+        events = list(solver.improvements(Budget(iterations=200), min_interval=timedelta(0)))
+
+        self.assertGreater(len(events), 2)
+        self.assertTrue(events[-1].final)
+        self.assertFalse(any(event.final for event in events[:-1]))
+        self.assertEqual(events[-1].num_iter, 200)
+        self.assertEqual(events[-1].best_loss, solver.best_loss)
+        # Every event is an improvement, with the loss of its snapshot
+        self.assertTrue(numpy.all(numpy.diff([event.best_loss for event in events[:-1]]) < 0))
+        for event in events:
+            self.assertAlmostEqual(event.best_loss, solver.engine.loss(event.assignments))
+            self.assertEqual(event.to_dict()["assignments"], list(event.assignments))
+
+    def test_throttling(self):
+        solver = self.make_solver()
+        events = list(solver.improvements(Budget(iterations=200), min_interval=timedelta(hours=1)))
+        # The first improvement, then the final event
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0].num_iter, 1)
+        self.assertTrue(events[1].final)
+
+    def test_cancel(self):
+        # Closing the generator stops the run
+        solver = self.make_solver()
+        for event in solver.improvements(Budget(iterations=10000)):
+            break
+        self.assertEqual(solver.num_iter, 1)
+
+        # Cancelling the budget stops the run, after which the final event comes
+        solver = self.make_solver()
+        budget = Budget(iterations=10000)
+        events = []
+        for event in solver.improvements(budget):
+            events.append(event)
+            budget.cancel()
+        self.assertEqual(solver.num_iter, 1)
+        self.assertEqual(len(events), 2)
+        self.assertTrue(events[1].final)
+
+    def test_stream_improvements(self):
+        solver = SimulatedAnnealingSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+
+        async def collect():
+            return [event async for event in solver.stream_improvements(Budget(iterations=500), timedelta(0))]
+
+        events = asyncio.run(collect())
+        self.assertTrue(events[-1].final)
+        self.assertEqual(events[-1].num_iter, 500)
+        self.assertEqual(events[-1].best_loss, solver.best_loss)
+
+    def test_stream_cancel(self):
+        solver = self.make_solver()
+
+        async def first():
+            async with contextlib.aclosing(solver.stream_improvements(Budget(time=timedelta(seconds=30)))) as events:
+                async for event in events:
+                    break
+            # The solver thread has stopped once the iterator is closed
+            num_iter = solver.num_iter
+            await asyncio.sleep(.05)
+            self.assertEqual(solver.num_iter, num_iter)
+            return event
+
+        event = asyncio.run(first())
+        self.assertFalse(event.final)
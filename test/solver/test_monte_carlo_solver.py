@@ -39,6 +39,53 @@ class TestMonteCarloSolver(unittest.TestCase):
         for child in mcts_solver.root.children:
             print(f"%d %f" % (child.visits, child.loss))
 
+    def test_mcts_solver_parallel(self):
+        mcts_solver = MonteCarloTreeSearchSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        mcts_solver.do_num_iter(200, num_workers=2, seed=0)
+
+        self.assertEqual(mcts_solver.num_iter, 200)
+        self.assertAlmostEqual(mcts_solver.best_loss, mcts_solver.best_binding.eval_loss())
+        # Root statistics of the worker trees are merged into the solver's tree
+        self.assertEqual(sum(child.visits for child in mcts_solver.root.children if child is not None), 200)
+        print(mcts_solver.best_loss)
+
+    def test_mcts_solver_max_nodes(self):
+        mcts_solver = MonteCarloTreeSearchSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                                                 max_nodes=20)
+        mcts_solver.do_num_iter(100)
+
+        self.assertEqual(mcts_solver.tree.num_nodes, 20)
+        self.assertEqual(mcts_solver.root.visits, 100)
+        self.assertAlmostEqual(mcts_solver.best_loss, mcts_solver.best_binding.eval_loss())
+
+    def test_mcts_solver_one_node_per_iteration(self):
+        mcts_solver = MonteCarloTreeSearchSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        mcts_solver.do_num_iter(50)
+
+        # Each iteration creates at most one node below the root
+        self.assertLessEqual(mcts_solver.tree.num_nodes, 51)
+        self.assertEqual(mcts_solver.root.visits, 50)
+
+    def test_mcts_solver_greedy_rollout(self):
+        mcts_solver = MonteCarloTreeSearchSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                                                 rollout_policy="greedy")
+        binding = mcts_solver.greedy_rollout(mcts_solver.new_binding())
+        # Lowest priority number is the most important, and gets the keys closest to home
+        self.assertEqual(sorted(binding.assignments[:2]), [0, 1])
+        mcts_solver.do_num_iter(50)
+        self.assertAlmostEqual(mcts_solver.best_loss, mcts_solver.best_binding.eval_loss())
+
+    def test_mcts_solver_leaf_batch(self):
+        mcts_solver = MonteCarloTreeSearchSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                                                 leaf_batch_size=16)
+        mcts_solver.do_num_iter(160)
+
+        self.assertEqual(mcts_solver.num_iter, 160)
+        self.assertEqual(mcts_solver.root.visits, 160)
+        self.assertEqual(mcts_solver.root.virtual_visits, 0)
+        self.assertAlmostEqual(mcts_solver.best_loss, mcts_solver.best_binding.eval_loss())
+        print(mcts_solver.best_loss)
+
 
 
 if __name__ == '__main__':
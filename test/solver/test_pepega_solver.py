@@ -39,7 +39,22 @@ class TestPepegaSolver(unittest.TestCase):
         print(f"Loss: %f" % pepega.best_loss)
         print(pepega.best_binding)
 
+    def test_random_solver_parallel(self):
+        pepega = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        pepega.do_num_iter(1000, num_workers=2, seed=0)
+
+        self.assertEqual(pepega.num_iter, 1000)
+        self.assertAlmostEqual(pepega.best_loss, pepega.best_binding.eval_loss())
+        print(f"Loss: %f" % pepega.best_loss)
 
+    def test_random_solver_batched(self):
+        pepega = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes, batch_size=256)
+        pepega.do_num_iter(1000)
+
+        self.assertEqual(pepega.num_iter, 1000)
+        self.assertAlmostEqual(pepega.best_loss, pepega.best_binding.eval_loss())
+        print(f"Loss: %f" % pepega.best_loss)
+        print(pepega.best_binding)
 
 
 if __name__ == '__main__':
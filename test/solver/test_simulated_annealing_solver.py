@@ -0,0 +1,68 @@
+import unittest
+from datetime import timedelta
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.SimulatedAnnealingSolver import SimulatedAnnealingSolver
+from keybind_generator.util.Graph import Graph
+
+
+class TestSimulatedAnnealingSolver(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 2, "Yes", numpy.nan],
+                                   ["dbreath", 3, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 1, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 1, "Yes", "", [2, 1]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.home_nodes = cls.graph.get_node_indices(["a", "b"])
+
+    def test_annealing_solver(self):
+        solver = SimulatedAnnealingSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                                          steps_per_restart=200)
+        solver.do_num_iter(1000)
+
+        self.assertEqual(solver.num_iter, 1000)
+        self.assertAlmostEqual(solver.best_loss, solver.best_binding.eval_loss())
+        print(f"Loss: %f" % solver.best_loss)
+        print(solver.best_binding)
+
+    def test_current_loss_tracks_moves(self):
+        solver = SimulatedAnnealingSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                                          steps_per_restart=10000)
+        for i in range(500):
+            solver.run_iter()
+        self.assertAlmostEqual(solver.current_loss, solver.engine.loss(solver.permutation[:4]))
+        self.assertTrue(numpy.array_equal(numpy.sort(solver.permutation), range(5)))
+
+    def test_cooling_schedules(self):
+        for schedule in ["exponential", "linear", "logarithmic"]:
+            solver = SimulatedAnnealingSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                                              initial_temperature=10, final_temperature=.1,
+                                              cooling_schedule=schedule)
+            self.assertAlmostEqual(solver.temperature(), 10)
+            solver.annealing_step = solver.steps_per_restart
+            self.assertAlmostEqual(solver.temperature(), .1)
+
+    def test_do_time(self):
+        solver = SimulatedAnnealingSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        iterations = solver.do_time(timedelta(milliseconds=50))
+        self.assertEqual(iterations, solver.num_iter)
+
+
+if __name__ == '__main__':
+    unittest.main()
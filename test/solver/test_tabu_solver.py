@@ -0,0 +1,87 @@
+import unittest
+from datetime import timedelta
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.TabuSolver import TabuSolver
+from keybind_generator.util.Graph import Graph
+
+
+class TestTabuSolver(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 2, "Yes", numpy.nan],
+                                   ["dbreath", 3, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 1, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 1, "Yes", "", [2, 1]],
+                                      ["dbreath>wrack>dbreath", 2, "Yes", "", [3, 0, 3]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.home_nodes = cls.graph.get_node_indices(["a", "b"])
+
+    def assert_deltas(self, solver):
+        loss = solver.engine.loss(solver.permutation[:4])
+        self.assertAlmostEqual(solver.current_loss, loss)
+        for first in range(5):
+            for second in range(5):
+                permutation = solver.permutation.copy()
+                permutation[[first, second]] = permutation[[second, first]]
+                self.assertAlmostEqual(solver.deltas[first, second], solver.engine.loss(permutation[:4]) - loss)
+
+    def test_swap_deltas(self):
+        # An asymmetric distance matrix exercises every term of the delta
+        graph = Graph(5, ["a", "b", "c", "d", "e"])
+        graph.adjacency = numpy.random.randint(0, 5, (5, 5))
+        solver = TabuSolver(graph, self.abilities, self.combinations, self.home_nodes)
+        self.assert_deltas(solver)
+        for i in range(20):
+            solver.swap(*numpy.random.choice(5, 2, False))
+            self.assert_deltas(solver)
+
+    def test_tabu_solver(self):
+        solver = TabuSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        solver.do_num_iter(200)
+
+        self.assertEqual(solver.num_iter, 200)
+        self.assertAlmostEqual(solver.best_loss, solver.best_binding.eval_loss())
+        self.assert_deltas(solver)
+        print(f"Loss: %f" % solver.best_loss)
+        print(solver.best_binding)
+
+    def test_aspiration(self):
+        solver = TabuSolver(self.graph, self.abilities, self.combinations, self.home_nodes, tenure=3, aspiration=10)
+        iterations = solver.do_time(timedelta(seconds=.1))
+
+        self.assertEqual(solver.num_iter, iterations)
+        self.assertAlmostEqual(solver.best_loss, solver.best_binding.eval_loss())
+
+    def test_perturbation(self):
+        solver = TabuSolver(self.graph, self.abilities, self.combinations, self.home_nodes, stagnation=5)
+        solver.do_num_iter(50)
+        solver.perturb()
+
+        self.assertEqual(sorted(solver.permutation), list(range(5)))
+        self.assert_deltas(solver)
+
+    def test_initial_assignments(self):
+        solver = TabuSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                            initial_assignments=[4, 3, 2, 1])
+        self.assertEqual(list(solver.permutation[:4]), [4, 3, 2, 1])
+        self.assertEqual(solver.permutation[4], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+import numpy
+
+from keybind_generator.solver.TreeStore import TreeStore
+
+
+class TestTreeStore(unittest.TestCase):
+    def test_lazy_children(self):
+        tree = TreeStore(chunk_size=4)
+        root = tree.add_node(3)
+        self.assertEqual(tree.child_start[root], -1)
+        self.assertEqual(tree.num_slots, 0)
+
+        tree.expand(root, numpy.array([4, 7, 9]))
+        self.assertTrue(numpy.array_equal(tree.child_key[tree.children(root)], [4, 7, 9]))
+        self.assertTrue(numpy.array_equal(tree.child_node[tree.children(root)], [-1, -1, -1]))
+
+        # Expanding again doesn't reallocate
+        tree.expand(root, numpy.array([4, 7, 9]))
+        self.assertEqual(tree.num_slots, 3)
+
+    def test_growth(self):
+        tree = TreeStore(chunk_size=4)
+        root = tree.add_node(10)
+        tree.expand(root, numpy.arange(10))
+        for slot in range(10):
+            self.assertEqual(tree.add_child(slot, 9), slot + 1)
+        self.assertEqual(tree.num_nodes, 11)
+        self.assertGreaterEqual(len(tree.visits), 11)
+        self.assertTrue(numpy.array_equal(tree.child_node[:10], range(1, 11)))
+
+    def test_max_nodes(self):
+        tree = TreeStore(max_nodes=2)
+        root = tree.add_node(2)
+        tree.expand(root, numpy.array([0, 1]))
+        self.assertEqual(tree.add_child(0, 1), 1)
+        self.assertEqual(tree.add_child(1, 1), -1)
+
+    def test_select_and_update(self):
+        tree = TreeStore()
+        root = tree.add_node(2)
+        tree.expand(root, numpy.array([0, 1]))
+        first = tree.add_child(tree.select_slot(root), 1)
+        tree.update(numpy.array([root, first]), 100)
+        second = tree.add_child(tree.select_slot(root), 1)
+        tree.update(numpy.array([root, second]), 1)
+        tree.update(numpy.array([root, second]), 3)
+
+        self.assertEqual(tree.visits[root], 3)
+        self.assertAlmostEqual(tree.loss[root], 104 / 3)
+        self.assertAlmostEqual(tree.loss[second], 2)
+        # Lower loss gives the higher UCT value
+        tree.update(numpy.array([root, second]), 1)
+        self.assertEqual(tree.child_node[tree.select_slot(root)], second)
+
+    def test_virtual_visits_spread_selection(self):
+        tree = TreeStore()
+        root = tree.add_node(2)
+        tree.expand(root, numpy.array([0, 1]))
+        for slot in range(2):
+            tree.update(numpy.array([root, tree.add_child(slot, 1)]), 1)
+        best = tree.child_node[tree.select_slot(root)]
+        tree.virtual_visits[[root, best]] += 5
+        self.assertNotEqual(tree.child_node[tree.select_slot(root, virtual_loss=100)], best)
+
+    def test_merge_children(self):
+        tree = TreeStore()
+        root = tree.add_node(3)
+        tree.expand(root, numpy.array([5, 6, 7]))
+        child = tree.add_child(0, 2)
+        tree.update(numpy.array([root, child]), 2)
+
+        tree.merge_children(root, numpy.array([5, 7]), numpy.array([1, 2]), numpy.array([4, 1]))
+        self.assertEqual(tree.visits[child], 2)
+        self.assertAlmostEqual(tree.loss[child], 3)
+        self.assertEqual(tree.visits[tree.child_node[2]], 2)
+        self.assertEqual(tree.visits[root], 4)
+        self.assertAlmostEqual(tree.loss[root], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
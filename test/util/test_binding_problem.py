@@ -0,0 +1,63 @@
+import pickle
+import unittest
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.util.BindingProblem import BindingProblem
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.KeyBinding import KeyBinding
+
+
+class TestBindingProblem(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 1, "Yes", numpy.nan],
+                                   ["dbreath", 2, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 2, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 2, "Yes", "", [2, 1]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.problem = BindingProblem(cls.graph, cls.abilities, cls.combinations, cls.graph.get_node_indices(["a", "b"]))
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.problem.home_nodes = [2]
+        self.assertIs(self.problem.engine, self.problem.engine)
+
+    def test_pickle(self):
+        problem = pickle.loads(pickle.dumps(self.problem))
+        self.assertEqual(problem.num_abilities, 4)
+        self.assertEqual(problem.engine.loss([0, 1, 2, 3]), 3.5)
+
+    def test_binding_from_problem(self):
+        binding = KeyBinding.from_problem(self.problem, [0, 1])
+        self.assertIs(binding.problem, self.problem)
+        self.assertIs(binding.graph, self.graph)
+        self.assertTrue(numpy.array_equal(binding.get_unassigned(), [2, 3, 4]))
+
+    def test_copy(self):
+        binding = KeyBinding.from_problem(self.problem, [0, 1])
+        copy = binding.copy()
+        copy.assign_next(2)
+        copy.assign_next(3)
+
+        self.assertFalse(binding.fully_assigned())
+        self.assertTrue(numpy.array_equal(binding.get_unassigned(), [2, 3, 4]))
+        self.assertEqual(copy.eval_loss(), 3.5)
+        self.assertIs(copy.problem, binding.problem)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,6 @@
+import os
+import pickle
+import tempfile
 import unittest
 import numpy
 from pandas import DataFrame
@@ -23,9 +26,118 @@ class TestGraph(unittest.TestCase):
         self.assertEqual(self.graph.minimum_distance([0, 1], [1, 2]), 0)
         self.assertEqual(self.graph.minimum_distance([0, 1], [2, 3]), 1)
 
+    def test_home_distance(self):
+        graph = Graph(5, self.graph.names)
+        graph.adjacency = self.graph.adjacency.copy()
+        distance = graph.home_distance([1, 0])
+        self.assertTrue(numpy.array_equal(distance, [0, 0, 1, 2, 3]))
+        # Cached per set of home nodes, whatever their order
+        self.assertIs(graph.home_distance([0, 1]), distance)
+        self.assertIsNot(graph.home_distance([0, 2]), distance)
+        with self.assertRaises(ValueError):
+            distance[0] = 1
+
+        # Replacing the matrix clears the cache
+        graph.adjacency = graph.adjacency + 1
+        self.assertTrue(numpy.array_equal(graph.home_distance([0, 1]), [1, 1, 2, 3, 4]))
+        # Modifying it in place requires clearing the cache
+        graph.adjacency[4, 0] = 0
+        graph.invalidate()
+        self.assertEqual(graph.home_distance([0, 1])[4], 0)
+
+    def test_home_distance_cache_size(self):
+        graph = Graph(5, self.graph.names)
+        graph.adjacency = self.graph.adjacency.copy()
+        distance = graph.home_distance([0])
+        for node in range(1, 5):
+            for other in range(5):
+                graph.home_distance([node, other])
+                # Keeps the most recently used set cached
+                self.assertIs(graph.home_distance([0]), distance)
+        self.assertLessEqual(len(graph._home_distances), Graph.HOME_DISTANCE_CACHE_SIZE)
+
+        # Minimum distances to arbitrary sets of nodes don't go through the cache
+        graph.invalidate()
+        self.assertEqual(graph.minimum_distance([3, 4], [0, 1]), 2)
+        self.assertEqual(graph.minimum_distance(4, [0, 2]), 2)
+        self.assertEqual(len(graph._home_distances), 0)
+
+    def test_shortest_paths(self):
+        graph = Graph(4, ["a", "b", "c", "d"])
+        # Going through b is cheaper than going from a to c directly, and c to d costs nothing
+        graph.adjacency = numpy.array([[1, 1, 5, 9],
+                                       [1, 1, 1, 9],
+                                       [5, 1, 2, 0],
+                                       [9, 9, 9, 3]])
+        paths = graph.shortest_paths()
+        self.assertTrue(numpy.array_equal(paths, [[1, 1, 2, 2],
+                                                  [1, 1, 1, 1],
+                                                  [2, 1, 2, 0],
+                                                  [9, 9, 9, 3]]))
+        self.assertIs(graph.shortest_paths(), paths)
+        self.assertTrue(numpy.array_equal(graph.home_distance([0], shortest_paths=True), [1, 1, 2, 9]))
+        self.assertTrue(numpy.array_equal(graph.home_distance([0]), [1, 1, 5, 9]))
+
+        graph.adjacency = numpy.ones((4, 4))
+        self.assertTrue(numpy.array_equal(graph.shortest_paths(), numpy.ones((4, 4))))
+
+    def test_node_indices(self):
+        self.assertEqual(self.graph.get_node_index("c"), 2)
+        self.assertEqual(self.graph.get_node_indices(["e", "a"]), [4, 0])
+        self.assertTrue(numpy.array_equal(self.graph.get_node_index_array(["b", "d", "b"]), [1, 3, 1]))
+        with self.assertRaises(KeyError):
+            self.graph.get_node_index_array(["a", "f"])
+
+        # Duplicate names resolve to their first node, in scalar and vectorized lookups alike
+        graph = Graph(4, ["a", "b", "a", "c"])
+        self.assertEqual(graph.get_node_index("a"), 0)
+        self.assertTrue(numpy.array_equal(graph.get_node_index_array(["c", "a", "b"]), [3, 0, 1]))
+
     def test_path_length(self):
         self.assertEqual(self.graph.path_length([0, 1, 2]), 2.5)
 
+    def test_share(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for path, dtype in [(None, numpy.float64), (None, numpy.float32),
+                                (os.path.join(directory, "adjacency.npy"), numpy.float32)]:
+                graph = Graph(5, self.graph.names)
+                graph.adjacency = self.graph.adjacency.copy()
+                graph.share(path, dtype)
+                self.assertTrue(graph.shared)
+                self.assertEqual(graph.adjacency.dtype, dtype)
+                self.assertTrue(numpy.array_equal(graph.adjacency, self.graph.adjacency))
+                with self.assertRaises(ValueError):
+                    graph.adjacency[0, 1] = 0
+
+                # Pickled by handle, the copy maps the same matrix
+                copy = pickle.loads(pickle.dumps(graph))
+                self.assertTrue(copy.shared)
+                self.assertNotIn("adjacency", graph.__getstate__())
+                self.assertTrue(numpy.array_equal(copy.adjacency, self.graph.adjacency))
+                self.assertEqual(copy.minimum_distance([0, 1], [2, 3]), 1)
+                copy.close()
+
+                if path is not None:
+                    opened = Graph.open_shared(path, self.graph.names)
+                    self.assertEqual(opened.size, 5)
+                    self.assertTrue(numpy.array_equal(opened.adjacency, self.graph.adjacency))
+                    opened.close()
+
+                # Closing leaves a private copy
+                graph.close()
+                self.assertFalse(graph.shared)
+                self.assertTrue(numpy.array_equal(graph.adjacency, self.graph.adjacency))
+                graph.adjacency[0, 1] = 0
+
+    def test_replaced_adjacency(self):
+        graph = Graph(5, self.graph.names)
+        graph.share()
+        graph.adjacency = self.graph.adjacency
+        self.assertFalse(graph.shared)
+        copy = pickle.loads(pickle.dumps(graph))
+        self.assertTrue(numpy.array_equal(copy.adjacency, self.graph.adjacency))
+        graph.close()
+
 
 if __name__ == '__main__':
     unittest.main()
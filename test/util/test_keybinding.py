@@ -77,9 +77,49 @@ class TestKeyBinding(unittest.TestCase):
         self.assertFalse(numpy.isnan(key_binding.eval_loss()))
         self.assertEqual(key_binding.eval_loss(), 3.5)
 
+    def test_free_key_pool(self):
+        key_binding = KeyBinding(self.graph, self.abilities, self.combinations, self.graph.get_node_indices(["a", "b"]),
+                                 [3, 1])
+        self.assertFalse(hasattr(key_binding, "__dict__"))
+        self.assertTrue(key_binding.has_assigned(3))
+        self.assertFalse(key_binding.has_assigned(0))
+        self.assertTrue(numpy.array_equal(key_binding.get_unassigned(), [0, 2, 4]))
+
+        for i in range(20):
+            self.assertIn(key_binding.random_unassigned(), [0, 2, 4])
+
+        self.assertFalse(key_binding.assign_next(1))
+        self.assertTrue(key_binding.assign_next(2))
+        self.assertTrue(numpy.array_equal(key_binding.get_unassigned(), [0, 4]))
+        self.assertTrue(key_binding.move(0, 4))
+        self.assertTrue(numpy.array_equal(key_binding.get_unassigned(), [0, 3]))
+        self.assertEqual(list(key_binding.assignments), [4, 1, 2])
+        self.assertEqual(key_binding.get_assignment("dbreath"), None)
+
+        # Unassigned abilities can't be moved, and leave the pool as it was
+        self.assertFalse(key_binding.move(3, 0))
+        self.assertTrue(numpy.array_equal(key_binding.get_unassigned(), [0, 3]))
+        self.assertTrue(key_binding.has_assigned(4))
+        self.assertFalse(key_binding.has_assigned(0))
+
+    def test_assign_remaining(self):
+        key_binding = KeyBinding(self.graph, self.abilities, self.combinations, self.graph.get_node_indices(["a", "b"]))
+        key_binding.assign_next(3)
+        self.assertFalse(key_binding.assign_remaining([3, 0, 1]))
+        self.assertTrue(key_binding.assign_remaining([4, 0, 1, 2]))
+        self.assertTrue(key_binding.fully_assigned())
+        self.assertEqual(list(key_binding.assignments), [3, 4, 0, 1])
+        self.assertTrue(numpy.array_equal(key_binding.get_unassigned(), [2]))
+
     def test_read_key_binding(self):
-        # TODO
-        pass
+        key_binding = KeyBinding(self.graph, self.abilities, self.combinations, self.graph.get_node_indices(["a", "b"]))
+        key_binding.assign_from_data(DataFrame({"ability": ["dbreath", "wrack", "ice barrage", "wrack #2"],
+                                                "bind": ["e", "c", "a", "d"]}))
+        self.assertEqual(list(key_binding.assignments), [2, 3, 0, 4])
+        self.assertTrue(numpy.array_equal(key_binding.get_unassigned(), [1]))
+
+        with self.assertRaises(KeyError):
+            key_binding.assign_from_data(DataFrame({"ability": ["wrack"], "bind": ["z"]}))
 
 
 if __name__ == '__main__':
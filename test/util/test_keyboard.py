@@ -1,5 +1,7 @@
 import unittest
 
+import numpy
+
 from keybind_generator.util.Keyboard import Keyboard
 
 
@@ -50,6 +52,35 @@ class TestKeyboard(unittest.TestCase):
 
         self.assertEqual(graph.adjacency[9, 9], 0)
 
+    def test_keyboard_graph_generation_matches_pairwise(self):
+        keyboard = Keyboard(horizontal_coefficient=1.5, vertical_coefficient=.8)
+        keyboard.add_key_row(Keyboard.KeyRow(1.5, 1, ["1", "2", "3", "4", "5", "6", "7"]))
+        keyboard.add_key_row(Keyboard.KeyRow(1.5, 1, ["1", "2", "3", "4", "5", "6", "7"]), modifier="Shift",
+                             modifier_penalty=4)
+        keyboard.add_key_row(Keyboard.KeyRow(2.5, 1.5, ["Q", "W", "E", "R", "T"]), modifier="Alt",
+                             modifier_penalty=8)
+        keyboard.add_mouse_keys(["Mouse1", "Mouse2", "Mouse3"], mouse_penalty=6)
+        keyboard.add_mouse_keys(["Mouse1", "Mouse2", "Mouse3"], mouse_penalty=6, modifier="Shift",
+                                modifier_penalty=4)
+        node_groups = [index % 4 for index in range(len(keyboard.entries))]
+        graph = keyboard.generate_graph(node_groups, group_penalty=2)
+
+        size = len(keyboard.entries)
+        expected = numpy.zeros((size, size))
+        for i in range(size):
+            for j in range(i + 1, size):
+                distance = keyboard.entries[i].distance_to(keyboard.entries[j])
+                if node_groups[i] == node_groups[j]:
+                    distance = distance + 2
+                expected[i, j] = distance
+                expected[j, i] = distance
+        self.assertTrue(numpy.array_equal(graph.adjacency, expected))
+
+    def test_default_keyboard(self):
+        graph = Keyboard.default().generate_graph()
+        self.assertEqual(graph.size, 105)
+        self.assertIn("Alt+Mouse12", graph.names)
+
     def test_keyboard_get_key_index(self):
         keyboard = Keyboard()
         keyboard.add_key_row(Keyboard.KeyRow(2.5, 1.2, ["Q", "W", "E", "R", "T", "Y"]))
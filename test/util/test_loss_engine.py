@@ -0,0 +1,145 @@
+import pickle
+import unittest
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.KeyBinding import KeyBinding
+from keybind_generator.util.LossEngine import LossEngine
+
+
+class TestLossEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 1, "Yes", numpy.nan],
+                                   ["dbreath", 2, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 2, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 2, "Yes", "", [2, 1]],
+                                      ["dbreath>wrack>ice barrage", 1, "Yes", "", [3, 0, 2]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.home_nodes = cls.graph.get_node_indices(["a", "b"])
+
+    def reference_loss(self, assignments):
+        individual = sum(self.graph.minimum_distance(node, self.home_nodes) / priority
+                         for node, priority in zip(assignments, self.abilities["priority"]))
+        combination = sum(self.graph.path_length([assignments[index] for index in indices]) / priority
+                          for indices, priority in zip(self.combinations["indices"], self.combinations["priority"]))
+        return individual + combination
+
+    def test_loss_matches_reference(self):
+        engine = LossEngine(self.graph, self.abilities, self.combinations, self.home_nodes)
+        for assignments in [[0, 1, 2, 3], [4, 2, 0, 1], [3, 4, 1, 0]]:
+            self.assertAlmostEqual(engine.loss(assignments), self.reference_loss(assignments))
+
+    def test_combination_terms_follow_assignments(self):
+        engine = LossEngine(self.graph, self.abilities, self.combinations, self.home_nodes)
+        terms = engine.combination_terms(numpy.array([4, 2, 0, 1]))
+        self.assertTrue(numpy.allclose(terms, [4 / 2, 2 / 2, 3 + 4]))
+
+    def test_coefficients(self):
+        engine = LossEngine(self.graph, self.abilities, self.combinations, self.home_nodes,
+                            individual_coefficient=0, combination_coefficient=2)
+        self.assertAlmostEqual(engine.loss([0, 1, 2, 3]), 2 * numpy.sum(engine.combination_terms(
+            numpy.array([0, 1, 2, 3]))))
+
+    def test_no_combinations(self):
+        combinations = DataFrame(columns=["name", "priority", "ordered", "comment", "indices"])
+        engine = LossEngine(self.graph, self.abilities, combinations, self.home_nodes)
+        self.assertEqual(engine.loss([0, 1, 2, 3]), 2)
+
+    def test_batch_loss(self):
+        engine = LossEngine(self.graph, self.abilities, self.combinations, self.home_nodes)
+        candidates = numpy.argsort(numpy.random.random((50, 5)), axis=1)[:, :4]
+        losses = engine.batch_loss(candidates)
+        self.assertEqual(losses.shape, (50,))
+        self.assertTrue(numpy.allclose(losses, [self.reference_loss(list(entry)) for entry in candidates]))
+
+    def test_swap_delta(self):
+        engine = LossEngine(self.graph, self.abilities, self.combinations, self.home_nodes)
+        assignments = numpy.array([4, 2, 0, 1])
+        for first in range(4):
+            for second in range(4):
+                swapped = assignments.copy()
+                swapped[[first, second]] = swapped[[second, first]]
+                self.assertAlmostEqual(engine.swap_delta(assignments, first, second),
+                                       engine.loss(swapped) - engine.loss(assignments))
+
+    def test_move_delta(self):
+        engine = LossEngine(self.graph, self.abilities, self.combinations, self.home_nodes)
+        assignments = numpy.array([4, 2, 0, 1])
+        for ability in range(4):
+            moved = assignments.copy()
+            moved[ability] = 3
+            self.assertAlmostEqual(engine.move_delta(assignments, ability, 3),
+                                   engine.loss(moved) - engine.loss(assignments))
+
+    def test_key_binding_moves(self):
+        key_binding = KeyBinding(self.graph, self.abilities, self.combinations, self.home_nodes)
+        for index in [4, 2, 0, 1]:
+            key_binding.assign_next(index)
+        loss = key_binding.eval_loss()
+
+        delta = key_binding.swap_delta(0, 2)
+        key_binding.swap(0, 2)
+        self.assertAlmostEqual(key_binding.eval_loss(), loss + delta)
+
+        loss = key_binding.eval_loss()
+        delta = key_binding.move_delta(1, 3)
+        self.assertTrue(key_binding.move(1, 3))
+        self.assertAlmostEqual(key_binding.eval_loss(), loss + delta)
+        self.assertTrue(numpy.array_equal(key_binding.get_unassigned(), [2]))
+        self.assertFalse(key_binding.move(1, 0))
+
+    def test_key_binding_uses_engine(self):
+        engine = LossEngine(self.graph, self.abilities, self.combinations, self.home_nodes)
+        key_binding = KeyBinding(self.graph, self.abilities, self.combinations, self.home_nodes, [4, 2, 0, 1],
+                                 engine=engine)
+        self.assertAlmostEqual(key_binding.eval_loss(), self.reference_loss([4, 2, 0, 1]))
+
+    def test_shortest_paths(self):
+        graph = Graph(5, self.graph.names)
+        graph.adjacency = self.graph.adjacency.copy()
+        graph.adjacency[0, 4] = 10
+        graph.invalidate()
+        direct = LossEngine(graph, self.abilities, self.combinations, self.home_nodes)
+        shortest = LossEngine(graph, self.abilities, self.combinations, self.home_nodes, shortest_paths=True)
+        self.assertEqual(direct.adjacency[0, 4], 10)
+        self.assertIs(shortest.adjacency, graph.shortest_paths())
+        self.assertEqual(shortest.adjacency[0, 4], 4)
+
+        # Ice barrage on a and wrack on e, the first combination goes from a to e
+        self.assertAlmostEqual(direct.loss([4, 2, 0, 1]) - shortest.loss([4, 2, 0, 1]), 6 / 2)
+        self.assertTrue(numpy.array_equal(direct.home_distance, shortest.home_distance))
+
+    def test_shared_graph(self):
+        for dtype in [numpy.float64, numpy.float32]:
+            graph = Graph(5, self.graph.names)
+            graph.adjacency = self.graph.adjacency
+            graph.share(dtype=dtype)
+            engine = LossEngine(graph, self.abilities, self.combinations, self.home_nodes)
+            # The engine uses the shared matrix, and is pickled without it
+            self.assertTrue(numpy.may_share_memory(engine.adjacency, graph.adjacency))
+            self.assertNotIn("adjacency", engine.__getstate__())
+
+            copy = pickle.loads(pickle.dumps(engine))
+            self.assertTrue(numpy.may_share_memory(copy.adjacency, copy.graph.adjacency))
+            self.assertAlmostEqual(copy.loss([4, 2, 0, 1]), self.reference_loss([4, 2, 0, 1]), places=5)
+            copy.graph.close()
+            graph.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
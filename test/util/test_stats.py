@@ -0,0 +1,104 @@
+import unittest
+
+import numpy
+from pandas import DataFrame
+
+from keybind_generator.solver.MonteCarloTreeSearchSolver import MonteCarloTreeSearchSolver
+from keybind_generator.solver.PepegaSolver import PepegaSolver
+from keybind_generator.util.Graph import Graph
+from keybind_generator.util.KeyBinding import KeyBinding
+from keybind_generator.util.Stats import Stats
+
+
+class TestStats(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.graph = Graph(5, ["a", "b", "c", "d", "e"])
+        cls.graph.adjacency = numpy.array([[0, 1, 2, 3, 4],
+                                           [1, 0, 1, 2, 3],
+                                           [2, 1, 0, 1, 2],
+                                           [3, 2, 1, 0, 1],
+                                           [4, 3, 2, 1, 0]])
+
+        cls.abilities = DataFrame([["wrack", 1, "Yes", numpy.nan],
+                                   ["wrack #2", 1, "Yes", numpy.nan],
+                                   ["ice barrage", 2, "Yes", numpy.nan],
+                                   ["dbreath", 3, "Yes", numpy.nan]])
+        cls.abilities.columns = ["name", "priority", "bar", "comment"]
+
+        cls.combinations = DataFrame([["ice barrage>wrack", 1, "Yes", "", [2, 0]],
+                                      ["ice barrack>wrack #2", 1, "Yes", "", [2, 1]]])
+        cls.combinations.columns = ["name", "priority", "ordered", "comment", "indices"]
+
+        cls.home_nodes = cls.graph.get_node_indices(["a", "b"])
+
+    def test_stats(self):
+        stats = Stats()
+        stats.add("loss", .5)
+        stats.add("loss", .25, 2)
+        stats.maximum("depth", 3)
+        stats.maximum("depth", 2)
+        summary = stats.summary()
+        self.assertEqual(summary["loss"]["count"], 3)
+        self.assertAlmostEqual(summary["loss"]["seconds"], .75)
+        self.assertAlmostEqual(summary["loss"]["mean_seconds"], .25)
+        self.assertEqual(summary["depth"], 3)
+
+        stats.reset()
+        self.assertEqual(stats.summary(), {})
+
+    def test_key_binding(self):
+        stats = Stats()
+        binding = KeyBinding(self.graph, self.abilities, self.combinations, self.home_nodes)
+        binding.stats = stats
+        binding.assign_next(3)
+        copy = binding.copy()
+        copy.assign_remaining([0, 1, 2])
+        copy.eval_loss()
+        copy.eval_batch_loss(numpy.array([[0, 1, 2, 3], [1, 2, 3, 4]]))
+
+        self.assertEqual(stats.counts, {"assign": 4, "loss": 3})
+        self.assertIsNone(KeyBinding(self.graph, self.abilities, self.combinations, self.home_nodes).stats)
+
+    def test_pepega_solver(self):
+        for batch_size in [1, 8]:
+            stats = Stats()
+            solver = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                                  batch_size=batch_size)
+            solver.set_stats(stats)
+            solver.run_iterations(32)
+
+            self.assertEqual(stats.counts["loss"], 32)
+            self.assertEqual(stats.counts["assign"], 32 * 4)
+            self.assertEqual(stats.values["iterations"], 32)
+            self.assertEqual(stats.values["best loss"], solver.best_loss)
+
+    def test_monte_carlo_solver(self):
+        for batch_size in [1, 4]:
+            stats = Stats()
+            solver = MonteCarloTreeSearchSolver(self.graph, self.abilities, self.combinations, self.home_nodes,
+                                                leaf_batch_size=batch_size)
+            solver.set_stats(stats)
+            solver.run_iterations(40)
+
+            self.assertEqual(stats.counts["select"], 40)
+            self.assertEqual(stats.counts["loss"], 40)
+            self.assertEqual(stats.counts["backpropagate"], 40)
+            self.assertEqual(stats.counts["assign"], 40 * 4)
+            # Every node other than the newest leaves has been expanded
+            self.assertLessEqual(stats.counts["expand"], solver.tree.num_nodes)
+            self.assertEqual(stats.values["tree nodes"], solver.tree.num_nodes)
+            self.assertTrue(1 <= stats.values["tree depth"] <= 4)
+
+            # Detaching stops recording
+            solver.set_stats(None)
+            solver.run_iterations(4)
+            self.assertEqual(stats.counts["select"], 40)
+
+    def test_callback(self):
+        calls = []
+        solver = PepegaSolver(self.graph, self.abilities, self.combinations, self.home_nodes)
+        solver.set_stats(Stats(lambda solver, stats: calls.append(solver.num_iter), callback_interval=10))
+        solver.run_iterations(35)
+        self.assertEqual(calls, [10, 20, 30])